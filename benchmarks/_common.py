@@ -0,0 +1,93 @@
+# benchmarks/_common.py 文件
+# 基准测试公共工具：按文件路径加载后端应用（使用临时数据库），统计 SQL 语句数量与进程内存峰值
+
+import importlib.util
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import event
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATHS = {
+    'official': os.path.join(REPO_ROOT, 'official-position-system', 'backend', 'app.py'),
+    'online': os.path.join(REPO_ROOT, 'online', 'backend', 'app.py'),
+}
+
+
+def load_app(kind: str, db_path: str = '') -> Any:
+    """加载指定后端（official / online）的 app 模块，数据库指向临时 SQLite 文件。"""
+    if not db_path:
+        db_path = os.path.join(tempfile.mkdtemp(prefix=f'bench-{kind}-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    module_name = f'{kind}_app'
+    spec = importlib.util.spec_from_file_location(module_name, APP_PATHS[kind])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    sys.path.insert(0, os.path.dirname(APP_PATHS[kind]))
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.pop(0)
+    with module.app.app_context():
+        # 有迁移入口的后端走迁移，其余直接建表
+        getattr(module, 'migrate_db', module.db.create_all)()
+    return module
+
+
+class QueryCounter:
+    """挂在 SQLAlchemy 引擎上的语句计数器。"""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args: Any, **kwargs: Any) -> None:
+        self.count += 1
+
+
+@contextmanager
+def count_queries(engine: Any) -> Iterator[QueryCounter]:
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+
+def timed(fn: Any, repeat: int = 5) -> Dict[str, float]:
+    """多次执行 fn，返回毫秒级的最小值与中位数。"""
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {'min_ms': round(samples[0], 3), 'median_ms': round(samples[len(samples) // 2], 3)}
+
+
+def reset_peak_rss() -> bool:
+    """Linux 上清零本进程的 RSS 峰值（VmHWM），之后 peak_rss_mb() 只反映这之后的峰值；其他平台返回 False。"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # 无 /proc 时退回进程生命周期内的峰值：Linux 单位为 KiB，macOS 为字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
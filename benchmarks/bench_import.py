@@ -0,0 +1,81 @@
+# benchmarks/bench_import.py 文件
+# 批量导入吞吐量（行/秒）：两套后端各自导入 N 行 CSV，并与逐条 POST 的方式对照
+#
+# 用法: python benchmarks/bench_import.py [行数 ...]
+
+import io
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Any, Dict
+
+from _common import load_app
+
+BASELINE_ROWS = 300  # 逐条 POST 的对照只跑这么多行
+
+
+def _csv(header: str, lines: Any) -> io.BytesIO:
+    return io.BytesIO((header + '\n' + '\n'.join(lines) + '\n').encode('utf-8'))
+
+
+def _rate(rows: int, seconds: float) -> float:
+    return round(rows / seconds, 1) if seconds else 0.0
+
+
+def bench_official(n_rows: int) -> Dict[str, Any]:
+    m = load_app('official')
+    result: Dict[str, Any] = {'app': 'official', 'rows': n_rows}
+    with m.app.app_context():
+        start = time.perf_counter()
+        positions = m.import_records('positions', _csv('name,parent_id', (
+            f'职位{i},{(i - 2) // 4 + 1 if i > 1 else ""}' for i in range(1, n_rows + 1)
+        )), 'csv')
+        officials = m.import_records('officials', _csv('name', (f'官员{i}' for i in range(n_rows))), 'csv')
+        appointments = m.import_records('appointments', _csv('position_id,official_id,start_date,end_date', (
+            f'{i % n_rows + 1},{i % n_rows + 1},{1000 + i % 800}-01-01,{1003 + i % 800}-01-01'
+            for i in range(n_rows)
+        )), 'csv')
+        seconds = time.perf_counter() - start
+        total = positions.inserted + officials.inserted + appointments.inserted
+        result.update(bulk_rows=total, bulk_failed=positions.failed + officials.failed + appointments.failed,
+                      bulk_rows_per_sec=_rate(total, seconds))
+
+    client = m.app.test_client()
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):  # POST 处理函数会打印请求内容
+        for i in range(BASELINE_ROWS):
+            client.post('/api/positions', json={'name': f'逐条{i}', 'parent_id': 1})
+    result['per_request_rows_per_sec'] = _rate(BASELINE_ROWS, time.perf_counter() - start)
+    return result
+
+
+def bench_online(n_rows: int) -> Dict[str, Any]:
+    m = load_app('online')
+    result: Dict[str, Any] = {'app': 'online', 'rows': n_rows}
+    with m.app.app_context():
+        start = time.perf_counter()
+        positions = m.import_records('positions', _csv('id,name,superior_id,start_year', (
+            f'p{i},职位{i},{f"p{(i - 2) // 4 + 1}" if i > 1 else ""},{960 + i % 300}' for i in range(1, n_rows + 1)
+        )), 'csv')
+        relationships = m.import_records('relationships', _csv('source_id,target_id,relationship_type', (
+            f'p{i % n_rows + 1},p{(i * 7) % n_rows + 1},peer' for i in range(n_rows)
+        )), 'csv')
+        seconds = time.perf_counter() - start
+        total = positions.inserted + relationships.inserted
+        result.update(bulk_rows=total, bulk_failed=positions.failed + relationships.failed,
+                      bulk_rows_per_sec=_rate(total, seconds))
+
+    client = m.app.test_client()
+    start = time.perf_counter()
+    for i in range(BASELINE_ROWS):
+        client.post('/api/positions', json={'name': f'逐条{i}', 'superior_id': 'p1'})
+    result['per_request_rows_per_sec'] = _rate(BASELINE_ROWS, time.perf_counter() - start)
+    return result
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [1000, 10000]
+    for size in sizes:
+        for bench in (bench_official, bench_online):
+            print(json.dumps(bench(size), ensure_ascii=False))
@@ -0,0 +1,196 @@
+# benchmarks/bench_routes.py 文件
+# 接口基准：在合成数据集（datagen.py）上用 Flask 测试客户端逐个驱动各接口，
+# 记录每个接口的 p50/p99 延迟、每次请求的 SQL 语句数、响应字节数与内存峰值（RSS），
+# 结果连同提交号、数据集规模等信息写入 JSON，便于用 compare_results.py 对比不同提交。
+# 默认关闭官员职位系统的响应缓存，测量的是每次请求实际的查询与序列化开销（--cache 保留缓存）。
+#
+# 用法: python benchmarks/bench_routes.py --app official --size 10000 [--requests 50] [--seed 1]
+#                                         [--data-dir DIR] [--output FILE] [--route NAME ...] [--cache]
+
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from _common import APP_PATHS, REPO_ROOT, count_queries, peak_rss_mb, reset_peak_rss
+from datagen import DYNASTIES, load_dataset
+
+# 路由名 -> (方法, 生成 (路径, JSON 请求体) 的函数, 是否为全量列表接口)
+Route = Tuple[str, Callable[[random.Random, Dict[str, Any]], Tuple[str, Any]], bool]
+LIST_ROUTE_REQUESTS = 5  # 全量列表接口的请求次数上限
+
+
+def _day(rng: random.Random) -> str:
+    year = rng.randint(DYNASTIES[0][1], DYNASTIES[-1][2])
+    return f'{year:04d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+
+
+def _lunar_day(rng: random.Random) -> str:
+    # 农历查询表从 960 年起
+    year = rng.randint(max(DYNASTIES[0][1], 960), DYNASTIES[-1][2])
+    return f'农历{year}年{rng.randint(1, 12)}月{rng.randint(1, 29)}日'
+
+
+def _viewport(rng: random.Random, positions: int) -> str:
+    # 1920×1080 的视口；合成数据的组织图宽度约为每个职位一个节点间距（180px），取其中随机位置
+    x = rng.randrange(max(positions, 1)) * 180
+    return f'{x},0,{x + 1920},1080'
+
+
+OFFICIAL_ROUTES: Dict[str, Route] = {
+    'GET /api/positions': ('GET', lambda rng, ctx: (f'/api/positions?date={_day(rng)}', None), True),
+    'GET /api/positions/<id>': ('GET', lambda rng, ctx: (
+        f'/api/positions/{rng.randint(1, ctx["positions"])}?date={_day(rng)}', None), False),
+    'PUT /api/positions/<id>': ('PUT', lambda rng, ctx: (
+        f'/api/positions/{rng.randint(1, ctx["positions"])}',
+        {'name': f'基准职位{rng.randrange(1000)}', 'date': _day(rng)}), False),
+    'GET /api/officials/<id>': ('GET', lambda rng, ctx: (
+        f'/api/officials/{rng.randint(1, ctx["officials"])}', None), False),
+    'GET /api/officials/<id>/career': ('GET', lambda rng, ctx: (
+        f'/api/officials/{rng.randint(1, ctx["officials"])}/career', None), False),
+    'POST /api/officials/careers': ('POST', lambda rng, ctx: (
+        '/api/officials/careers', {'ids': rng.sample(range(1, ctx['officials'] + 1), min(100, ctx['officials']))}),
+        False),
+    'GET /api/officials/career-summary': ('GET', lambda rng, ctx: ('/api/officials/career-summary', None), True),
+    'GET /api/connections': ('GET', lambda rng, ctx: (f'/api/connections?date={_day(rng)}', None), True),
+    'GET /api/layout': ('GET', lambda rng, ctx: (f'/api/layout?date={_day(rng)}', None), True),
+    'GET /api/layout?bbox=': ('GET', lambda rng, ctx: (
+        f'/api/layout?date={_day(rng)}&bbox={_viewport(rng, ctx["positions"])}', None), False),
+    'GET /api/appointments/active': ('GET', lambda rng, ctx: (
+        f'/api/appointments/active?date={_day(rng)}', None), False),
+    'GET /api/date-convert': ('GET', lambda rng, ctx: (f'/api/date-convert?date={_day(rng)}', None), False),
+    'GET /api/positions?date=农历': ('GET', lambda rng, ctx: (f'/api/positions?date={_lunar_day(rng)}', None), True),
+    'POST /api/dates/normalize': ('POST', lambda rng, ctx: (
+        '/api/dates/normalize', {'dates': [_lunar_day(rng) for _ in range(1000)]}), False),
+}
+
+ONLINE_ROUTES: Dict[str, Route] = {
+    'GET /api/positions': ('GET', lambda rng, ctx: ('/api/positions', None), True),
+    'GET /api/positions?limit=100': ('GET', lambda rng, ctx: (
+        f'/api/positions?limit=100&after={rng.choice(ctx["ids"])}', None), False),
+    'PUT /api/positions/<id>': ('PUT', lambda rng, ctx: (
+        f'/api/positions/{rng.choice(ctx["ids"])}', {'description': f'基准说明{rng.randrange(1000)}'}), False),
+    'GET /api/positions/<id>/subtree': ('GET', lambda rng, ctx: (
+        f'/api/positions/{rng.choice(ctx["ids"])}/subtree?max_depth=2', None), False),
+    'GET /api/relationships': ('GET', lambda rng, ctx: ('/api/relationships', None), True),
+    'GET /api/layout': ('GET', lambda rng, ctx: ('/api/layout', None), True),
+    'GET /api/layout?bbox=': ('GET', lambda rng, ctx: (
+        f'/api/layout?bbox={_viewport(rng, ctx["positions"])}', None), False),
+    'GET /api/lunar': ('GET', lambda rng, ctx: ('/api/lunar?year={}&month={}&day={}'.format(
+        *(int(part) for part in _day(rng).split('-'))), None), False),
+}
+
+ROUTES = {'official': OFFICIAL_ROUTES, 'online': ONLINE_ROUTES}
+
+
+def _context(kind: str, m: Any, rows: Dict[str, int]) -> Dict[str, Any]:
+    if kind == 'official':
+        return {'positions': rows['position'], 'officials': rows['official']}
+    with m.app.app_context():
+        ids = [row[0] for row in m.db.session.query(m.Position.id).order_by(m.db.func.random()).limit(1000)]
+    return {'ids': ids, 'positions': rows['position']}
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))], 3) if ordered else 0.0
+
+
+def bench_route(m: Any, engine: Any, method: str, make: Callable[..., Tuple[str, Any]], ctx: Dict[str, Any],
+                n_requests: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    client = m.app.test_client()
+    # 预热一次（农历表、进程内索引等首次加载），不计入统计
+    path, body = make(rng, ctx)
+    client.open(path, method=method, json=body).get_data()
+
+    latencies, queries, sizes, errors = [], [], [], 0
+    reset_peak_rss()
+    for _ in range(n_requests):
+        path, body = make(rng, ctx)
+        with count_queries(engine) as counter:
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            data = response.get_data()  # 流式响应在读取时才执行查询
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        sizes.append(len(data))
+        errors += response.status_code >= 400
+    return {
+        'requests': n_requests, 'errors': errors,
+        'p50_ms': _percentile(latencies, 0.5), 'p99_ms': _percentile(latencies, 0.99),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'queries_p50': _percentile(queries, 0.5), 'queries_max': max(queries),
+        'bytes_p50': _percentile(sizes, 0.5),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(kind: str, size: int, n_requests: int, seed: int, data_dir: str, routes: Optional[List[str]],
+        cache: bool) -> Dict[str, Any]:
+    m, dataset = load_dataset(kind, size, seed, data_dir)
+    for key in ('RESPONSE_CACHE_SIZE', 'LAYOUT_CACHE_SIZE'):
+        if not cache and key in m.app.config:
+            m.app.config[key] = 0
+    ctx = _context(kind, m, dataset['rows'])
+    with m.app.app_context():
+        engine = m.db.engine
+    results = {}
+    with redirect_stdout(io.StringIO()):  # 部分处理函数会打印请求内容
+        for name, (method, make, is_list) in ROUTES[kind].items():
+            if routes and name not in routes:
+                continue
+            count = min(n_requests, LIST_ROUTE_REQUESTS) if is_list else n_requests
+            results[name] = bench_route(m, engine, method, make, ctx, count, seed)
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'meta': {
+            'app': kind, 'size': size, 'seed': seed, 'requests': n_requests, 'response_cache': cache,
+            'commit': _git('rev-parse', 'HEAD'), 'dirty': bool(status) if status is not None else None,
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'dataset': {'rows': dataset['rows'], 'generate_s': dataset['generate_s']},
+        },
+        'routes': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='在合成数据集上逐个测量接口的延迟、SQL 语句数与内存峰值')
+    parser.add_argument('--app', choices=sorted(APP_PATHS), default='official')
+    parser.add_argument('--size', type=int, default=10000, help='职位数（1k ~ 1M）')
+    parser.add_argument('--requests', type=int, default=50, help='每个接口的请求次数（全量列表接口最多 5 次）')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', default='', help='数据集缓存目录，默认系统临时目录')
+    parser.add_argument('--route', action='append', help='只测指定接口，例如 "GET /api/positions"')
+    parser.add_argument('--cache', action='store_true', help='保留响应缓存')
+    parser.add_argument('--output', help='结果文件，默认 benchmarks/results/<app>-<size>-<提交号>.json')
+    args = parser.parse_args()
+
+    report = run(args.app, args.size, args.requests, args.seed, args.data_dir, args.route, args.cache)
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results',
+        f'{args.app}-{args.size}-{(report["meta"]["commit"] or "unknown")[:10]}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    for name, stats in report['routes'].items():
+        print(json.dumps({'route': name, **stats}, ensure_ascii=False))
+    print(f'结果已写入 {output}', file=sys.stderr)
@@ -0,0 +1,92 @@
+# benchmarks/bench_search.py 文件
+# 全文检索：FTS5 二元组索引（/api/search 使用的 search_index.search）与逐列 LIKE '%词%' 扫描对照，
+# 并校验两者命中的文档集合一致
+#
+# 用法: python benchmarks/bench_search.py [记录数 ...]
+
+import json
+import random
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, List, Set, Tuple
+
+from sqlalchemy import text
+
+from _common import load_app, timed
+
+# 常见文言用字，随机拼成「原文」
+CHARS = ('之乎者也而以其于为所有无不可天下人臣君王国家官职事政令诏书省部院司府州县军民兵刑礼户工吏'
+         '中书门下尚左右仆射侍郎中丞大夫学士知制诰枢密使副判参知同平章拜迁罢除授加封赠谥')
+QUERIES = ('中书', '平章', '知制诰', '枢密使', '尚书左仆射', '侍郎', '诏')
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(CHARS) for _ in range(length))
+
+
+def seed(m: Any, n_rows: int) -> None:
+    rng = random.Random(n_rows)
+    base = date(960, 1, 1)
+    db = m.db
+    db.session.execute(m.Position.__table__.insert(), [
+        {'id': i, 'name': _sentence(rng, 3), 'parent_id': None} for i in range(1, n_rows // 10 + 2)
+    ])
+    db.session.execute(m.Official.__table__.insert(), [
+        {'id': i, 'name': _sentence(rng, 3), 'bio': _sentence(rng, 80)} for i in range(1, n_rows // 10 + 2)
+    ])
+    db.session.execute(m.PositionFunction.__table__.insert(), [
+        {'position_id': rng.randrange(1, n_rows // 10 + 2), 'date': base + timedelta(days=rng.randrange(365 * 300)),
+         'description': _sentence(rng, 20), 'source_text': _sentence(rng, 120), 'source_reference': None}
+        for _ in range(n_rows)
+    ])
+    db.session.execute(m.Appointment.__table__.insert(), [
+        {'position_id': rng.randrange(1, n_rows // 10 + 2), 'official_id': rng.randrange(1, n_rows // 10 + 2),
+         'start_date': base + timedelta(days=rng.randrange(365 * 300)), 'end_date': None,
+         'source_text': _sentence(rng, 60), 'source_reference': None}
+        for _ in range(n_rows)
+    ])
+    m.rebuild_search_index()
+    db.session.commit()
+
+
+def like_search(m: Any, query: str) -> Set[Tuple[str, str, str]]:
+    # 旧做法：对每个可检索列做 LIKE '%词%' 全表扫描
+    hits = set()
+    for entity_type, (model, fields, _, _) in m.SEARCH_ENTITIES.items():
+        for field in fields:
+            column = getattr(model, field)
+            for (row_id,) in m.db.session.query(model.id).filter(column.like(f'%{query}%')):
+                hits.add((entity_type, str(row_id), field))
+    return hits
+
+
+def fts_search(m: Any, query: str, limit: int) -> List[Tuple[str, str, str, float]]:
+    return m.search_index.search(m.db.session.connection(), query, limit=limit)
+
+
+def run(n_rows: int) -> Dict[str, Any]:
+    m = load_app('official')
+    row: Dict[str, Any] = {'rows': n_rows}
+    with m.app.app_context():
+        seed(m, n_rows)
+        row['index_documents'] = m.db.session.execute(text('SELECT COUNT(*) FROM search_document')).scalar()
+        identical = True
+        for name, fn in (
+            ('like_all', lambda q: like_search(m, q)),
+            ('fts_all', lambda q: fts_search(m, q, 10 ** 9)),
+            ('fts_top20', lambda q: fts_search(m, q, 20)),
+        ):
+            medians = [timed(lambda: fn(q), repeat=3)['median_ms'] for q in QUERIES]
+            row[f'{name}_median_ms'] = round(sorted(medians)[len(medians) // 2], 3)
+        for query in QUERIES:
+            expected = like_search(m, query)
+            found = {(t, i, f) for t, i, f, _ in fts_search(m, query, 10 ** 9)}
+            identical = identical and expected == found
+        row['identical'] = identical
+    return row
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [2000, 20000]
+    for size in sizes:
+        print(json.dumps(run(size), ensure_ascii=False))
@@ -0,0 +1,101 @@
+# benchmarks/bench_snapshot.py 文件
+# 对比 GET /api/positions?date= 的旧实现（逐职位查询，2N+1）、build_snapshot（固定查询数）
+# 与「某日视图」物化表上的区间查询（as_of_snapshot）
+#
+# 用法: python benchmarks/bench_snapshot.py [职位数 ...]
+
+import json
+import random
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from _common import count_queries, load_app, timed
+
+
+def seed(m: Any, n_positions: int) -> None:
+    rng = random.Random(n_positions)
+    base = date(1000, 1, 1)
+    db = m.db
+    db.session.execute(m.Position.__table__.insert(), [
+        {'id': i, 'name': f'职位{i}', 'parent_id': (i - 1) // 4 or None}
+        for i in range(1, n_positions + 1)
+    ])
+    db.session.execute(m.Official.__table__.insert(), [
+        {'id': i, 'name': f'官员{i}', 'bio': None} for i in range(1, n_positions + 1)
+    ])
+    functions, appointments = [], []
+    for pid in range(1, n_positions + 1):
+        for _ in range(3):
+            functions.append({
+                'position_id': pid,
+                'date': base + timedelta(days=rng.randrange(365 * 300)),
+                'description': f'职能{pid}', 'source_text': '原文', 'source_reference': '《宋史》',
+            })
+        for _ in range(4):
+            start = base + timedelta(days=rng.randrange(365 * 300))
+            appointments.append({
+                'position_id': pid, 'official_id': rng.randrange(1, n_positions + 1),
+                'start_date': start,
+                'end_date': start + timedelta(days=rng.randrange(365 * 40)) if rng.random() < 0.8 else None,
+                'source_text': None, 'source_reference': None,
+            })
+    db.session.execute(m.PositionFunction.__table__.insert(), functions)
+    db.session.execute(m.Appointment.__table__.insert(), appointments)
+    db.session.commit()
+
+
+def legacy_snapshot(m: Any, target_date: date) -> List[Dict[str, Any]]:
+    # 重构前 get_positions() 的逐职位实现，仅用于对照；
+    # 显式写出无索引时 SQLite 的隐含顺序（同日职能取 id 最小者、任职按 rowid），避免索引改变查询计划后结果漂移
+    result = []
+    for pos in m.Position.query.all():
+        func = m.PositionFunction.query.filter(
+            m.PositionFunction.position_id == pos.id,
+            m.PositionFunction.date <= target_date
+        ).order_by(m.PositionFunction.date.desc(), m.PositionFunction.id).first()
+        appointments = m.Appointment.query.filter(
+            m.Appointment.position_id == pos.id,
+            m.Appointment.start_date <= target_date,
+            (m.Appointment.end_date.is_(None) | (m.Appointment.end_date >= target_date))
+        ).order_by(m.Appointment.id).all()
+        pos_dict = pos.to_dict()
+        pos_dict['function'] = func.to_dict() if func else None
+        pos_dict['appointments'] = [a.to_dict() for a in appointments]
+        result.append(pos_dict)
+    return result
+
+
+def run(n_positions: int) -> Dict[str, Any]:
+    m = load_app('official')
+    target_date = date(1150, 6, 1)
+    with m.app.app_context():
+        seed(m, n_positions)
+        m.rebuild_as_of_view()
+        m.db.session.commit()
+        engine = m.db.engine
+        row: Dict[str, Any] = {'positions': n_positions}
+        variants = (
+            ('legacy', lambda: legacy_snapshot(m, target_date)),
+            ('snapshot', lambda: m.build_snapshot(target_date)),
+            ('view', lambda: m.as_of_snapshot(target_date)),
+        )
+        for name, fn in variants:
+            with count_queries(engine) as counter:
+                fn()
+            row[f'{name}_queries'] = counter.count
+            row.update({f'{name}_{k}': v for k, v in timed(fn, repeat=3).items()})
+            m.db.session.expire_all()
+        # 校验两种实现经 jsonify 后字节一致
+        with m.app.test_request_context():
+            old = m.jsonify(legacy_snapshot(m, target_date)).get_data()
+            new = m.app.test_client().get(f'/api/positions?date={target_date.isoformat()}').get_data()
+        row['identical'] = old == new
+        row['view_identical'] = m.as_of_snapshot(target_date) == m.build_snapshot(target_date)
+    return row
+
+
+if __name__ == '__main__':
+    sizes = [int(a) for a in sys.argv[1:]] or [100, 1000, 5000]
+    for size in sizes:
+        print(json.dumps(run(size), ensure_ascii=False))
@@ -0,0 +1,66 @@
+# benchmarks/bench_snapshot_size.py 文件
+# 对比 GET /api/positions?date= 各种表示形式的响应字节数与服务端耗时：
+# 完整 JSON、?fields=lean、?format=columnar、MessagePack，以及 gzip / br 压缩后的大小。
+# 响应缓存关闭，每次请求都重新构建并编码；同时校验列式结果可还原为原始快照。
+#
+# 用法: python benchmarks/bench_snapshot_size.py [职位数 ...]
+
+import gzip
+import json
+import sys
+from datetime import date
+from typing import Any, Dict, List
+
+from _common import load_app, timed
+from bench_snapshot import seed
+
+VARIANTS = (
+    ('json', '', {}),
+    ('json lean', '&fields=lean', {}),
+    ('columnar', '&format=columnar', {}),
+    ('columnar lean', '&format=columnar&fields=lean', {}),
+    ('msgpack columnar', '&format=columnar', {'Accept': 'application/x-msgpack'}),
+    ('json gzip', '', {'Accept-Encoding': 'gzip'}),
+    ('columnar gzip', '&format=columnar', {'Accept-Encoding': 'gzip'}),
+    ('columnar lean br', '&format=columnar&fields=lean', {'Accept-Encoding': 'br'}),
+    ('msgpack columnar br', '&format=columnar', {'Accept': 'application/x-msgpack', 'Accept-Encoding': 'br'}),
+)
+
+
+def run(n_positions: int) -> List[Dict[str, Any]]:
+    m = load_app('official')
+    m.app.config['RESPONSE_CACHE_SIZE'] = 0
+    codec = sys.modules['snapshot_codec']
+    with m.app.app_context():
+        seed(m, n_positions)
+    client = m.app.test_client()
+    url = f'/api/positions?date={date(1150, 6, 1).isoformat()}'
+    rows = client.get(url).get_json()
+    columnar = client.get(url + '&format=columnar').get_json()
+    assert codec.from_columnar(columnar) == rows, '列式结果无法还原为原始快照'
+
+    results = []
+    for name, query, headers in VARIANTS:
+        if 'msgpack' in headers.get('Accept', '') and codec.msgpack is None:
+            continue
+        if headers.get('Accept-Encoding') == 'br' and codec.brotli is None:
+            continue
+        response = client.get(url + query, headers=headers)
+        assert response.status_code == 200
+        body = response.get_data()
+        if response.headers.get('Content-Encoding') == 'gzip':
+            assert gzip.decompress(body)
+        timing = timed(lambda: client.get(url + query, headers=headers))
+        results.append({
+            'positions': n_positions, 'variant': name, 'bytes': len(body),
+            'content_type': response.mimetype, 'content_encoding': response.headers.get('Content-Encoding'),
+            **timing,
+        })
+    return results
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 5000]
+    for n in sizes:
+        for row in run(n):
+            print(json.dumps(row, ensure_ascii=False))
@@ -0,0 +1,55 @@
+# benchmarks/compare_results.py 文件
+# 对比两次 bench_routes.py 的结果：逐接口列出 p50/p99 延迟、SQL 语句数与内存峰值的变化，
+# 延迟超过阈值倍数或语句数增加的接口标记为回退，存在回退时以状态码 1 退出（可用于 CI）。
+#
+# 用法: python benchmarks/compare_results.py 基准.json 新结果.json [--threshold 1.2]
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+METRICS = ('p50_ms', 'p99_ms', 'queries_p50', 'peak_rss_mb')
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    rows = []
+    for route in sorted(set(base['routes']) | set(new['routes'])):
+        old_stats, new_stats = base['routes'].get(route), new['routes'].get(route)
+        row: Dict[str, Any] = {'route': route}
+        if old_stats is None or new_stats is None:
+            row['status'] = 'added' if old_stats is None else 'removed'
+            rows.append(row)
+            continue
+        for metric in METRICS:
+            old, current = old_stats.get(metric), new_stats.get(metric)
+            row[metric] = [old, current]
+            if old and current is not None:
+                row[f'{metric}_ratio'] = round(current / old, 2)
+        regressed = (
+            row.get('p50_ms_ratio', 1) > threshold
+            or new_stats['queries_p50'] > old_stats['queries_p50']
+            or new_stats['errors'] > old_stats['errors']
+        )
+        row['status'] = 'regressed' if regressed else 'ok'
+        rows.append(row)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='对比两次接口基准的结果')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=1.2, help='p50 延迟超过基准的倍数即视为回退')
+    args = parser.parse_args()
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+    for key in ('app', 'size', 'seed'):
+        if base['meta'][key] != new['meta'][key]:
+            print(f'警告: 两次结果的 {key} 不同（{base["meta"][key]} / {new["meta"][key]}）', file=sys.stderr)
+    rows = compare(base, new, args.threshold)
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+    sys.exit(1 if any(row['status'] == 'regressed' for row in rows) else 0)
@@ -0,0 +1,282 @@
+# benchmarks/datagen.py 文件
+# 合成数据集：按朝代生成两套后端的数据，规模由职位数决定（1k ~ 1M）。
+#   层级     每个朝代若干根职位，其余职位挂在上一层的随机职位下，层数可达 max_depth
+#   任职     官员按「仕途」依次出任同一朝代的若干职位，任期 1~8 年，同一职位的任职前后重叠
+#   职能     每个职位 1~3 条职能沿革，日期落在朝代区间内
+#   关系     每个职位平均 density 条关系，多数连向同一朝代的职位
+#   图片     在线版按 image_ratio 的比例给职位附上 Base64 PNG（旧数据格式，存于 image 列）
+# 数据直接用 Core executemany 写入，写完后重建闭包表、全文检索等派生数据。
+# 生成的数据库按 (后端, 规模, 种子, 生成器版本) 缓存在 data_dir 中，重复运行时复制一份使用。
+#
+# 用法: python benchmarks/datagen.py --app official --size 100000 [--seed 1] [--data-dir DIR]
+
+import argparse
+import base64
+import json
+import os
+import random
+import shutil
+import struct
+import tempfile
+import time
+import uuid
+import zlib
+from datetime import date
+from typing import Any, Dict, Iterator, List, Tuple
+
+from _common import APP_PATHS, load_app
+
+DATASET_VERSION = 1
+CHUNK_SIZE = 10000
+
+DYNASTIES = (
+    ('唐', 618, 907), ('五代', 907, 960), ('北宋', 960, 1127), ('南宋', 1127, 1279),
+    ('元', 1271, 1368), ('明', 1368, 1644), ('清', 1644, 1911),
+)
+DEPARTMENTS = ('中书省', '门下省', '尚书省', '吏部', '户部', '礼部', '兵部', '刑部', '工部', '枢密院',
+               '御史台', '翰林院', '三司', '大理寺', '太常寺', '国子监', '开封府', '江南东路', '两浙路', '河北路')
+TITLES = ('令', '尚书', '侍郎', '郎中', '员外郎', '主事', '学士', '知府', '通判', '知县', '参军', '判官', '推官')
+SURNAMES = '赵钱孙李周吴郑王冯陈褚卫蒋沈韩杨朱秦尤许何吕施张孔曹严华金魏陶姜欧阳司马上官范苏'
+GIVEN = '光安石轼辙修巩拱辰仲淹居正廷玉文正之道德明远弼琦绛纯仁彦博'
+PHRASES = ('掌邦国之政令', '总判省事', '掌天下官吏选授', '掌天下户口钱粮', '掌礼仪祭享', '掌兵籍军令',
+           '掌刑法狱讼', '掌百工营造', '掌文书制诰', '纠察百官', '劝农桑', '理词讼', '掌出纳')
+CONNECTION_LABELS = ('统属', '兼领', '监察', '协理', '改隶')
+CATEGORIES = ('文官', '武官', '内官', '地方')
+RANKS = tuple(f'{grade}{n}品' for n in '一二三四五六七八九' for grade in ('正', '从'))
+RELATIONSHIP_TYPES = ('上下级', '平级', '监察', '兼任')
+
+
+def dataset_path(kind: str, size: int, seed: int, data_dir: str) -> str:
+    return os.path.join(data_dir, f'{kind}-{size}-s{seed}-v{DATASET_VERSION}.db')
+
+
+def _chunks(rows: Iterator[Dict[str, Any]], size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(m: Any, model: Any, rows: Iterator[Dict[str, Any]]) -> int:
+    count = 0
+    for chunk in _chunks(rows):
+        m.db.session.execute(model.__table__.insert(), chunk)
+        count += len(chunk)
+    m.db.session.commit()
+    return count
+
+
+def _random_date(rng: random.Random, first_year: int, last_year: int) -> date:
+    return date(rng.randint(first_year, last_year), rng.randint(1, 12), rng.randint(1, 28))
+
+
+def _name(rng: random.Random) -> str:
+    return rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN) for _ in range(rng.randint(1, 2)))
+
+
+def _description(rng: random.Random) -> str:
+    return '，'.join(rng.choice(PHRASES) for _ in range(rng.randint(2, 6)))
+
+
+class Hierarchy:
+    """按朝代分层挂接职位：新职位随机选一层，父职位取自上一层；根职位每个朝代若干个。"""
+
+    def __init__(self, rng: random.Random, max_depth: int) -> None:
+        self.rng = rng
+        self.max_depth = max_depth
+        self.levels: Dict[int, List[List[Any]]] = {}
+        self.members: Dict[int, List[Any]] = {}
+
+    def add(self, dynasty: int, node_id: Any) -> Any:
+        levels = self.levels.setdefault(dynasty, [])
+        self.members.setdefault(dynasty, []).append(node_id)
+        if len(levels) < 1 or (len(levels[0]) < 3 and self.rng.random() < 0.5):
+            depth = 0
+        else:
+            # 越深的层职位越多：取 [1, 当前层数] 内偏向深层的层号
+            depth = min(len(levels), self.max_depth - 1,
+                        max(1, int(len(levels) * self.rng.random() ** 0.5) + 1))
+        while len(levels) <= depth:
+            levels.append([])
+        levels[depth].append(node_id)
+        return self.rng.choice(levels[depth - 1]) if depth else None
+
+    def pick(self, dynasty: int) -> Any:
+        return self.rng.choice(self.members[dynasty])
+
+
+def _png(width: int, height: int, rng: random.Random) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    color = bytes(rng.randrange(256) for _ in range(3))
+    raw = b''.join(b'\x00' + b''.join(
+        color if rng.random() < 0.7 else bytes(rng.randrange(256) for _ in range(3)) for _ in range(width)
+    ) for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def generate_official(m: Any, size: int, seed: int, max_depth: int = 12, density: float = 2.0) -> Dict[str, int]:
+    rng = random.Random(seed)
+    hierarchy = Hierarchy(rng, max_depth)
+    dynasty_of: List[int] = [0] * (size + 1)
+
+    def positions() -> Iterator[Dict[str, Any]]:
+        for pid in range(1, size + 1):
+            dynasty = rng.randrange(len(DYNASTIES))
+            dynasty_of[pid] = dynasty
+            parent = hierarchy.add(dynasty, pid)
+            yield {'id': pid, 'name': DYNASTIES[dynasty][0] + rng.choice(DEPARTMENTS) + rng.choice(TITLES),
+                   'parent_id': parent}
+
+    def functions() -> Iterator[Dict[str, Any]]:
+        for pid in range(1, size + 1):
+            _, first, last = DYNASTIES[dynasty_of[pid]]
+            for _ in range(rng.randint(1, 3)):
+                yield {'position_id': pid, 'date': _random_date(rng, first, last),
+                       'description': _description(rng), 'source_text': _description(rng),
+                       'source_reference': f'《{DYNASTIES[dynasty_of[pid]][0]}史·职官志》'}
+
+    def officials() -> Iterator[Dict[str, Any]]:
+        for oid in range(1, size + 1):
+            yield {'id': oid, 'name': _name(rng), 'bio': _description(rng) if rng.random() < 0.6 else None}
+
+    def appointments() -> Iterator[Dict[str, Any]]:
+        # 每位官员一段仕途：依次出任同朝代的若干职位，任期之间可能有间隔
+        for oid in range(1, size + 1):
+            dynasty = rng.randrange(len(DYNASTIES))
+            _, first, last = DYNASTIES[dynasty]
+            year = rng.randint(first, max(first, last - 20))
+            for _ in range(rng.randint(1, 6)):
+                start = _random_date(rng, year, year)
+                year = min(year + rng.randint(1, 8), last)
+                end = None if rng.random() < 0.05 else _random_date(rng, year, year)
+                if end is not None and end < start:
+                    end = start
+                yield {'position_id': hierarchy.pick(dynasty), 'official_id': oid, 'start_date': start,
+                       'end_date': end, 'source_text': None, 'source_reference': None}
+                if end is None or year >= last:
+                    break
+                year += rng.randint(0, 2)
+
+    def connections() -> Iterator[Dict[str, Any]]:
+        for _ in range(int(size * density)):
+            source = rng.randrange(1, size + 1)
+            dynasty = dynasty_of[source] if rng.random() < 0.8 else rng.randrange(len(DYNASTIES))
+            _, first, last = DYNASTIES[dynasty]
+            yield {'from_position_id': source, 'to_position_id': hierarchy.pick(dynasty),
+                   'date': _random_date(rng, first, last), 'label': rng.choice(CONNECTION_LABELS),
+                   'color': None, 'style': None, 'is_visible': rng.random() < 0.9,
+                   'source_text': None, 'source_reference': None}
+
+    counts = {
+        'position': _insert(m, m.Position, positions()),
+        'position_function': _insert(m, m.PositionFunction, functions()),
+        'official': _insert(m, m.Official, officials()),
+        'appointment': _insert(m, m.Appointment, appointments()),
+        'connection': _insert(m, m.Connection, connections()),
+    }
+    m.rebuild_closure()
+    if m.search_enabled():
+        m.rebuild_search_index()
+    if m.as_of_view_available():
+        m.rebuild_as_of_view()
+    if m.career_summary_available():
+        m.refresh_career_summaries(m.db.session.connection())
+    m.db.session.commit()
+    m.after_bulk_write()
+    return counts
+
+
+def generate_online(m: Any, size: int, seed: int, max_depth: int = 12, density: float = 2.0,
+                    image_ratio: float = 0.05) -> Dict[str, int]:
+    rng = random.Random(seed)
+    hierarchy = Hierarchy(rng, max_depth)
+    images = [base64.b64encode(_png(rng.choice((32, 48, 64)), rng.choice((32, 48, 64)), rng)).decode('ascii')
+              for _ in range(256)]
+    dynasty_of: Dict[str, int] = {}
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def positions() -> Iterator[Dict[str, Any]]:
+        for _ in range(size):
+            pid = new_id()
+            dynasty = rng.randrange(len(DYNASTIES))
+            dynasty_of[pid] = dynasty
+            name, first, last = DYNASTIES[dynasty]
+            start = rng.randint(first, last)
+            yield {
+                'id': pid, 'name': rng.choice(DEPARTMENTS) + rng.choice(TITLES), 'dynasty': name,
+                'category': rng.choice(CATEGORIES), 'description': _description(rng),
+                'start_year': start, 'end_year': rng.randint(start, last) if rng.random() < 0.9 else None,
+                'rank': rng.choice(RANKS), 'superior_id': hierarchy.add(dynasty, pid),
+                'image': rng.choice(images) if rng.random() < image_ratio else None, 'image_hash': None,
+            }
+
+    def relationships() -> Iterator[Dict[str, Any]]:
+        ids = list(dynasty_of)
+        for _ in range(int(size * density)):
+            source = rng.choice(ids)
+            dynasty = dynasty_of[source] if rng.random() < 0.8 else rng.randrange(len(DYNASTIES))
+            yield {'id': new_id(), 'source_id': source, 'target_id': hierarchy.pick(dynasty),
+                   'relationship_type': rng.choice(RELATIONSHIP_TYPES),
+                   'description': _description(rng) if rng.random() < 0.3 else None}
+
+    counts = {
+        'position': _insert(m, m.Position, positions()),
+        'relationship': _insert(m, m.Relationship, relationships()),
+    }
+    m.rebuild_closure()
+    if m.search_enabled() or m.search_index.fts5_available(m.db.session.connection()):
+        m.rebuild_search_index()
+    m.db.session.commit()
+    m.invalidate_relationship_graph()
+    return counts
+
+
+GENERATORS = {'official': generate_official, 'online': generate_online}
+
+
+def load_dataset(kind: str, size: int, seed: int = 1, data_dir: str = '') -> Tuple[Any, Dict[str, Any]]:
+    """加载（必要时先生成）合成数据集，返回 (app 模块, 数据集信息)。
+
+    缓存中保留生成时的原始数据库，每次运行使用其临时副本，写接口的基准不会改动缓存。
+    """
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), 'song-bench-data')
+    os.makedirs(data_dir, exist_ok=True)
+    path = dataset_path(kind, size, seed, data_dir)
+    info_path = path + '.json'
+    work_path = os.path.join(tempfile.mkdtemp(prefix=f'bench-{kind}-'), 'bench.db')
+    if os.path.exists(path) and os.path.exists(info_path):
+        shutil.copyfile(path, work_path)
+        with open(info_path, encoding='utf-8') as f:
+            return load_app(kind, work_path), json.load(f)
+
+    m = load_app(kind, work_path)
+    start = time.perf_counter()
+    with m.app.app_context():
+        counts = GENERATORS[kind](m, size, seed)
+        # 合并 WAL 后再复制，缓存中只需要一个文件
+        m.db.session.execute(m.db.text('PRAGMA wal_checkpoint(TRUNCATE)'))
+        m.db.session.commit()
+    shutil.copyfile(work_path, path)
+    info = {'path': path, 'size': size, 'seed': seed, 'version': DATASET_VERSION, 'rows': counts,
+            'generate_s': round(time.perf_counter() - start, 2)}
+    with open(info_path, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+    return m, info
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='生成合成数据集')
+    parser.add_argument('--app', choices=sorted(APP_PATHS), default='official')
+    parser.add_argument('--size', type=int, default=10000, help='职位数')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', default='')
+    args = parser.parse_args()
+    print(json.dumps(load_dataset(args.app, args.size, args.seed, args.data_dir)[1], ensure_ascii=False))
@@ -0,0 +1,184 @@
+# benchmarks/load_test.py 文件
+# 并发压测：用 gunicorn（gunicorn.conf.py）启动后端，若干读线程持续请求只读接口，
+# 同时写线程不断提交，统计读吞吐量与延迟分位数。默认分别在 WAL 与回滚日志（DELETE）模式下各跑一次，
+# 以便对照「写入进行中时读请求是否被阻塞」。
+#
+# 用法: python benchmarks/load_test.py [--app official|online] [--journal WAL --journal DELETE]
+#                                     [--readers 16] [--writers 1] [--duration 10] [--rows 2000]
+#                                     [--workers 2] [--threads 4]
+
+import argparse
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Callable, Dict, List, Tuple
+
+from _common import APP_PATHS, load_app
+
+
+def seed(kind: str, db_path: str, n_rows: int) -> None:
+    m = load_app(kind, db_path)
+    header, lines = (
+        ('name,parent_id', (f'职位{i},{(i - 2) // 4 + 1 if i > 1 else ""}' for i in range(1, n_rows + 1)))
+        if kind == 'official' else
+        ('id,name,superior_id,description,start_year', (
+            f'p{i},职位{i},{f"p{(i - 2) // 4 + 1}" if i > 1 else ""},掌诏令第{i},{960 + i % 300}'
+            for i in range(1, n_rows + 1)
+        ))
+    )
+    with m.app.app_context():
+        m.import_records('positions', io.BytesIO((header + '\n' + '\n'.join(lines) + '\n').encode('utf-8')), 'csv')
+        if kind == 'official':
+            m.import_records('officials', io.BytesIO(('name,bio\n' + '\n'.join(
+                f'官员{i},拜中书令{i}' for i in range(n_rows)) + '\n').encode('utf-8')), 'csv')
+            m.import_records('appointments', io.BytesIO(('position_id,official_id,start_date,end_date\n' + '\n'.join(
+                f'{i % n_rows + 1},{i % n_rows + 1},{1000 + i % 200}-01-01,{1005 + i % 200}-01-01'
+                for i in range(n_rows * 2)) + '\n').encode('utf-8')), 'csv')
+        m.db.engine.dispose()
+
+
+def read_paths(kind: str, n_rows: int, rng: random.Random) -> str:
+    pid = rng.randrange(1, n_rows + 1)
+    if kind == 'official':
+        return rng.choice((
+            f'/api/positions?date={1000 + rng.randrange(200)}-06-01',
+            f'/api/positions/{pid}/subtree?max_depth=2',
+            f'/api/appointments/active?date={1000 + rng.randrange(200)}-06-01&position_id={pid}',
+            '/api/search?q=中书',
+        ))
+    return rng.choice((
+        f'/api/positions?limit=100&after=p{pid}',
+        f'/api/positions/p{pid}/subtree?max_depth=2',
+        '/api/search?q=诏令',
+    ))
+
+
+def write_request(kind: str, n_rows: int, rng: random.Random, i: int) -> Tuple[str, str, Dict[str, Any]]:
+    if kind == 'official':
+        if i % 2:
+            oid = rng.randrange(1, n_rows + 1)
+            return 'PUT', f'/api/officials/{oid}', {'name': f'官员{oid}', 'bio': f'改任{i}'}
+        return 'POST', '/api/positions', {'name': f'新职位{i}', 'parent_id': rng.randrange(1, n_rows + 1)}
+    if i % 2:
+        return 'PUT', f'/api/positions/p{rng.randrange(1, n_rows + 1)}', {'description': f'改任{i}'}
+    return 'POST', '/api/positions', {'name': f'新职位{i}', 'superior_id': f'p{rng.randrange(1, n_rows + 1)}'}
+
+
+def request(base: str, method: str, path: str, body: Any = None) -> None:
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    req = urllib.request.Request(base + urllib.parse.quote(path, safe='/?=&'), data=data, method=method,
+                                 headers={'Content-Type': 'application/json'} if data else {})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        response.read()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind: str, db_path: str, journal: str, workers: int, threads: int) -> Tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', PORT=str(port), WEB_CONCURRENCY=str(workers),
+               WEB_THREADS=str(threads), SQLITE_JOURNAL_MODE=journal)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=os.path.dirname(APP_PATHS[kind]), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            request(base, 'GET', '/api/positions?limit=1')
+            return server, base
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('服务器未能在 30 秒内启动')
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    return round(samples[min(len(samples) - 1, int(len(samples) * p))], 2)
+
+
+def run(kind: str, journal: str, readers: int, writers: int, duration: float, n_rows: int,
+        workers: int, threads: int) -> Dict[str, Any]:
+    os.environ['SQLITE_JOURNAL_MODE'] = journal
+    db_path = os.path.join(tempfile.mkdtemp(prefix=f'load-{kind}-'), 'load.db')
+    seed(kind, db_path, n_rows)
+    server, base = start_server(kind, db_path, journal, workers, threads)
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats: Dict[str, List[Any]] = {'read_ms': [], 'write_ms': [], 'read_errors': [], 'write_errors': []}
+
+    def loop(name: str, seed_value: int, make: Callable[[random.Random, int], Tuple[str, str, Any]]) -> None:
+        rng = random.Random(seed_value)
+        i = 0
+        while not stop.is_set():
+            method, path, body = make(rng, i)
+            start = time.perf_counter()
+            try:
+                request(base, method, path, body)
+                with lock:
+                    stats[f'{name}_ms'].append((time.perf_counter() - start) * 1000)
+            except Exception as e:  # 统计错误（超时、database is locked 导致的 500 等）后继续
+                with lock:
+                    stats[f'{name}_errors'].append(repr(e))
+            i += 1
+
+    threads_list = [
+        threading.Thread(target=loop, args=('read', n, lambda rng, i: ('GET', read_paths(kind, n_rows, rng), None)))
+        for n in range(readers)
+    ] + [
+        threading.Thread(target=loop, args=('write', 1000 + n, lambda rng, i: write_request(kind, n_rows, rng, i)))
+        for n in range(writers)
+    ]
+    try:
+        for t in threads_list:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads_list:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    reads, writes = sorted(stats['read_ms']), sorted(stats['write_ms'])
+    return {
+        'app': kind, 'journal_mode': journal, 'workers': workers, 'threads': threads,
+        'readers': readers, 'writers': writers, 'duration_s': duration,
+        'reads_per_sec': round(len(reads) / duration, 1),
+        'read_p50_ms': _percentile(reads, 0.5), 'read_p99_ms': _percentile(reads, 0.99),
+        'writes_per_sec': round(len(writes) / duration, 1),
+        'write_p50_ms': _percentile(writes, 0.5), 'write_p99_ms': _percentile(writes, 0.99),
+        'read_errors': len(stats['read_errors']), 'write_errors': len(stats['write_errors']),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='并发读写压测')
+    parser.add_argument('--app', choices=sorted(APP_PATHS), default='official')
+    parser.add_argument('--journal', action='append', choices=['WAL', 'DELETE'])
+    parser.add_argument('--readers', type=int, default=16)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+    for mode in args.journal or ['WAL', 'DELETE']:
+        print(json.dumps(run(args.app, mode, args.readers, args.writers, args.duration, args.rows,
+                             args.workers, args.threads), ensure_ascii=False))
@@ -2,17 +2,65 @@
 
 # 1. 导入CORS模块（在文件顶部添加）
 from flask_cors import CORS  # 添加这一行
-from flask import Flask, request, jsonify, Response, make_response
+from flask import Flask, request, jsonify, Response, make_response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, date
+from sqlalchemy import event, func, select, insert, delete, literal, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
+from datetime import datetime, date, timedelta
+from collections import OrderedDict
+from bisect import bisect_right
+from itertools import groupby
+import hashlib
+import heapq
 import json
-from typing import List, Dict, Any, Optional, Union
-from lunardate import LunarDate
+import os
+import threading
+from typing import List, Dict, Any, Optional, Union, Callable, Tuple, Iterator, Iterable, Set
+from interval_index import AppointmentIntervalIndex
+from as_of_view import position_intervals
+import career
+from graph_index import GraphIndex
+from bulk_import import DEFAULT_CHUNK_SIZE, ImportReport, detect_format, read_rows, run_import
+import click
+from lunar_table import lunar_from_solar, ganzhi_day, get_table
+import era_calendar
+from db_config import engine_options, normalize_url, tune_engine
+import snapshot_codec
+import change_feed
+import tree_layout
+from instrumentation import init_instrumentation
+import search_index
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:8000"], supports_credentials=True)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///official_positions.db'
+# 优先使用环境变量中的 DATABASE_URL（便于基准测试和部署），否则使用本地 SQLite
+app.config['SQLALCHEMY_DATABASE_URI'] = normalize_url(os.environ.get('DATABASE_URL', 'sqlite:///official_positions.db'))
+# 连接池按每个工作进程的线程数确定大小，见 db_config.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+# 可选的进程内任职区间索引（每个进程各自维护一份）
+app.config['APPOINTMENT_INTERVAL_INDEX'] = os.environ.get('APPOINTMENT_INTERVAL_INDEX') == '1'
+# 时间轴接口响应缓存的条目上限（LRU），0 表示关闭缓存
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', '256'))
+# 可选的请求级性能统计（SQL 语句数、数据库与序列化耗时），开启后输出 Server-Timing 头并提供 /metrics；
+# 单个请求的 SQL 语句数超过阈值时记录警告，0 表示不检查
+app.config['INSTRUMENTATION'] = os.environ.get('INSTRUMENTATION') == '1'
+app.config['QUERY_COUNT_THRESHOLD'] = int(os.environ.get('QUERY_COUNT_THRESHOLD', '50'))
+# 读多写少的部署可开启「某日视图」物化表：GET /api/positions?date= 改为一次区间查询，
+# 写入后由后台线程重算受影响的职位；AS_OF_VIEW_POLL_SECONDS 为后台线程检查待重算登记的间隔
+app.config['AS_OF_VIEW'] = os.environ.get('AS_OF_VIEW') == '1'
+app.config['AS_OF_VIEW_POLL_SECONDS'] = float(os.environ.get('AS_OF_VIEW_POLL_SECONDS', '5'))
+# 变更推送（/api/changes/stream）：无本进程提交时检查新变更的间隔，以及单个连接的最长时间（到期后客户端自动续传）
+app.config['CHANGE_STREAM_POLL_SECONDS'] = float(os.environ.get('CHANGE_STREAM_POLL_SECONDS', '1'))
+app.config['CHANGE_STREAM_MAX_SECONDS'] = float(os.environ.get('CHANGE_STREAM_MAX_SECONDS', '120'))
+# 组织图布局接口（/api/layout）按日期缓存的组织图数量（LRU），0 表示关闭缓存
+app.config['LAYOUT_CACHE_SIZE'] = int(os.environ.get('LAYOUT_CACHE_SIZE', '16'))
 db = SQLAlchemy(app)
+with app.app_context():
+    tune_engine(db.engine)  # SQLite：WAL 与 pragma
+    if app.config['INSTRUMENTATION']:
+        init_instrumentation(app, db.engine, app.config['QUERY_COUNT_THRESHOLD'])
 
 # 数据模型
 class Position(db.Model):
@@ -25,6 +73,10 @@ class Position(db.Model):
         return {'id': self.id, 'name': self.name, 'parent_id': self.parent_id}
 
 class PositionFunction(db.Model):
+    __table_args__ = (
+        db.Index('ix_position_function_position_date', 'position_id', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     position_id = db.Column(db.Integer, db.ForeignKey('position.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
@@ -52,6 +104,11 @@ class Official(db.Model):
         return {'id': self.id, 'name': self.name, 'bio': self.bio}
 
 class Appointment(db.Model):
+    __table_args__ = (
+        db.Index('ix_appointment_position_period', 'position_id', 'start_date', 'end_date'),
+        db.Index('ix_appointment_official_start', 'official_id', 'start_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     position_id = db.Column(db.Integer, db.ForeignKey('position.id'), nullable=False)
     official_id = db.Column(db.Integer, db.ForeignKey('official.id'), nullable=False)
@@ -75,6 +132,10 @@ class Appointment(db.Model):
         }
 
 class Connection(db.Model):
+    __table_args__ = (
+        db.Index('ix_connection_date', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     from_position_id = db.Column(db.Integer, db.ForeignKey('position.id'), nullable=False)
     to_position_id = db.Column(db.Integer, db.ForeignKey('position.id'), nullable=False)
@@ -103,29 +164,1427 @@ class Connection(db.Model):
             'source_reference': self.source_reference
         }
 
+class PositionClosure(db.Model):
+    # 层级闭包表：每对 (祖先, 后代) 一行，depth 为相隔层数，自身到自身为 0
+    __table_args__ = (
+        db.Index('ix_position_closure_descendant', 'descendant_id', 'depth'),
+    )
+
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('position.id'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('position.id'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+class PositionInterval(db.Model):
+    # 「某日视图」物化表：每个职位按职能/任职的变化切分为闭区间 [valid_from, valid_to]，
+    # snapshot 为区间内该职位在 GET /api/positions?date= 中的条目（JSON）
+    __table_args__ = (
+        db.Index('ix_position_interval_period', 'valid_from', 'valid_to'),
+    )
+
+    position_id = db.Column(db.Integer, db.ForeignKey('position.id'), primary_key=True)
+    valid_from = db.Column(db.Date, primary_key=True)
+    valid_to = db.Column(db.Date, nullable=False)
+    function_id = db.Column(db.Integer)
+    official_ids = db.Column(db.Text, nullable=False)  # JSON 数组，按任职 id 排序
+    snapshot = db.Column(db.Text, nullable=False)
+
+class PositionIntervalPending(db.Model):
+    # 待重算的职位：写入时在同一事务内登记，后台线程重算后删除（同一职位只登记一次，已登记时忽略）
+    id = db.Column(db.Integer, primary_key=True)
+    position_id = db.Column(db.Integer, nullable=False, index=True, unique=True)
+
+class OfficialCareerSummary(db.Model):
+    # 仕历摘要表：每名有任职记录的官员一行，字段含义见 career.summarize
+    official_id = db.Column(db.Integer, db.ForeignKey('official.id'), primary_key=True)
+    appointment_count = db.Column(db.Integer, nullable=False)
+    position_count = db.Column(db.Integer, nullable=False)
+    first_start = db.Column(db.Date)
+    last_end = db.Column(db.Date)
+    open_since = db.Column(db.Date)
+    closed_tenure_days = db.Column(db.Integer, nullable=False)
+    max_concurrent = db.Column(db.Integer, nullable=False)
+    concurrent_appointments = db.Column(db.Integer, nullable=False)
+    gap_count = db.Column(db.Integer, nullable=False)
+    longest_gap_days = db.Column(db.Integer, nullable=False)
+    total_gap_days = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self, as_of: date) -> Dict[str, Any]:
+        summary = {column.name: getattr(self, column.name) for column in self.__table__.columns}
+        return _summary_dict(summary, as_of)
+
+class ChangeLog(db.Model):
+    # 变更日志：每次写入的实体一行，seq 单调递增（AUTOINCREMENT，清理旧记录后也不复用）
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    seq = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer)
+    op = db.Column(db.String(10), nullable=False)  # insert / update / delete / reload
+    data = db.Column(db.Text)  # 变更后的条目（JSON），删除时只含 id
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'seq': self.seq,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'op': self.op,
+            'data': json.loads(self.data) if self.data else None,
+            'created_at': self.created_at.isoformat()
+        }
+
+class SchemaMigration(db.Model):
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# 数据库迁移：按版本号顺序执行，已执行的版本记录在 schema_migration 表中
+def _migration_create_tables() -> None:
+    db.create_all()
+
+def _migration_temporal_indexes() -> None:
+    # 旧数据库中表已存在，create_all 不会补建索引，这里逐个检查创建
+    for model in (PositionFunction, Appointment, Connection):
+        for index in model.__table__.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def _migration_position_closure() -> None:
+    PositionClosure.__table__.create(db.engine, checkfirst=True)
+    rebuild_closure()
+
+def _migration_search_index() -> None:
+    # 非 SQLite 或未编译 FTS5 时跳过，检索接口返回 503
+    if search_index.fts5_available(db.session.connection()):
+        rebuild_search_index()
+
+def _migration_as_of_view() -> None:
+    PositionInterval.__table__.create(db.engine, checkfirst=True)
+    PositionIntervalPending.__table__.create(db.engine, checkfirst=True)
+    rebuild_as_of_view()
+
+def _migration_career_summary() -> None:
+    OfficialCareerSummary.__table__.create(db.engine, checkfirst=True)
+    _career_state['available'] = True
+    refresh_career_summaries(db.session.connection())
+
+def _migration_change_log() -> None:
+    ChangeLog.__table__.create(db.engine, checkfirst=True)
+    _change_log_state['available'] = True
+
+def _migration_as_of_pending_unique() -> None:
+    # 同一职位只保留最早的一条登记，再把 position_id 上的普通索引换成唯一索引
+    table = PositionIntervalPending.__table__
+    connection = db.session.connection()
+    if not inspect(connection).has_table(table.name):
+        return
+    db.session.execute(delete(table).where(table.c.id.not_in(
+        select(func.min(table.c.id)).group_by(table.c.position_id)
+    )))
+    for index in table.indexes:
+        index.drop(connection, checkfirst=True)
+        index.create(connection)
+
+MIGRATIONS = [
+    (1, '初始表结构', _migration_create_tables),
+    (2, '职能/任职/关系的时间复合索引', _migration_temporal_indexes),
+    (3, '职位层级闭包表', _migration_position_closure),
+    (4, '全文检索索引（FTS5）', _migration_search_index),
+    (5, '某日视图物化表', _migration_as_of_view),
+    (6, '官员仕历摘要表', _migration_career_summary),
+    (7, '变更日志', _migration_change_log),
+    (8, '某日视图登记表按职位去重', _migration_as_of_pending_unique),
+]
+
+def migrate_db() -> List[int]:
+    SchemaMigration.__table__.create(db.engine, checkfirst=True)
+    applied = {m.version for m in SchemaMigration.query.all()}
+    executed = []
+    for version, description, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        migration()
+        db.session.add(SchemaMigration(version=version, description=description))
+        db.session.commit()
+        executed.append(version)
+    return executed
+
+@app.cli.command('migrate-db')
+def migrate_db_command() -> None:
+    executed = migrate_db()
+    print(f"已执行迁移: {executed}" if executed else "数据库已是最新版本")
+
+# 层级闭包表维护：新增、移动职位时在同一事务内更新，整体重建用递归 CTE 一条语句完成
+MAX_HIERARCHY_DEPTH = 1000  # 递归深度上限，防止历史数据中已有的环导致无限递归
+
+def rebuild_closure() -> None:
+    child = aliased(Position)
+    tree = select(
+        Position.id.label('ancestor_id'), Position.id.label('descendant_id'), literal(0).label('depth')
+    ).cte('tree', recursive=True)
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, child.id, tree.c.depth + 1)
+        .select_from(tree)
+        .join(child, child.parent_id == tree.c.descendant_id)
+        .where(tree.c.depth < MAX_HIERARCHY_DEPTH)
+    )
+    db.session.execute(delete(PositionClosure))
+    db.session.execute(insert(PositionClosure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(tree.c.ancestor_id, tree.c.descendant_id, func.min(tree.c.depth))
+        .group_by(tree.c.ancestor_id, tree.c.descendant_id)
+    ))
+
+def closure_add(position_id: int, parent_id: Optional[int]) -> None:
+    db.session.execute(insert(PositionClosure).values(
+        ancestor_id=position_id, descendant_id=position_id, depth=0
+    ))
+    if parent_id is not None:
+        db.session.execute(insert(PositionClosure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(PositionClosure.ancestor_id, literal(position_id), PositionClosure.depth + 1)
+            .where(PositionClosure.descendant_id == parent_id)
+        ))
+
+def closure_move(position_id: int, new_parent_id: Optional[int]) -> None:
+    # 断开子树与原祖先的联系，再把新祖先与子树的每个节点两两相连
+    subtree = select(PositionClosure.descendant_id).where(PositionClosure.ancestor_id == position_id)
+    db.session.execute(delete(PositionClosure).where(
+        PositionClosure.descendant_id.in_(subtree),
+        PositionClosure.ancestor_id.not_in(subtree)
+    ))
+    if new_parent_id is not None:
+        ancestors = aliased(PositionClosure)
+        descendants = aliased(PositionClosure)
+        db.session.execute(insert(PositionClosure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(ancestors.ancestor_id, descendants.descendant_id, ancestors.depth + descendants.depth + 1)
+            .select_from(ancestors)
+            .join(descendants, descendants.ancestor_id == position_id)
+            .where(ancestors.descendant_id == new_parent_id)
+        ))
+
+def creates_cycle(position_id: int, new_parent_id: Optional[int]) -> bool:
+    if new_parent_id is None:
+        return False
+    return new_parent_id == position_id or db.session.query(PositionClosure.query.filter(
+        PositionClosure.ancestor_id == position_id,
+        PositionClosure.descendant_id == new_parent_id
+    ).exists()).scalar()
+
+# 任职区间索引：首次使用时从数据库加载，之后随提交增量更新（其他进程的提交见 sync_change_log）
+appointment_index = AppointmentIntervalIndex()
+_appointment_index_state = {'loaded': False}
+
+def get_appointment_index() -> AppointmentIntervalIndex:
+    if not _appointment_index_state['loaded']:
+        appointment_index.load(db.session.query(
+            Appointment.id, Appointment.position_id, Appointment.official_id,
+            Appointment.start_date, Appointment.end_date
+        ).all())
+        _appointment_index_state['loaded'] = True
+    return appointment_index
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_appointment_changes(session: Any, flush_context: Any) -> None:
+    if not _appointment_index_state['loaded']:
+        return
+    changes = session.info.setdefault('appointment_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Appointment):
+            changes[obj.id] = (obj.id, obj.position_id, obj.official_id, obj.start_date, obj.end_date)
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            changes[obj.id] = None
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_appointment_changes(session: Any) -> None:
+    for appointment_id, row in session.info.pop('appointment_changes', {}).items():
+        if row is None:
+            appointment_index.remove(appointment_id)
+        else:
+            appointment_index.upsert(*row)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_appointment_changes(session: Any) -> None:
+    session.info.pop('appointment_changes', None)
+
+# 响应缓存：按「生效时点」缓存时间轴接口的 JSON。
+# 生效时点 = 不晚于目标日期的最后一个变化点；两个日期之间没有变化点时结果必然相同，共用一份缓存。
+# 任何提交都会递增全局数据版本，使缓存和变化点列表失效（版本仅在本进程内有效）。
+_cache_lock = threading.Lock()
+_cache_state: Dict[str, Any] = {'version': 0, 'change_points': {}, 'change_seq': None}
+response_cache: 'OrderedDict[Tuple[Any, ...], Tuple[bytes, str, str, Optional[str]]]' = OrderedDict()
+
+def bump_data_version() -> int:
+    with _cache_lock:
+        _cache_state['version'] += 1
+        _cache_state['change_points'] = {}
+        response_cache.clear()
+        chart_cache.clear()
+        return _cache_state['version']
+
+def _load_change_points(kind: str) -> List[date]:
+    points = set()
+    if kind == 'positions':
+        points.update(row[0] for row in db.session.query(PositionFunction.date).distinct())
+        points.update(row[0] for row in db.session.query(Appointment.start_date).distinct())
+        # 任职在 end_date 当天仍有效，次日才发生变化
+        points.update(row[0] + timedelta(days=1) for row in db.session.query(Appointment.end_date).filter(
+            Appointment.end_date.isnot(None), Appointment.end_date < date.max
+        ).distinct())
+    elif kind == 'connections':
+        points.update(row[0] for row in db.session.query(Connection.date).distinct())
+    return sorted(points)
+
+def effective_epoch(kind: str, target_date: date) -> Optional[date]:
+    with _cache_lock:
+        points = _cache_state['change_points'].get(kind)
+    if points is None:
+        points = _load_change_points(kind)
+        with _cache_lock:
+            _cache_state['change_points'][kind] = points
+    index = bisect_right(points, target_date)
+    return points[index - 1] if index else None
+
+# 响应的表示形式由请求决定：?fields= 字段投影、?format=columnar 列式布局、
+# Accept 选择 JSON 或 MessagePack、Accept-Encoding 选择压缩方式（见 snapshot_codec.py）。
+# 每种组合单独缓存，拖动时间轴时同一表示形式的请求直接返回缓存的压缩结果
+ResponseVariant = Tuple[Optional[Tuple[str, ...]], str, str, Optional[str]]
+
+def response_variant() -> ResponseVariant:
+    fields = snapshot_codec.parse_fields(request.args.get('fields'))
+    layout = request.args.get('format') or 'rows'
+    if layout not in ('rows', 'columnar'):
+        raise ValueError("format must be rows or columnar")
+    best = request.accept_mimetypes.best_match(('application/json',) + snapshot_codec.MSGPACK_MIMETYPES)
+    serialization = 'msgpack' if best in snapshot_codec.MSGPACK_MIMETYPES and snapshot_codec.msgpack else 'json'
+    return fields, layout, serialization, snapshot_codec.preferred_encoding(request.accept_encodings)
+
+def render_variant(data: Any, variant: ResponseVariant) -> Tuple[bytes, str, Optional[str]]:
+    fields, layout, serialization, encoding = variant
+    if fields:
+        data = snapshot_codec.project(data, fields)
+    if layout == 'columnar':
+        data = snapshot_codec.to_columnar(data)
+    if serialization == 'msgpack':
+        body, mimetype = snapshot_codec.pack(data), 'application/x-msgpack'
+    else:
+        body, mimetype = jsonify(data).get_data(), 'application/json'
+    body, encoding = snapshot_codec.compress(body, encoding)
+    return body, mimetype, encoding
+
+def cached_date_response(kind: str, target_date: date, build: Callable[[], Any]) -> Response:
+    try:
+        variant = response_variant()
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    sync_change_log()
+    max_size = app.config['RESPONSE_CACHE_SIZE']
+    version = _cache_state['version']
+    key = (kind, version, effective_epoch(kind, target_date), variant)
+    entry = None
+    if max_size > 0:
+        with _cache_lock:
+            entry = response_cache.get(key)
+            if entry is not None:
+                response_cache.move_to_end(key)
+    if entry is None:
+        body, mimetype, encoding = render_variant(build(), variant)
+        entry = (body, hashlib.sha1(body).hexdigest(), mimetype, encoding)
+        with _cache_lock:
+            # 构建期间数据版本变化则不写入，避免缓存旧数据
+            if max_size > 0 and _cache_state['version'] == version:
+                response_cache[key] = entry
+                while len(response_cache) > max_size:
+                    response_cache.popitem(last=False)
+    
+    body, etag, mimetype, encoding = entry
+    response = app.response_class(body, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # 浏览器每次带 If-None-Match 重新验证
+    return response.make_conditional(request)
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_data_changed(session: Any, flush_context: Any) -> None:
+    if session.new or session.dirty or session.deleted:
+        session.info['data_changed'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_version_on_commit(session: Any) -> None:
+    if session.info.pop('data_changed', False):
+        bump_data_version()
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_data_changed(session: Any) -> None:
+    session.info.pop('data_changed', None)
+
+# 关系图索引：首次查询时从 Connection 加载，之后随提交增量更新（每个进程各自维护一份，其他进程的提交见 sync_change_log）
+connection_graph = GraphIndex()
+_connection_graph_state = {'loaded': False}
+
+def get_connection_graph() -> GraphIndex:
+    if not _connection_graph_state['loaded']:
+        connection_graph.load(db.session.query(
+            Connection.id, Connection.from_position_id, Connection.to_position_id, Connection.date
+        ).all())
+        _connection_graph_state['loaded'] = True
+    return connection_graph
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_connection_changes(session: Any, flush_context: Any) -> None:
+    if not _connection_graph_state['loaded']:
+        return
+    changes = session.info.setdefault('connection_changes', {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Connection):
+            changes[obj.id] = (obj.id, obj.from_position_id, obj.to_position_id, obj.date)
+    for obj in session.deleted:
+        if isinstance(obj, Connection):
+            changes[obj.id] = None
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_connection_changes(session: Any) -> None:
+    for connection_id, row in session.info.pop('connection_changes', {}).items():
+        if row is None:
+            connection_graph.remove_edge(connection_id)
+        else:
+            connection_graph.add_edge(*row)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_connection_changes(session: Any) -> None:
+    session.info.pop('connection_changes', None)
+
+def after_bulk_write() -> None:
+    # 绕过 ORM 的批量写入（Core insert/update/delete）不会触发会话事件，需手动刷新派生数据
+    _appointment_index_state['loaded'] = False
+    _connection_graph_state['loaded'] = False
+    bump_data_version()
+
+# 变更日志（见 change_feed.py）：ORM 写入在 flush 后由会话事件逐个实体追加记录，与业务数据同一事务提交；
+# 批量导入绕过会话事件，按导入类型追加一条 reload 记录，客户端收到后重新加载对应列表。
+# 其他进程的提交不会递增本进程的数据版本，也不会更新本进程的任职区间索引与关系图索引：读取前比较日志的最大 seq，
+# 新增的记录不全是本进程提交的（见 change_feed.LocalChanges）时使本进程的缓存与索引失效
+CHANGE_ENTITIES: Dict[Any, Tuple[str, Callable[[Any], Dict[str, Any]]]] = {
+    Position: ('position', Position.to_dict),
+    PositionFunction: ('function', lambda f: dict(f.to_dict(), position_id=f.position_id)),
+    Official: ('official', Official.to_dict),
+    Appointment: ('appointment', Appointment.to_dict),
+    Connection: ('connection', Connection.to_dict),
+}
+CHANGE_PAGE_SIZE = 500
+CHANGE_MAX_PAGE_SIZE = 5000
+change_notifier = change_feed.ChangeNotifier()
+local_changes = change_feed.LocalChanges()
+_change_log_state: Dict[str, Optional[bool]] = {'available': None}
+
+def change_log_available() -> bool:
+    if _change_log_state['available'] is None:
+        _change_log_state['available'] = inspect(db.engine).has_table(ChangeLog.__tablename__)
+    return bool(_change_log_state['available'])
+
+def record_changes(connection: Any, rows: List[Dict[str, Any]]) -> List[int]:
+    seqs: List[int] = []
+    for i in range(0, len(rows), 500):
+        seqs.extend(connection.execute(insert(ChangeLog.__table__).returning(ChangeLog.seq), rows[i:i + 500]).scalars())
+    return seqs
+
+def _change_row(entity: str, op: str, entity_id: Optional[int], data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {'entity': entity, 'op': op, 'entity_id': entity_id,
+            'data': json.dumps(data, ensure_ascii=False) if data is not None else None}
+
+@event.listens_for(db.session, 'after_flush')
+def _log_changes(session: Any, flush_context: Any) -> None:
+    if not change_log_available():
+        return
+    rows = []
+    for objects, op in ((session.new, 'insert'), (session.dirty, 'update'), (session.deleted, 'delete')):
+        for obj in objects:
+            entity = CHANGE_ENTITIES.get(type(obj))
+            if entity is None or (op == 'update' and not session.is_modified(obj)):
+                continue
+            name, to_dict = entity
+            rows.append(_change_row(name, op, obj.id, {'id': obj.id} if op == 'delete' else to_dict(obj)))
+    if rows:
+        session.info.setdefault('change_seqs', []).extend(record_changes(session.connection(), rows))
+
+@event.listens_for(db.session, 'after_commit')
+def _notify_change_listeners(session: Any) -> None:
+    # 注册在索引的 after_commit 钩子之后：seq 记为本进程提交时，对应的增量更新已经应用
+    seqs = session.info.pop('change_seqs', None)
+    if seqs:
+        local_changes.add(seqs)
+        change_notifier.notify()
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_change_seqs(session: Any) -> None:
+    session.info.pop('change_seqs', None)
+
+def sync_change_log() -> None:
+    if not change_log_available():
+        return
+    seq = db.session.query(func.max(ChangeLog.seq)).scalar()
+    if seq != _cache_state['change_seq']:
+        # 本进程的提交已递增过版本并增量更新了索引，只有其他进程的提交需要处理
+        if not local_changes.only_local(_cache_state['change_seq'], seq):
+            bump_data_version()
+            _appointment_index_state['loaded'] = False
+            _connection_graph_state['loaded'] = False
+        _cache_state['change_seq'] = seq
+
+def fetch_changes(since: int, limit: int) -> List[Dict[str, Any]]:
+    return [change.to_dict() for change in ChangeLog.query.filter(ChangeLog.seq > since).order_by(
+        ChangeLog.seq
+    ).limit(limit)]
+
+def _stream_fetch(since: int, limit: int) -> List[Dict[str, Any]]:
+    # 每次读取后归还连接并结束读事务，等待期间不占用连接池，下一次读取也能看到新提交的数据
+    try:
+        return fetch_changes(since, limit)
+    finally:
+        db.session.close()
+
+def change_gap(since: int) -> Optional[int]:
+    """since 之后的记录已被清理时返回保留的最早 seq，客户端需重新加载全部数据。"""
+    first = db.session.query(func.min(ChangeLog.seq)).scalar()
+    return first if first is not None and since < first - 1 else None
+
+def prune_change_log(before: datetime) -> int:
+    # 始终保留最新一条，客户端据此判断 since 是否仍可续传
+    latest = db.session.query(func.max(ChangeLog.seq)).scalar()
+    if latest is None:
+        return 0
+    return db.session.execute(delete(ChangeLog).where(
+        ChangeLog.created_at < before, ChangeLog.seq < latest
+    )).rowcount
+
+@app.cli.command('prune-change-log')
+@click.option('--days', default=30, show_default=True, help='保留最近多少天的变更')
+def prune_change_log_command(days: int) -> None:
+    if not change_log_available():
+        raise click.ClickException('变更日志表不存在，请先执行 flask migrate-db')
+    deleted = prune_change_log(datetime.utcnow() - timedelta(days=days))
+    db.session.commit()
+    print(f'已清理 {deleted} 条变更记录')
+
+# 全文检索：实体类型 -> (模型, 可检索字段, 起始日期字段, 结束日期字段)
+# 索引与业务数据在同一事务内更新（flush 后写入），回滚时一并撤销
+SEARCH_ENTITIES: Dict[str, Tuple[Any, Tuple[str, ...], Optional[str], Optional[str]]] = {
+    'position': (Position, ('name',), None, None),
+    'official': (Official, ('name', 'bio'), None, None),
+    'function': (PositionFunction, ('description', 'source_text'), 'date', None),
+    'appointment': (Appointment, ('source_text',), 'start_date', 'end_date'),
+}
+SEARCH_TYPES = {entity[0]: entity_type for entity_type, entity in SEARCH_ENTITIES.items()}
+_search_state: Dict[str, Optional[bool]] = {'enabled': None}
+
+def search_enabled() -> bool:
+    if _search_state['enabled'] is None:
+        _search_state['enabled'] = inspect(db.engine).has_table(search_index.DOCUMENT_TABLE)
+    return bool(_search_state['enabled'])
+
+def _ordinal(value: Optional[date]) -> Optional[int]:
+    return value.toordinal() if value else None
+
+def search_document(entity_type: str, get: Callable[[str], Any]) -> search_index.Document:
+    _, fields, start_field, end_field = SEARCH_ENTITIES[entity_type]
+    return (
+        entity_type, get('id'), {field: get(field) for field in fields},
+        _ordinal(get(start_field)) if start_field else None,
+        _ordinal(get(end_field)) if end_field else None
+    )
+
+def rebuild_search_index() -> None:
+    connection = db.session.connection()
+    search_index.create_tables(connection)
+    search_index.clear(connection)
+    for entity_type, (model, fields, start_field, end_field) in SEARCH_ENTITIES.items():
+        columns = [model.id] + [getattr(model, name) for name in fields + (start_field, end_field) if name]
+        rows = db.session.query(*columns).yield_per(1000)
+        search_index.add(connection, (search_document(entity_type, row._mapping.get) for row in rows))
+    _search_state['enabled'] = True
+
+def _search_fields_changed(obj: Any, entity_type: str) -> bool:
+    # after_flush 时属性历史尚未重置，只有检索字段或起止日期变化的实体才需要重建文档
+    _, fields, start_field, end_field = SEARCH_ENTITIES[entity_type]
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in fields + (start_field, end_field) if name)
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_search_index(session: Any, flush_context: Any) -> None:
+    if not search_enabled():
+        return
+    documents = []
+    for obj in list(session.new) + list(session.dirty):
+        entity_type = SEARCH_TYPES.get(type(obj))
+        if entity_type and (obj in session.new or _search_fields_changed(obj, entity_type)):
+            documents.append(search_document(entity_type, lambda name: getattr(obj, name)))
+    removed: Dict[str, List[int]] = {}
+    for obj in session.deleted:
+        entity_type = SEARCH_TYPES.get(type(obj))
+        if entity_type:
+            removed.setdefault(entity_type, []).append(obj.id)
+    connection = session.connection()
+    if documents:
+        search_index.replace(connection, documents)
+    for entity_type, entity_ids in removed.items():
+        search_index.remove(connection, entity_type, entity_ids)
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command() -> None:
+    if not search_index.fts5_available(db.session.connection()):
+        raise click.ClickException('当前数据库不支持 SQLite FTS5')
+    rebuild_search_index()
+    db.session.commit()
+    print('已重建全文检索索引')
+
 # 日期转换辅助函数
+# 农历查询表文件（首次使用时生成，之后 mmap 加载）；年号纪年与农历日期的解析见 era_calendar.py
+LUNAR_TABLE_PATH = os.path.join(app.instance_path, 'lunar_table.bin')
+DATE_CONVERT_BATCH_LIMIT = 100000
+DATE_FORMAT_HINT = "Use YYYY-MM-DD, a reign-year date such as 熙宁三年三月初五, or 农历YYYY年M月D日"
+
 def get_lunar_date(g_date: date) -> str:
     try:
-        lunar = LunarDate.fromSolarDate(g_date.year, g_date.month, g_date.day)
+        lunar = lunar_from_solar(g_date, LUNAR_TABLE_PATH)
         return f"{lunar.year}年{lunar.month}月{lunar.day}日"
     except (ValueError, IndexError) as e:
         print(f"日期转换错误: {e}")
         return "转换失败"
 
 def get_ganzhi_date(g_date: date) -> str:
-    base_date = date(1984, 2, 2)  # 甲子年正月初一
-    ganzhi_stems = "甲乙丙丁戊己庚辛壬癸"
-    ganzhi_branches = "子丑寅卯辰巳午未申酉戌亥"
-    delta_days = (g_date - base_date).days
-    stem_index = (delta_days % 10 + 10) % 10
-    branch_index = (delta_days % 12 + 12) % 12
-    return f"{ganzhi_stems[stem_index]}{ganzhi_branches[branch_index]}日"
+    # 以 1984-02-02（甲子日）为基准查六十甲子表
+    return f"{ganzhi_day(g_date)}日"
 
+def get_era_dates(g_date: date) -> List[str]:
+    # 年号纪年写法，改元当年与朝代交替时有多个；农历查询表范围之外返回空列表
+    found = get_table(LUNAR_TABLE_PATH).lookup(g_date)
+    return era_calendar.era_names(*found) if found else []
+
+def convert_date(date_obj: date) -> Dict[str, Any]:
+    return {
+        'gregorian': date_obj.strftime('%Y-%m-%d'),
+        'lunar': get_lunar_date(date_obj),
+        'ganzhi': get_ganzhi_date(date_obj),
+        'era': get_era_dates(date_obj)
+    }
+
+# 所有接口的日期参数都经此解析：YYYY-MM-DD（前推格里历），或年号纪年、农历日期（换算为前推格里历）
 def parse_date(date_str: Optional[str]) -> date:
+    if not date_str:
+        return datetime.now().date()
     try:
-        return datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now().date()
+        return datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
-        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+        pass
+    # 年号或农历写法正确但日期不存在时，era_calendar 抛出的 ValueError 直接返回给调用方
+    parsed = era_calendar.parse(date_str, LUNAR_TABLE_PATH)
+    if parsed is None:
+        raise ValueError(f"Invalid date format. {DATE_FORMAT_HINT}")
+    return parsed
+
+def parse_body_date(value: Any) -> date:
+    # JSON 请求体中的日期可能是数字等非字符串值，parse_date 对其抛出的是 TypeError，这里统一为 ValueError
+    if value is not None and not isinstance(value, str):
+        raise ValueError(f"date must be a string. {DATE_FORMAT_HINT}")
+    return parse_date(value)
+
+# 时间快照：用固定数量的集合查询构建某一日期的全部职位视图，避免逐职位查询（N+1）
+def build_snapshot(target_date: date) -> List[Dict[str, Any]]:
+    positions = Position.query.all()
+
+    # 每个职位在目标日期之前（含）最新的职能；同一日期取 id 最小者，与原先 order_by(date desc).first() 一致
+    ranked = db.session.query(
+        PositionFunction.id.label('id'),
+        func.row_number().over(
+            partition_by=PositionFunction.position_id,
+            order_by=(PositionFunction.date.desc(), PositionFunction.id.asc())
+        ).label('rn')
+    ).filter(PositionFunction.date <= target_date).subquery()
+    latest_functions = PositionFunction.query.join(
+        ranked, PositionFunction.id == ranked.c.id
+    ).filter(ranked.c.rn == 1).all()
+    functions_by_position = {f.position_id: f for f in latest_functions}
+
+    # 目标日期在任的全部任职记录，一次范围查询后按职位分组（按 id 排序保持原有顺序）
+    active_appointments = Appointment.query.filter(
+        Appointment.start_date <= target_date,
+        (Appointment.end_date.is_(None) | (Appointment.end_date >= target_date))
+    ).order_by(Appointment.id).all()
+    appointments_by_position: Dict[int, List[Appointment]] = {}
+    for appointment in active_appointments:
+        appointments_by_position.setdefault(appointment.position_id, []).append(appointment)
+
+    result = []
+    for pos in positions:
+        func_obj = functions_by_position.get(pos.id)
+        pos_dict = pos.to_dict()
+        pos_dict['function'] = func_obj.to_dict() if func_obj else None
+        pos_dict['appointments'] = [a.to_dict() for a in appointments_by_position.get(pos.id, [])]
+        result.append(pos_dict)
+    return result
+
+# 「某日视图」物化表：写入时在同一事务内登记受影响的职位（无论是否开启 AS_OF_VIEW；position_id 唯一，
+# 已登记的职位不再插入，登记数不超过职位数），开启时由后台线程分批重算这些职位的区间。读取时若仍有待重算的职位则退回 build_snapshot，保证结果与之一致。
+# 多进程部署时各进程的后台线程共同消费同一张登记表，同一批被重复处理也只是重算两次
+AS_OF_BATCH_SIZE = 200
+_as_of_lock = threading.Lock()
+_as_of_wake = threading.Event()
+_as_of_state: Dict[str, Any] = {'available': None, 'worker': None}
+
+def as_of_view_available() -> bool:
+    if _as_of_state['available'] is None:
+        _as_of_state['available'] = inspect(db.engine).has_table(PositionIntervalPending.__tablename__)
+    return bool(_as_of_state['available'])
+
+def _interval_rows(positions: List[Position], functions: List[PositionFunction],
+                   appointments: List[Appointment]) -> List[Dict[str, Any]]:
+    functions_by_position: Dict[int, Dict[int, PositionFunction]] = {}
+    for f in functions:
+        functions_by_position.setdefault(f.position_id, {})[f.id] = f
+    appointments_by_position: Dict[int, Dict[int, Appointment]] = {}
+    for a in appointments:
+        appointments_by_position.setdefault(a.position_id, {})[a.id] = a
+
+    rows = []
+    for pos in positions:
+        funcs = functions_by_position.get(pos.id, {})
+        apps = appointments_by_position.get(pos.id, {})
+        intervals = position_intervals(
+            [(f.id, f.date) for f in funcs.values()],
+            [(a.id, a.start_date, a.end_date) for a in apps.values()]
+        )
+        for valid_from, valid_to, function_id, appointment_ids in intervals:
+            pos_dict = pos.to_dict()
+            pos_dict['function'] = funcs[function_id].to_dict() if function_id is not None else None
+            pos_dict['appointments'] = [apps[i].to_dict() for i in appointment_ids]
+            rows.append({
+                'position_id': pos.id, 'valid_from': valid_from, 'valid_to': valid_to,
+                'function_id': function_id,
+                'official_ids': json.dumps([apps[i].official_id for i in appointment_ids]),
+                'snapshot': json.dumps(pos_dict, ensure_ascii=False),
+            })
+    return rows
+
+def _insert_interval_rows(rows: List[Dict[str, Any]]) -> None:
+    for i in range(0, len(rows), 1000):
+        db.session.execute(PositionInterval.__table__.insert(), rows[i:i + 1000])
+
+def rebuild_as_of_view() -> None:
+    # 先删除登记再读取数据（见 refresh_as_of_view）
+    last_pending = db.session.query(func.max(PositionIntervalPending.id)).scalar()
+    if last_pending is not None:
+        db.session.execute(delete(PositionIntervalPending).where(PositionIntervalPending.id <= last_pending))
+    rows = _interval_rows(Position.query.order_by(Position.id).all(),
+                          PositionFunction.query.all(), Appointment.query.all())
+    db.session.execute(delete(PositionInterval))
+    _insert_interval_rows(rows)
+    _as_of_state['available'] = True
+
+def refresh_as_of_view(limit: int = AS_OF_BATCH_SIZE) -> int:
+    """重算一批待处理的职位并提交，返回处理的登记数（0 表示已是最新）。"""
+    pending = db.session.query(PositionIntervalPending.id, PositionIntervalPending.position_id).order_by(
+        PositionIntervalPending.id
+    ).limit(limit).all()
+    if not pending:
+        db.session.rollback()
+        return 0
+    position_ids = sorted({row.position_id for row in pending})
+    # 先删除登记再读取数据：删除时取得写锁，之前提交的修改都能读到；已登记期间其他事务的登记被忽略，
+    # 若先读后删，读取之后提交的修改会随登记一起被删掉
+    db.session.execute(delete(PositionIntervalPending).where(
+        PositionIntervalPending.id.in_([row.id for row in pending])
+    ))
+    rows = _interval_rows(
+        Position.query.filter(Position.id.in_(position_ids)).all(),
+        PositionFunction.query.filter(PositionFunction.position_id.in_(position_ids)).all(),
+        Appointment.query.filter(Appointment.position_id.in_(position_ids)).all()
+    )
+    db.session.execute(delete(PositionInterval).where(PositionInterval.position_id.in_(position_ids)))
+    _insert_interval_rows(rows)
+    db.session.commit()
+    return len(pending)
+
+def mark_as_of_pending(connection: Any, position_ids: Iterable[int]) -> None:
+    # 支持的两种数据库（见 db_config.py）都有 ON CONFLICT DO NOTHING，已登记的职位直接跳过
+    dialect_insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+    statement = dialect_insert(PositionIntervalPending.__table__).on_conflict_do_nothing(
+        index_elements=['position_id']
+    )
+    ids = sorted(position_ids)
+    for i in range(0, len(ids), 500):
+        connection.execute(statement, [{'position_id': position_id} for position_id in ids[i:i + 500]])
+
+def _as_of_worker() -> None:
+    while True:
+        _as_of_wake.wait(app.config['AS_OF_VIEW_POLL_SECONDS'])
+        _as_of_wake.clear()
+        with app.app_context():
+            try:
+                while refresh_as_of_view():
+                    pass
+            except SQLAlchemyError as e:
+                # 多进程同时提交时 SQLite 可能返回 database is locked，留待下一轮重试
+                db.session.rollback()
+                app.logger.warning('某日视图刷新失败，稍后重试: %s', e)
+
+def notify_as_of_worker() -> None:
+    # 后台线程按需启动；fork 出的工作进程中父进程的线程不存在，会重新启动一个
+    with _as_of_lock:
+        worker = _as_of_state['worker']
+        if worker is None or not worker.is_alive():
+            worker = threading.Thread(target=_as_of_worker, name='as-of-view', daemon=True)
+            worker.start()
+            _as_of_state['worker'] = worker
+    _as_of_wake.set()
+
+def _affected_positions(session: Any) -> Set[int]:
+    position_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Position):
+            position_ids.add(obj.id)
+        elif isinstance(obj, (PositionFunction, Appointment)):
+            # 改到其他职位名下时，原职位同样需要重算
+            position_ids.add(obj.position_id)
+            position_ids.update(inspect(obj).attrs.position_id.history.deleted)
+    position_ids.discard(None)
+    return position_ids
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_as_of_positions(session: Any, flush_context: Any) -> None:
+    if not as_of_view_available():
+        return
+    position_ids = _affected_positions(session)
+    if position_ids:
+        mark_as_of_pending(session.connection(), position_ids)
+        session.info['as_of_pending'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_as_of_worker(session: Any) -> None:
+    if session.info.pop('as_of_pending', False) and app.config['AS_OF_VIEW']:
+        notify_as_of_worker()
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_as_of_pending(session: Any) -> None:
+    session.info.pop('as_of_pending', None)
+
+def as_of_snapshot(target_date: date) -> Optional[List[Dict[str, Any]]]:
+    # 物化表已是最新时用一次区间查询取出全部职位的条目，否则返回 None
+    if db.session.query(PositionIntervalPending.id).first() is not None:
+        notify_as_of_worker()
+        return None
+    rows = db.session.query(PositionInterval.snapshot).filter(
+        PositionInterval.valid_from <= target_date,
+        PositionInterval.valid_to >= target_date
+    ).order_by(PositionInterval.position_id)
+    return [json.loads(row.snapshot) for row in rows]
+
+def snapshot_for_date(target_date: date) -> List[Dict[str, Any]]:
+    if app.config['AS_OF_VIEW'] and as_of_view_available():
+        result = as_of_snapshot(target_date)
+        if result is not None:
+            return result
+    return build_snapshot(target_date)
+
+def check_as_of_view() -> Dict[str, List[int]]:
+    """将物化表与从头重算的结果逐职位比较；待重算的职位单独列出，不计为不一致。"""
+    expected: Dict[int, List[Tuple[Any, ...]]] = {}
+    for row in _interval_rows(Position.query.all(), PositionFunction.query.all(), Appointment.query.all()):
+        expected.setdefault(row['position_id'], []).append(
+            (row['valid_from'], row['valid_to'], row['function_id'], row['official_ids'], row['snapshot'])
+        )
+    actual: Dict[int, List[Tuple[Any, ...]]] = {}
+    for row in PositionInterval.query.order_by(PositionInterval.position_id, PositionInterval.valid_from):
+        actual.setdefault(row.position_id, []).append(
+            (row.valid_from, row.valid_to, row.function_id, row.official_ids, row.snapshot)
+        )
+    pending = {row[0] for row in db.session.query(PositionIntervalPending.position_id)}
+    report: Dict[str, List[int]] = {'missing': [], 'extra': [], 'mismatched': [], 'pending': sorted(pending)}
+    for position_id in sorted(set(expected) | set(actual)):
+        if position_id in pending:
+            continue
+        if position_id not in actual:
+            report['missing'].append(position_id)
+        elif position_id not in expected:
+            report['extra'].append(position_id)
+        elif actual[position_id] != expected[position_id]:
+            report['mismatched'].append(position_id)
+    return report
+
+@app.cli.command('rebuild-as-of-view')
+def rebuild_as_of_view_command() -> None:
+    rebuild_as_of_view()
+    db.session.commit()
+    print('已重建某日视图物化表')
+
+@app.cli.command('check-as-of-view')
+def check_as_of_view_command() -> None:
+    if not as_of_view_available():
+        raise click.ClickException('某日视图物化表不存在，请先执行 flask migrate-db')
+    report = check_as_of_view()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if report['missing'] or report['extra'] or report['mismatched']:
+        raise click.ClickException('物化表与重算结果不一致，可执行 flask rebuild-as-of-view 修复')
+
+# 组织图布局（见 tree_layout.py）：坐标只取决于层级，每个数据版本计算一次；
+# 某日的组织图（坐标 + 当日快照 + 当日关系）按 (数据版本, 职位生效时点, 关系生效时点) 缓存，
+# 视口查询 ?bbox= 在缓存的组织图上按 x 二分截取。与响应缓存一样只在本进程内有效
+chart_cache: 'OrderedDict[Tuple[Any, ...], Dict[str, Any]]' = OrderedDict()
+_layout_state: Dict[str, Any] = {'version': None, 'layout': None}
+
+def get_tree_layout() -> tree_layout.TreeLayout:
+    version = _cache_state['version']
+    with _cache_lock:
+        if _layout_state['version'] == version:
+            return _layout_state['layout']
+    layout = tree_layout.TreeLayout(db.session.query(Position.id, Position.parent_id).all())
+    with _cache_lock:
+        _layout_state.update(version=version, layout=layout)
+    return layout
+
+def _xy(layout: tree_layout.TreeLayout, position_id: Optional[int]) -> Optional[List[float]]:
+    point = layout.point(position_id) if position_id is not None else None
+    return [point[0], point[1]] if point else None
+
+def build_chart(target_date: date) -> Dict[str, Any]:
+    layout = get_tree_layout()
+    nodes = {}
+    for entry in snapshot_for_date(target_date):
+        point = layout.point(entry['id'])
+        if point is None:
+            continue
+        entry['x'], entry['y'], entry['depth'] = point
+        entry['parent_xy'] = _xy(layout, layout.parent(entry['id']))  # 视口外的上级也能画出连线
+        nodes[entry['id']] = entry
+    edges = []
+    for conn in Connection.query.filter(Connection.date <= target_date).order_by(Connection.id).all():
+        start, end = _xy(layout, conn.from_position_id), _xy(layout, conn.to_position_id)
+        if start and end:
+            edges.append(dict(conn.to_dict(), from_xy=start, to_xy=end))
+    return {'layout': layout, 'nodes': nodes, 'edges': edges}
+
+def get_chart(target_date: date) -> Dict[str, Any]:
+    sync_change_log()
+    max_size = app.config['LAYOUT_CACHE_SIZE']
+    version = _cache_state['version']
+    key = (version, effective_epoch('positions', target_date), effective_epoch('connections', target_date))
+    with _cache_lock:
+        chart = chart_cache.get(key)
+        if chart is not None:
+            chart_cache.move_to_end(key)
+            return chart
+    chart = build_chart(target_date)
+    with _cache_lock:
+        if max_size > 0 and _cache_state['version'] == version:
+            chart_cache[key] = chart
+            while len(chart_cache) > max_size:
+                chart_cache.popitem(last=False)
+    return chart
+
+# 官员仕历：任职记录连同职位名称、到任时的职能与层级路径（闭包表，即当前层级）用固定两条查询取出；
+# 在任时段、空档、兼任等统计由 career.py 计算。仕历摘要表保存与查询日期无关的统计，
+# 任职写入时在同一事务内（flush 后）重算受影响官员的摘要，回滚时一并撤销；批量导入绕过会话事件，导入后统一重算
+CAREER_BATCH_LIMIT = 500
+CAREER_SUMMARY_PAGE_SIZE = 1000
+CAREER_SUMMARY_MAX_PAGE_SIZE = 5000
+_career_state: Dict[str, Optional[bool]] = {'available': None}
+
+def career_summary_available() -> bool:
+    if _career_state['available'] is None:
+        _career_state['available'] = inspect(db.engine).has_table(OfficialCareerSummary.__tablename__)
+    return bool(_career_state['available'])
+
+def _summary_dict(summary: Dict[str, Any], as_of: date) -> Dict[str, Any]:
+    result = {key: value.isoformat() if isinstance(value, date) else value for key, value in summary.items()}
+    result['total_tenure_days'] = career.tenure_days(summary, as_of)
+    return result
+
+def refresh_career_summaries(connection: Any, official_ids: Optional[Iterable[int]] = None) -> None:
+    # official_ids 为 None 时重建全部摘要；没有任职记录的官员不保留摘要行
+    table = OfficialCareerSummary.__table__
+    columns = (Appointment.official_id, Appointment.id, Appointment.position_id,
+               Appointment.start_date, Appointment.end_date)
+    if official_ids is None:
+        connection.execute(delete(table))
+        chunks = [select(*columns)]
+    else:
+        ids = sorted(official_ids)
+        chunks = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            connection.execute(delete(table).where(table.c.official_id.in_(chunk)))
+            chunks.append(select(*columns).where(Appointment.official_id.in_(chunk)))
+    for query in chunks:
+        appointments: Dict[int, List[career.CareerAppointment]] = {}
+        for official_id, *appointment in connection.execute(query):
+            appointments.setdefault(official_id, []).append(tuple(appointment))
+        rows = [dict(career.summarize(items), official_id=official_id)
+                for official_id, items in appointments.items()]
+        for i in range(0, len(rows), 1000):
+            connection.execute(table.insert(), rows[i:i + 1000])
+
+_CAREER_FIELDS = ('official_id', 'position_id', 'start_date', 'end_date')
+
+@event.listens_for(db.session, 'after_flush')
+def _refresh_career_summaries(session: Any, flush_context: Any) -> None:
+    if not career_summary_available():
+        return
+    official_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, Appointment):
+            continue
+        state = inspect(obj)
+        if obj in session.dirty and not any(state.attrs[f].history.has_changes() for f in _CAREER_FIELDS):
+            continue  # 只改了出处等字段
+        official_ids.add(obj.official_id)
+        # 改到其他官员名下时，原官员同样需要重算
+        official_ids.update(state.attrs.official_id.history.deleted)
+    official_ids.discard(None)
+    if official_ids:
+        refresh_career_summaries(session.connection(), official_ids)
+
+def career_appointments(official_ids: List[int]) -> Dict[int, List[Tuple[career.CareerAppointment, Dict[str, Any]]]]:
+    """按官员分组的 (任职区间, 条目)，按 start_date 排序；无论官员多少都只有两条查询。"""
+    # 到任时的职能：日期不晚于 start_date 的最新一条，同日取 id 最小者（与 build_snapshot 的规则一致）
+    function_at_start = select(PositionFunction.id).where(
+        PositionFunction.position_id == Appointment.position_id,
+        PositionFunction.date <= Appointment.start_date
+    ).order_by(PositionFunction.date.desc(), PositionFunction.id).limit(1).correlate(Appointment).scalar_subquery()
+    rows = db.session.query(Appointment, Position.name, PositionFunction).join(
+        Position, Position.id == Appointment.position_id
+    ).outerjoin(
+        PositionFunction, PositionFunction.id == function_at_start
+    ).filter(Appointment.official_id.in_(official_ids)).order_by(
+        Appointment.official_id, Appointment.start_date, Appointment.id
+    ).all()
+
+    # 层级路径单独一条闭包表查询：并入上面的联表会让每个任职按层级深度重复多行
+    paths: Dict[int, List[Dict[str, Any]]] = {}
+    position_ids = {appointment.position_id for appointment, _, _ in rows}
+    if position_ids:
+        path_rows = db.session.query(PositionClosure.descendant_id, Position.id, Position.name).join(
+            Position, Position.id == PositionClosure.ancestor_id
+        ).filter(PositionClosure.descendant_id.in_(position_ids)).order_by(
+            PositionClosure.descendant_id, PositionClosure.depth.desc()
+        )
+        for position_id, ancestor_id, ancestor_name in path_rows:
+            paths.setdefault(position_id, []).append({'id': ancestor_id, 'name': ancestor_name})
+
+    result: Dict[int, List[Tuple[career.CareerAppointment, Dict[str, Any]]]] = {}
+    for appointment, position_name, function in rows:
+        item = appointment.to_dict()
+        item['position_name'] = position_name
+        item['hierarchy_path'] = paths.get(appointment.position_id, [])  # 从根职位到任职职位本身
+        item['function'] = function.to_dict() if function else None
+        interval = (appointment.id, appointment.position_id, appointment.start_date, appointment.end_date)
+        result.setdefault(appointment.official_id, []).append((interval, item))
+    return result
+
+def career_payload(official: Official, entries: List[Tuple[career.CareerAppointment, Dict[str, Any]]],
+                   as_of: date) -> Dict[str, Any]:
+    appointments = [appointment for appointment, _ in entries]
+    overlaps, _ = career.concurrent_posts(appointments)
+    items = [dict(item, concurrent_with=overlaps[appointment[0]]) for appointment, item in entries]
+    periods = career.merge_periods(appointments)
+    return {
+        'official': official.to_dict(),
+        'as_of': as_of.isoformat(),
+        'appointments': items,
+        'periods': [{'start_date': start.isoformat(), 'end_date': end.isoformat() if end else None}
+                    for start, end in periods],
+        'gaps': [{'start_date': first.isoformat(), 'end_date': last.isoformat(), 'days': days}
+                 for first, last, days in career.gaps(periods)],
+        'stats': _summary_dict(career.summarize(appointments), as_of)
+    }
+
+@app.cli.command('rebuild-career-summaries')
+def rebuild_career_summaries_command() -> None:
+    if not career_summary_available():
+        raise click.ClickException('仕历摘要表不存在，请先执行 flask migrate-db')
+    refresh_career_summaries(db.session.connection())
+    db.session.commit()
+    print('已重建官员仕历摘要表')
+
+# 变化点时间轴：按日期列出职能、任职、关系的增量，客户端加载一次快照后在本地逐点应用
+TIMELINE_PAGE_SIZE = 500
+TIMELINE_MAX_PAGE_SIZE = 5000
+
+def _in_range(column: Any, lower: Optional[date], upper: Optional[date]) -> List[Any]:
+    # lower 为开区间，upper 为闭区间
+    conditions = []
+    if lower is not None:
+        conditions.append(column > lower)
+    if upper is not None:
+        conditions.append(column <= upper)
+    return conditions
+
+def _shift_bound(bound: Optional[date], days: int) -> Optional[date]:
+    if bound is None:
+        return None
+    try:
+        return bound + timedelta(days=days)
+    except OverflowError:
+        return None if days > 0 else bound
+
+def _appointment_end_filter(lower: Optional[date], upper: Optional[date]) -> List[Any]:
+    # 任职在 end_date 当天仍有效，次日才失效，因此按 end_date + 1 落在 (lower, upper] 内筛选
+    return [
+        Appointment.end_date.isnot(None),
+        Appointment.end_date < date.max,
+        *_in_range(Appointment.end_date, _shift_bound(lower, -1), _shift_bound(upper, -1))
+    ]
+
+def _timeline_page_end(lower: Optional[date], upper: Optional[date], limit: int) -> Tuple[Optional[date], bool]:
+    # 取区间内前 limit + 1 个不同的变化日期，确定本页的结束日期以及是否还有下一页
+    candidates = set()
+    for column in (PositionFunction.date, Appointment.start_date, Connection.date):
+        candidates.update(row[0] for row in db.session.query(column).filter(
+            *_in_range(column, lower, upper)
+        ).distinct().order_by(column).limit(limit + 1))
+    candidates.update(row[0] + timedelta(days=1) for row in db.session.query(Appointment.end_date).filter(
+        *_appointment_end_filter(lower, upper)
+    ).distinct().order_by(Appointment.end_date).limit(limit + 1))
+    dates = sorted(candidates)
+    if not dates:
+        return None, False
+    if len(dates) > limit:
+        return dates[limit - 1], True
+    return dates[-1], False
+
+def _timeline_events(lower: Optional[date], upper: date) -> Iterator[Tuple[date, str, Dict[str, Any]]]:
+    # 四路按日期有序的查询（yield_per 分批读取），归并为 (日期, 类型, 数据) 流
+    functions = (
+        (f.date, 'functions', dict(f.to_dict(), position_id=f.position_id))
+        for f in PositionFunction.query.filter(*_in_range(PositionFunction.date, lower, upper))
+        .order_by(PositionFunction.date, PositionFunction.id).yield_per(500)
+    )
+    started = (
+        (a.start_date, 'appointments_started', a.to_dict())
+        for a in Appointment.query.filter(*_in_range(Appointment.start_date, lower, upper))
+        .order_by(Appointment.start_date, Appointment.id).yield_per(500)
+    )
+    ended = (
+        (row.end_date + timedelta(days=1), 'appointments_ended',
+         {'id': row.id, 'position_id': row.position_id, 'official_id': row.official_id})
+        for row in db.session.query(
+            Appointment.id, Appointment.position_id, Appointment.official_id, Appointment.end_date
+        ).filter(*_appointment_end_filter(lower, upper))
+        .order_by(Appointment.end_date, Appointment.id).yield_per(500)
+    )
+    connections = (
+        (c.date, 'connections', c.to_dict())
+        for c in Connection.query.filter(*_in_range(Connection.date, lower, upper))
+        .order_by(Connection.date, Connection.id).yield_per(500)
+    )
+    return heapq.merge(functions, started, ended, connections, key=lambda event: event[0])
+
+def _stream_timeline(lower: Optional[date], upper: Optional[date], next_cursor: Optional[str]) -> Iterator[str]:
+    yield '{"change_points":['
+    if upper is not None:
+        first = True
+        for point_date, events in groupby(_timeline_events(lower, upper), key=lambda event: event[0]):
+            point: Dict[str, Any] = {
+                'date': point_date.isoformat(),
+                'functions': [],
+                'appointments_started': [],
+                'appointments_ended': [],
+                'connections': []
+            }
+            for _, kind, payload in events:
+                point[kind].append(payload)
+            yield ('' if first else ',') + json.dumps(point, ensure_ascii=False, sort_keys=True)
+            first = False
+    yield '],"next":' + json.dumps(next_cursor) + '}'
+
+# 批量导入：在内存中解析职位/官员引用，按块批量插入
+class ImportResolver:
+    """导入期间的引用解析：支持按 id 或名称引用职位/官员，并为新行预分配 id。"""
+
+    def __init__(self) -> None:
+        self.ids: Dict[Any, set] = {}
+        self.names: Dict[Any, Dict[str, List[int]]] = {}
+        self.next_id: Dict[Any, int] = {}
+        for model in (Position, Official, PositionFunction, Appointment, Connection):
+            self.next_id[model] = (db.session.query(func.max(model.id)).scalar() or 0) + 1
+        for model in (Position, Official):
+            self.ids[model] = set()
+            self.names[model] = {}
+            for row_id, name in db.session.query(model.id, model.name):
+                self.register(model, row_id, name)
+
+    def register(self, model: Any, row_id: int, name: Optional[str]) -> None:
+        self.ids[model].add(row_id)
+        if name:
+            self.names[model].setdefault(name, []).append(row_id)
+        self.next_id[model] = max(self.next_id[model], row_id + 1)
+
+    def allocate(self, model: Any, requested: Any = None) -> int:
+        if requested not in (None, ''):
+            row_id = int(requested)
+            if model in self.ids and row_id in self.ids[model]:
+                raise ValueError(f"id {row_id} already exists")
+            self.next_id[model] = max(self.next_id[model], row_id + 1)
+            return row_id
+        row_id = self.next_id[model]
+        self.next_id[model] += 1
+        return row_id
+
+    def resolve(self, model: Any, row: Dict[str, Any], id_key: str, name_key: str,
+                required: bool = True) -> Optional[int]:
+        if row.get(id_key) not in (None, ''):
+            row_id = int(row[id_key])
+            if row_id not in self.ids[model]:
+                raise ValueError(f"{id_key} {row_id} not found")
+            return row_id
+        name = row.get(name_key)
+        if name:
+            matches = self.names[model].get(name, [])
+            if not matches:
+                raise ValueError(f"{name_key} '{name}' not found")
+            if len(matches) > 1:
+                raise ValueError(f"{name_key} '{name}' is ambiguous, use {id_key}")
+            return matches[0]
+        if required:
+            raise ValueError(f"{id_key} or {name_key} is required")
+        return None
+
+def _import_date(row: Dict[str, Any], key: str, required: bool = True) -> Optional[date]:
+    value = row.get(key)
+    if value in (None, ''):
+        if required:
+            raise ValueError(f"{key} is required")
+        return None
+    return parse_date(str(value))
+
+def _import_bool(value: Any, default: bool = True) -> bool:
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y', '是')
+
+def _import_text(row: Dict[str, Any], key: str, required: bool = False) -> Optional[str]:
+    value = row.get(key)
+    if value is None or str(value).strip() == '':
+        if required:
+            raise ValueError(f"{key} is required")
+        return None
+    return str(value)
+
+def _prepare_position(row: Dict[str, Any], resolver: ImportResolver) -> Dict[str, Any]:
+    name = _import_text(row, 'name', required=True)
+    parent_id = resolver.resolve(Position, row, 'parent_id', 'parent', required=False)
+    row_id = resolver.allocate(Position, row.get('id'))
+    resolver.register(Position, row_id, name)
+    return {'id': row_id, 'name': name, 'parent_id': parent_id}
+
+def _prepare_official(row: Dict[str, Any], resolver: ImportResolver) -> Dict[str, Any]:
+    name = _import_text(row, 'name', required=True)
+    row_id = resolver.allocate(Official, row.get('id'))
+    resolver.register(Official, row_id, name)
+    return {'id': row_id, 'name': name, 'bio': _import_text(row, 'bio')}
+
+def _prepare_function(row: Dict[str, Any], resolver: ImportResolver) -> Dict[str, Any]:
+    return {
+        'id': resolver.allocate(PositionFunction),
+        'position_id': resolver.resolve(Position, row, 'position_id', 'position'),
+        'date': _import_date(row, 'date'),
+        'description': _import_text(row, 'description'),
+        'source_text': _import_text(row, 'source_text'),
+        'source_reference': _import_text(row, 'source_reference')
+    }
+
+def _prepare_appointment(row: Dict[str, Any], resolver: ImportResolver) -> Dict[str, Any]:
+    start_date = _import_date(row, 'start_date')
+    end_date = _import_date(row, 'end_date', required=False)
+    if end_date and start_date and end_date < start_date:
+        raise ValueError("end_date is earlier than start_date")
+    return {
+        'id': resolver.allocate(Appointment),
+        'position_id': resolver.resolve(Position, row, 'position_id', 'position'),
+        'official_id': resolver.resolve(Official, row, 'official_id', 'official'),
+        'start_date': start_date,
+        'end_date': end_date,
+        'source_text': _import_text(row, 'source_text'),
+        'source_reference': _import_text(row, 'source_reference')
+    }
+
+def _prepare_connection(row: Dict[str, Any], resolver: ImportResolver) -> Dict[str, Any]:
+    return {
+        'id': resolver.allocate(Connection),
+        'from_position_id': resolver.resolve(Position, row, 'from_position_id', 'from_position'),
+        'to_position_id': resolver.resolve(Position, row, 'to_position_id', 'to_position'),
+        'date': _import_date(row, 'date'),
+        'label': _import_text(row, 'label'),
+        'color': _import_text(row, 'color') or '#000000',
+        'style': _import_text(row, 'style') or 'solid',
+        'is_visible': _import_bool(row.get('is_visible')),
+        'source_text': _import_text(row, 'source_text'),
+        'source_reference': _import_text(row, 'source_reference')
+    }
+
+IMPORT_KINDS: Dict[str, Tuple[Any, Callable[[Dict[str, Any], ImportResolver], Dict[str, Any]]]] = {
+    'positions': (Position, _prepare_position),
+    'officials': (Official, _prepare_official),
+    'functions': (PositionFunction, _prepare_function),
+    'appointments': (Appointment, _prepare_appointment),
+    'connections': (Connection, _prepare_connection),
+}
+
+def import_records(kind: str, stream: Any, fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ImportReport:
+    model, prepare = IMPORT_KINDS[kind]
+    resolver = ImportResolver()
+    entity_type = SEARCH_TYPES.get(model) if search_enabled() else None
+    affected_positions: Set[int] = set()
+    affected_officials: Set[int] = set()
+
+    def insert_chunk(params: List[Dict[str, Any]]) -> None:
+        db.session.execute(model.__table__.insert(), params)
+        if kind in ('functions', 'appointments'):
+            affected_positions.update(row['position_id'] for row in params)
+        if kind == 'appointments':
+            affected_officials.update(row['official_id'] for row in params)
+        if entity_type:
+            search_index.add(db.session.connection(),
+                             (search_document(entity_type, row.get) for row in params))
+
+    try:
+        return run_import(
+            read_rows(stream, fmt),
+            lambda row: prepare(row, resolver),
+            insert_chunk,
+            db.session.commit,
+            db.session.rollback,
+            chunk_size
+        )
+    finally:
+        if kind == 'positions':
+            rebuild_closure()
+            db.session.commit()
+        if as_of_view_available():
+            if kind == 'positions':
+                # 新导入的职位还没有区间
+                affected_positions.update(row[0] for row in db.session.query(Position.id).filter(
+                    Position.id.not_in(select(PositionInterval.position_id))
+                ))
+            if affected_positions:
+                mark_as_of_pending(db.session.connection(), affected_positions)
+                db.session.commit()
+                if app.config['AS_OF_VIEW']:
+                    notify_as_of_worker()
+        if affected_officials and career_summary_available():
+            refresh_career_summaries(db.session.connection(), affected_officials)
+            db.session.commit()
+        if change_log_available():
+            record_changes(db.session.connection(), [_change_row(CHANGE_ENTITIES[model][0], 'reload', None, None)])
+            db.session.commit()
+            change_notifier.notify()
+        after_bulk_write()
+
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(IMPORT_KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='默认按扩展名判断')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True)
+def import_data_command(kind: str, path: str, fmt: Optional[str], chunk_size: int) -> None:
+    fmt = fmt or detect_format(path, None)
+    if fmt is None:
+        raise click.UsageError('无法从扩展名判断格式，请指定 --format')
+    with open(path, 'rb') as f:
+        report = import_records(kind, f, fmt, chunk_size)
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+
+# 职位编辑：单个 PUT 与批量接口共用，校验失败时抛出 ValueError，由调用方回滚。
+# 任职记录一次 IN 查询取出，日期统一经 parse_date 校验，新增与修改在提交时的同一次 flush 中批量写入
+def _optional_date(value: Any, label: str) -> Optional[date]:
+    if value in (None, ''):
+        return None
+    try:
+        return parse_date(str(value))
+    except ValueError as e:
+        raise ValueError(f"{label}: {e}")
+
+def apply_appointment_updates(position_id: int, items: Any) -> None:
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError("appointments 必须是对象数组")
+    try:
+        ids = {int(item['id']) for item in items if item.get('id') is not None}
+        official_ids = {int(item['official_id']) for item in items if item.get('official_id') is not None}
+    except (TypeError, ValueError):
+        raise ValueError("appointments 中的 id 与 official_id 必须是整数")
+    existing = {a.id: a for a in Appointment.query.filter(Appointment.id.in_(ids)).all()} if ids else {}
+    officials = {row_id for (row_id,) in db.session.query(Official.id).filter(Official.id.in_(official_ids))} \
+        if official_ids else set()
+
+    new_appointments = []
+    for i, item in enumerate(items):
+        label = f"appointments[{i}]"
+        if item.get('id') is not None:
+            appointment = existing.get(int(item['id']))
+            if appointment is None:
+                continue  # 与原有行为一致：忽略不存在的任职 id
+        else:
+            if item.get('official_id') is None or not item.get('start_date'):
+                raise ValueError(f"{label}: 新增任职需要 official_id 和 start_date")
+            appointment = Appointment(position_id=position_id)
+            new_appointments.append(appointment)
+
+        if item.get('official_id') is not None:
+            if int(item['official_id']) not in officials:
+                raise ValueError(f"{label}: 官员 {item['official_id']} 不存在")
+            appointment.official_id = int(item['official_id'])
+        if 'start_date' in item:
+            start_date = _optional_date(item['start_date'], f"{label}.start_date")
+            if start_date is None:
+                raise ValueError(f"{label}: start_date 不能为空")
+            appointment.start_date = start_date
+        if 'end_date' in item:
+            appointment.end_date = _optional_date(item['end_date'], f"{label}.end_date")
+        if appointment.end_date and appointment.end_date < appointment.start_date:
+            raise ValueError(f"{label}: end_date 早于 start_date")
+        for field in ('source_text', 'source_reference'):
+            if field in item:
+                setattr(appointment, field, item[field])
+    db.session.add_all(new_appointments)
+
+def apply_position_update(position: Position, data: Dict[str, Any], target_date: date) -> None:
+    # 更新职位基本信息
+    new_parent_id = data.get('parent_id', position.parent_id)
+    if new_parent_id != position.parent_id:
+        if new_parent_id is not None and db.session.get(Position, new_parent_id) is None:
+            raise ValueError("上级职位不存在")
+        if creates_cycle(position.id, new_parent_id):
+            raise ValueError("不能将职位移动到其自身或下级之下")
+        closure_move(position.id, new_parent_id)
+    position.name = data.get('name', position.name)
+    position.parent_id = new_parent_id  # 修正：使用parent_id而非category
+
+    # 更新或创建职能信息
+    if 'function' in data:
+        func_data = data['function']
+        existing_func = PositionFunction.query.filter(
+            PositionFunction.position_id == position.id,
+            PositionFunction.date == target_date
+        ).order_by(PositionFunction.id).first()
+
+        if existing_func:
+            existing_func.description = func_data.get('description', existing_func.description)
+            existing_func.source_text = func_data.get('source_text', existing_func.source_text)
+            existing_func.source_reference = func_data.get('source_reference', existing_func.source_reference)
+        else:
+            db.session.add(PositionFunction(
+                position_id=position.id,
+                date=target_date,
+                description=func_data.get('description'),
+                source_text=func_data.get('source_text'),
+                source_reference=func_data.get('source_reference')
+            ))
+
+    # 更新或创建任职信息
+    if 'appointments' in data:
+        apply_appointment_updates(position.id, data['appointments'])
 
 # API路由
 @app.route('/api/positions', methods=['GET', 'POST'])  # 新增POST方法支持
@@ -136,30 +1595,7 @@ def get_positions() -> Response:
         except ValueError as e:
             return make_response(jsonify({"error": str(e)}), 400)
         
-        positions = Position.query.all()
-        result = []
-        
-        for pos in positions:
-            # 获取指定日期的职能信息
-            func = PositionFunction.query.filter(
-                PositionFunction.position_id == pos.id,
-                PositionFunction.date <= target_date
-            ).order_by(PositionFunction.date.desc()).first()
-            
-            # 获取指定日期的任职官员
-            appointments = Appointment.query.filter(
-                Appointment.position_id == pos.id,
-                Appointment.start_date <= target_date,
-                (Appointment.end_date.is_(None) | (Appointment.end_date >= target_date))
-            ).all()
-            
-            pos_dict = pos.to_dict()
-            pos_dict['function'] = func.to_dict() if func else None
-            pos_dict['appointments'] = [app.to_dict() for app in appointments]
-            
-            result.append(pos_dict)
-        
-        return jsonify(result)
+        return cached_date_response('positions', target_date, lambda: snapshot_for_date(target_date))
     
     elif request.method == 'POST':
         # 处理创建新职位的逻辑
@@ -177,6 +1613,8 @@ def get_positions() -> Response:
         new_position.name = name
         new_position.parent_id = data.get('parent_id')  # 修正：使用parent_id而非category
         db.session.add(new_position)
+        db.session.flush()
+        closure_add(new_position.id, new_position.parent_id)
         db.session.commit()
         
         # 如果有职能信息，创建对应的职能记录
@@ -184,7 +1622,7 @@ def get_positions() -> Response:
             func_data = data['function']
             try:
                 date_str = func_data.get('date') or data.get('date')
-                date = parse_date(date_str)
+                date = parse_body_date(date_str)
             except ValueError as e:
                 print(f"日期解析错误: {e}")  # 添加日志输出
                 return make_response(jsonify({"error": str(e)}), 400)
@@ -219,12 +1657,12 @@ def position_detail(position_id: int) -> Response:
         # 获取职能历史
         functions = PositionFunction.query.filter(
             PositionFunction.position_id == position_id
-        ).order_by(PositionFunction.date).all()
+        ).order_by(PositionFunction.date, PositionFunction.id).all()
         
         # 获取任职历史
         appointments = Appointment.query.filter(
             Appointment.position_id == position_id
-        ).order_by(Appointment.start_date).all()
+        ).order_by(Appointment.start_date, Appointment.id).all()
         
         return jsonify({
             'position': position.to_dict(),
@@ -235,68 +1673,111 @@ def position_detail(position_id: int) -> Response:
     elif request.method == 'PUT':
         data = request.json or {}
         try:
-            target_date = parse_date(data.get('date'))
+            apply_position_update(position, data, parse_body_date(data.get('date')))
         except ValueError as e:
+            db.session.rollback()
             return make_response(jsonify({"error": str(e)}), 400)
         
-        # 更新职位基本信息
-        position.name = data.get('name', position.name)
-        position.parent_id = data.get('parent_id', position.parent_id)  # 修正：使用parent_id而非category
-        
-        # 更新或创建职能信息
-        if 'function' in data:
-            func_data = data['function']
-            existing_func = PositionFunction.query.filter(
-                PositionFunction.position_id == position_id,
-                PositionFunction.date == target_date
-            ).first()
-            
-            if existing_func:
-                existing_func.description = func_data.get('description', existing_func.description)
-                existing_func.source_text = func_data.get('source_text', existing_func.source_text)
-                existing_func.source_reference = func_data.get('source_reference', existing_func.source_reference)
-            else:
-                new_func = PositionFunction()
-                new_func.position_id = position_id
-                new_func.date = target_date
-                new_func.description = func_data.get('description')
-                new_func.source_text = func_data.get('source_text')
-                new_func.source_reference = func_data.get('source_reference')
-                db.session.add(new_func)
-        
-        # 更新或创建任职信息
-        if 'appointments' in data:
-            for app_data in data['appointments']:
-                if 'id' in app_data:
-                    appointment = Appointment.query.get(app_data['id'])
-                    if appointment:
-                        appointment.official_id = app_data.get('official_id', appointment.official_id)
-                        appointment.start_date = app_data.get('start_date', appointment.start_date)
-                        appointment.end_date = app_data.get('end_date', appointment.end_date)
-                        appointment.source_text = app_data.get('source_text', appointment.source_text)
-                        appointment.source_reference = app_data.get('source_reference', appointment.source_reference)
-                else:
-                    new_app = Appointment()
-                    new_app.position_id = position_id
-                    new_app.official_id = app_data['official_id']
-                    new_app.start_date = app_data['start_date']
-                    new_app.end_date = app_data.get('end_date')
-                    new_app.source_text = app_data.get('source_text')
-                    new_app.source_reference = app_data.get('source_reference')
-                    db.session.add(new_app)
-        
         db.session.commit()
         return jsonify({'success': True, 'message': '职位更新成功'})
     # 添加默认返回值
     return make_response(jsonify({"error": "Invalid request method"}), 405)
 
+# 批量编辑：一次请求保存多个职位的修改（例如一次机构调整），全部校验通过才提交，否则整体回滚。
+# 请求体 {"date": "YYYY-MM-DD", "positions": [{"id": 1, ...与 PUT 相同的字段}, {"name": "新设职位", "parent_id": 1}]}
+# 不带 id 的项新建职位；每项可用自己的 date 覆盖外层的 date（职能记录的生效日期）
+POSITION_BATCH_LIMIT = 1000
+
+@app.route('/api/positions/batch', methods=['POST'])
+def position_batch() -> Response:
+    data = request.get_json(silent=True) or {}
+    items = data.get('positions')
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return make_response(jsonify({"error": "positions 必须是对象数组"}), 400)
+    if len(items) > POSITION_BATCH_LIMIT:
+        return make_response(jsonify({"error": f"单次最多 {POSITION_BATCH_LIMIT} 个职位"}), 400)
+    try:
+        default_date = parse_body_date(data.get('date'))
+        ids = {int(item['id']) for item in items if item.get('id') is not None}
+    except (TypeError, ValueError) as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    positions = {p.id: p for p in Position.query.filter(Position.id.in_(ids)).all()} if ids else {}
+    missing = sorted(ids - positions.keys())
+    if missing:
+        return make_response(jsonify({"error": f"职位不存在: {missing}"}), 404)
+
+    saved = []
+    try:
+        for i, item in enumerate(items):
+            try:
+                target_date = parse_body_date(item['date']) if item.get('date') else default_date
+                if item.get('id') is None:
+                    name = item.get('name')
+                    if not name or not str(name).strip():
+                        raise ValueError("职位名称不能为空")
+                    # 先作为根职位建立，上级由 apply_position_update 按移动处理（含存在性与环检查）
+                    position = Position(name=name)
+                    db.session.add(position)
+                    db.session.flush()
+                    closure_add(position.id, None)
+                else:
+                    position = positions[int(item['id'])]
+                apply_position_update(position, item, target_date)
+            except ValueError as e:
+                raise ValueError(f"positions[{i}]: {e}")
+            saved.append(position.id)
+    except ValueError as e:
+        db.session.rollback()
+        return make_response(jsonify({"error": str(e)}), 400)
+    db.session.commit()
+    return jsonify({'success': True, 'ids': saved, 'message': f'已保存 {len(saved)} 个职位'})
+
+# 层级查询：均基于闭包表，一条带索引的查询完成
+@app.route('/api/positions/<int:position_id>/subtree', methods=['GET'])
+def position_subtree(position_id: int) -> Response:
+    Position.query.get_or_404(position_id)
+    max_depth = request.args.get('max_depth', type=int)
+    query = db.session.query(Position, PositionClosure.depth).join(
+        PositionClosure, PositionClosure.descendant_id == Position.id
+    ).filter(PositionClosure.ancestor_id == position_id)
+    if max_depth is not None:
+        query = query.filter(PositionClosure.depth <= max_depth)
+    rows = query.order_by(PositionClosure.depth, Position.id).all()
+    return jsonify([dict(pos.to_dict(), depth=depth) for pos, depth in rows])
+
+@app.route('/api/positions/<int:position_id>/ancestors', methods=['GET'])
+def position_ancestors(position_id: int) -> Response:
+    # 从根到自身的路径
+    Position.query.get_or_404(position_id)
+    rows = db.session.query(Position, PositionClosure.depth).join(
+        PositionClosure, PositionClosure.ancestor_id == Position.id
+    ).filter(PositionClosure.descendant_id == position_id).order_by(PositionClosure.depth.desc()).all()
+    return jsonify([dict(pos.to_dict(), distance=depth) for pos, depth in rows])
+
+@app.route('/api/positions/<int:position_id>/depth', methods=['GET'])
+def position_depth(position_id: int) -> Response:
+    Position.query.get_or_404(position_id)
+    as_descendant = PositionClosure.descendant_id == position_id
+    as_ancestor = PositionClosure.ancestor_id == position_id
+    depth, height, descendants = db.session.query(
+        func.max(db.case((as_descendant, PositionClosure.depth))),
+        func.max(db.case((as_ancestor, PositionClosure.depth))),
+        func.sum(db.case((as_ancestor & (PositionClosure.depth > 0), 1), else_=0))
+    ).filter(as_descendant | as_ancestor).one()
+    return jsonify({
+        'id': position_id,
+        'depth': depth or 0,
+        'subtree_height': height or 0,
+        'descendant_count': descendants or 0
+    })
+
 @app.route('/api/officials/<int:official_id>', methods=['GET', 'PUT'])  # 修改：将POST改为PUT
 def official_detail(official_id: int) -> Response:
     if request.method == 'GET':
         official = Official.query.get_or_404(official_id)
         appointments = Appointment.query.filter(
             Appointment.official_id == official_id
-        ).order_by(Appointment.start_date).all()
+        ).order_by(Appointment.start_date, Appointment.id).all()
         
         return jsonify({
             'official': official.to_dict(),
@@ -315,6 +1796,74 @@ def official_detail(official_id: int) -> Response:
     # 添加默认返回值
     return make_response(jsonify({"error": "Invalid request method"}), 405)
 
+@app.route('/api/officials/<int:official_id>/career', methods=['GET'])
+def official_career(official_id: int) -> Response:
+    # ?date= 为统计日期（默认今天），未卸任的任职计至该日
+    official = Official.query.get_or_404(official_id)
+    try:
+        as_of = parse_date(request.args.get('date'))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    entries = career_appointments([official_id]).get(official_id, [])
+    return jsonify(career_payload(official, entries, as_of))
+
+# 批量仕历：请求体 {"ids": [1, 2, ...], "date": "YYYY-MM-DD"}，按 ids 的顺序返回，一次查询取出全部任职
+@app.route('/api/officials/careers', methods=['POST'])
+def official_careers() -> Response:
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids:
+        return make_response(jsonify({"error": "ids 必须是非空数组"}), 400)
+    if len(ids) > CAREER_BATCH_LIMIT:
+        return make_response(jsonify({"error": f"单次最多 {CAREER_BATCH_LIMIT} 名官员"}), 400)
+    try:
+        ids = list(dict.fromkeys(int(official_id) for official_id in ids))
+        as_of = parse_date(data.get('date'))
+    except (TypeError, ValueError) as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    officials = {o.id: o for o in Official.query.filter(Official.id.in_(ids)).all()}
+    missing = [official_id for official_id in ids if official_id not in officials]
+    if missing:
+        return make_response(jsonify({"error": f"官员不存在: {missing}"}), 404)
+    entries = career_appointments(ids)
+    return jsonify({'as_of': as_of.isoformat(), 'careers': [
+        career_payload(officials[official_id], entries.get(official_id, []), as_of) for official_id in ids
+    ]})
+
+# 仕历摘要列表：按官员 id 分页（?after= 为上一页返回的 next_after），或用 ?ids=1,2,3 指定官员；
+# 没有任职记录的官员统计为 null
+@app.route('/api/officials/career-summary', methods=['GET'])
+def official_career_summary() -> Response:
+    if not career_summary_available():
+        return make_response(jsonify({"error": "仕历摘要表不存在，请执行 flask migrate-db"}), 503)
+    try:
+        as_of = parse_date(request.args.get('date'))
+        ids = [int(i) for i in request.args['ids'].split(',') if i.strip()] if request.args.get('ids') else None
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    limit = min(max(request.args.get('limit', CAREER_SUMMARY_PAGE_SIZE, type=int), 1), CAREER_SUMMARY_MAX_PAGE_SIZE)
+    query = db.session.query(Official, OfficialCareerSummary).outerjoin(
+        OfficialCareerSummary, OfficialCareerSummary.official_id == Official.id
+    )
+    if ids is not None:
+        if len(ids) > CAREER_SUMMARY_MAX_PAGE_SIZE:
+            return make_response(jsonify({"error": f"单次最多 {CAREER_SUMMARY_MAX_PAGE_SIZE} 名官员"}), 400)
+        rows = query.filter(Official.id.in_(ids)).order_by(Official.id).all()
+        has_more = False
+    else:
+        after = request.args.get('after', type=int)
+        if after is not None:
+            query = query.filter(Official.id > after)
+        rows = query.order_by(Official.id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    return jsonify({
+        'as_of': as_of.isoformat(),
+        'officials': [dict(official.to_dict(), stats=summary.to_dict(as_of) if summary else None)
+                      for official, summary in rows],
+        'next_after': rows[-1][0].id if has_more else None
+    })
+
 @app.route('/api/connections', methods=['GET', 'POST'])
 def connections() -> Response:
     if request.method == 'GET':
@@ -323,11 +1872,9 @@ def connections() -> Response:
         except ValueError as e:
             return make_response(jsonify({"error": str(e)}), 400)
         
-        connections = Connection.query.filter(
-            Connection.date <= target_date
-        ).all()
-        
-        return jsonify([conn.to_dict() for conn in connections])
+        return cached_date_response('connections', target_date, lambda: [
+            conn.to_dict() for conn in Connection.query.filter(Connection.date <= target_date).order_by(Connection.id).all()
+        ])
     
     elif request.method == 'POST':
         data = request.json or {}
@@ -337,7 +1884,7 @@ def connections() -> Response:
         try:
             date_str = data.get('date')
             if date_str:
-                new_conn.date = parse_date(date_str)
+                new_conn.date = parse_body_date(date_str)
         except ValueError as e:
             return make_response(jsonify({"error": str(e)}), 400)
         new_conn.label = data.get('label')
@@ -352,6 +1899,247 @@ def connections() -> Response:
     # 添加默认返回值
     return make_response(jsonify({"error": "Invalid request method"}), 405)
 
+@app.route('/api/appointments/active', methods=['GET'])
+def active_appointments() -> Response:
+    # 某日谁在任：启用区间索引时直接查内存，否则走 (position_id, start_date, end_date) 索引的范围查询
+    try:
+        target_date = parse_date(request.args.get('date'))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    
+    if app.config['APPOINTMENT_INTERVAL_INDEX']:
+        sync_change_log()
+        rows = get_appointment_index().active_on(target_date)
+    else:
+        rows = db.session.query(
+            Appointment.id, Appointment.position_id, Appointment.official_id
+        ).filter(
+            Appointment.start_date <= target_date,
+            (Appointment.end_date.is_(None) | (Appointment.end_date >= target_date))
+        ).order_by(Appointment.start_date, Appointment.id).all()
+    
+    return jsonify([
+        {'id': row[0], 'position_id': row[1], 'official_id': row[2]} for row in rows
+    ])
+
+# 关系图查询：在内存图索引上计算，只返回相关的职位和关系；?date= 指定生效日期（默认今天）
+def _graph_payload(distances: Dict[int, Optional[int]], connection_ids: List[int]) -> Dict[str, Any]:
+    positions = {p.id: p for p in Position.query.filter(Position.id.in_(list(distances))).all()} if distances else {}
+    connections = {c.id: c for c in Connection.query.filter(Connection.id.in_(connection_ids)).all()} if connection_ids else {}
+    nodes = []
+    for position_id, distance in distances.items():
+        node = positions[position_id].to_dict() if position_id in positions else {'id': position_id}
+        if distance is not None:
+            node['distance'] = distance
+        nodes.append(node)
+    return {
+        'nodes': nodes,
+        'edges': [connections[cid].to_dict() for cid in connection_ids if cid in connections]
+    }
+
+@app.route('/api/graph/neighborhood', methods=['GET'])
+def graph_neighborhood() -> Response:
+    position_id = request.args.get('position_id', type=int)
+    if position_id is None:
+        return make_response(jsonify({"error": "position_id is required"}), 400)
+    k = min(max(request.args.get('k', 1, type=int), 0), 10)
+    try:
+        target_date = parse_date(request.args.get('date'))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+
+    sync_change_log()
+    distances, connection_ids = get_connection_graph().neighborhood(position_id, k, target_date)
+    return jsonify(_graph_payload(distances, connection_ids))
+
+@app.route('/api/graph/path', methods=['GET'])
+def graph_path() -> Response:
+    # ?from=&to= 两个职位之间经过关系最少的路径；?directed=1 只沿 from -> to 方向
+    source = request.args.get('from', type=int)
+    target = request.args.get('to', type=int)
+    if source is None or target is None:
+        return make_response(jsonify({"error": "from and to are required"}), 400)
+    directed = request.args.get('directed') in ('1', 'true')
+    try:
+        target_date = parse_date(request.args.get('date'))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+
+    sync_change_log()
+    found = get_connection_graph().shortest_path(source, target, target_date, directed)
+    if found is None:
+        return jsonify({'found': False, 'nodes': [], 'edges': []})
+    path, connection_ids = found
+    payload = _graph_payload({position_id: step for step, position_id in enumerate(path)}, connection_ids)
+    payload['found'] = True
+    return jsonify(payload)
+
+@app.route('/api/graph/components', methods=['GET'])
+def graph_components() -> Response:
+    # 带 ?position_id= 时返回其所在的连通分量，否则返回全部分量（仅含有关系的职位）的成员 id
+    try:
+        target_date = parse_date(request.args.get('date'))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+
+    sync_change_log()
+    graph = get_connection_graph()
+    position_id = request.args.get('position_id', type=int)
+    if position_id is not None:
+        members = graph.component(position_id, target_date)
+        return jsonify(_graph_payload({member: None for member in members}, []))
+    components = graph.components(target_date)
+    return jsonify([{'size': len(members), 'position_ids': members} for members in components])
+
+# 组织图：?date= 为快照日期（默认今天），?bbox=x0,y0,x1,y1 只返回与视口相交的节点和关系。
+# 节点为 GET /api/positions 的条目加上中心坐标 x/y、层级 depth 与上级坐标 parent_xy，
+# 关系为 GET /api/connections 的条目加上两端坐标；bounds 为整张图的范围
+@app.route('/api/layout', methods=['GET'])
+def org_chart_layout() -> Response:
+    try:
+        target_date = parse_date(request.args.get('date'))
+        bbox = tree_layout.parse_bbox(request.args.get('bbox'))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    chart = get_chart(target_date)
+    layout = chart['layout']
+    edges = chart['edges'] if bbox is None else [
+        edge for edge in chart['edges'] if tree_layout.segment_in_bbox(edge['from_xy'], edge['to_xy'], bbox)
+    ]
+    return jsonify({
+        'date': target_date.isoformat(),
+        'bounds': list(layout.bounds()),
+        'node_size': {'width': tree_layout.NODE_WIDTH, 'height': tree_layout.NODE_HEIGHT},
+        'bbox': list(bbox) if bbox else None,
+        'nodes': [chart['nodes'][key] for key in layout.keys(bbox) if key in chart['nodes']],
+        'edges': edges
+    })
+
+# 全文检索：?q= 检索词（空格分隔的多个词为 AND），?type= 逗号分隔的实体类型，
+# ?start=&end= 只返回时间区间与之重叠的职能/任职记录，结果按 bm25 相关度排序并附带高亮片段
+SEARCH_LIMIT_MAX = 100
+
+@app.route('/api/search', methods=['GET'])
+def search() -> Response:
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return make_response(jsonify({"error": "q is required"}), 400)
+    if not search_enabled():
+        return make_response(jsonify({"error": "全文检索索引不可用，请在支持 FTS5 的 SQLite 上执行 flask migrate-db"}), 503)
+    types = [t for t in (request.args.get('type') or '').split(',') if t]
+    unknown = [t for t in types if t not in SEARCH_ENTITIES]
+    if unknown:
+        return make_response(jsonify({"error": f"未知类型: {', '.join(unknown)}"}), 400)
+    try:
+        start = parse_date(request.args['start']) if request.args.get('start') else None
+        end = parse_date(request.args['end']) if request.args.get('end') else None
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), SEARCH_LIMIT_MAX)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    hits = search_index.search(db.session.connection(), query, types, _ordinal(start), _ordinal(end),
+                               limit, offset)
+    entities: Dict[str, Dict[int, Any]] = {}
+    for entity_type, group in groupby(sorted(hits), key=lambda hit: hit[0]):
+        model = SEARCH_ENTITIES[entity_type][0]
+        ids = {int(hit[1]) for hit in group}
+        entities[entity_type] = {obj.id: obj for obj in model.query.filter(model.id.in_(ids)).all()}
+
+    results = []
+    for entity_type, entity_id, field, score in hits:
+        obj = entities[entity_type].get(int(entity_id))
+        if obj is None:
+            continue
+        results.append({
+            'type': entity_type,
+            'id': obj.id,
+            'field': field,
+            'score': round(-score, 4),
+            'snippet': search_index.highlight(getattr(obj, field) or '', query),
+            'entity': obj.to_dict()
+        })
+    return jsonify({'query': query, 'offset': offset, 'limit': limit, 'results': results})
+
+@app.route('/api/timeline', methods=['GET'])
+def timeline() -> Response:
+    # ?start=&end= 为闭区间（均可省略）；?after= 为上一页返回的 next 游标；?limit= 为每页变化点数
+    try:
+        start = parse_date(request.args['start']) if request.args.get('start') else None
+        end = parse_date(request.args['end']) if request.args.get('end') else None
+        after = parse_date(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    limit = min(max(request.args.get('limit', TIMELINE_PAGE_SIZE, type=int), 1), TIMELINE_MAX_PAGE_SIZE)
+
+    lower = _shift_bound(start, -1) if start else None
+    if after is not None and (lower is None or after > lower):
+        lower = after
+    page_end, has_more = _timeline_page_end(lower, end, limit)
+    next_cursor = page_end.isoformat() if has_more and page_end else None
+
+    return Response(
+        stream_with_context(_stream_timeline(lower, page_end, next_cursor)),
+        mimetype='application/json'
+    )
+
+# 变更增量：?since=<seq> 返回其后的变更（按 seq 升序，每页 ?limit= 条），不带 since 时只返回当前的 last_seq。
+# 客户端先取 last_seq 再加载全部列表，之后从该 seq 起拉取增量或订阅 /api/changes/stream；
+# since 之后的记录已被清理时返回 410，需重新加载全部数据
+def _change_log_error() -> Optional[Response]:
+    if not change_log_available():
+        return make_response(jsonify({"error": "变更日志表不存在，请执行 flask migrate-db"}), 503)
+    return None
+
+@app.route('/api/changes', methods=['GET'])
+def changes() -> Response:
+    error = _change_log_error()
+    if error is not None:
+        return error
+    try:
+        since = change_feed.parse_since(request.args.get('since'))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    last_seq = db.session.query(func.max(ChangeLog.seq)).scalar() or 0
+    if since is None:
+        return jsonify({'last_seq': last_seq, 'changes': [], 'has_more': False})
+    first = change_gap(since)
+    if first is not None:
+        return make_response(jsonify({"error": "since 之后的变更已被清理，请重新加载全部数据", "first_seq": first}), 410)
+    limit = min(max(request.args.get('limit', CHANGE_PAGE_SIZE, type=int), 1), CHANGE_MAX_PAGE_SIZE)
+    rows = fetch_changes(since, limit + 1)
+    return jsonify({
+        'last_seq': rows[min(len(rows), limit) - 1]['seq'] if rows else max(since, last_seq),
+        'changes': rows[:limit],
+        'has_more': len(rows) > limit
+    })
+
+# 变更推送（SSE）：?since= 或 Last-Event-ID 指定续传位置，都不带时从当前最新的变更之后开始；
+# 每个事件的 id 为 seq，data 与 /api/changes 中的条目相同。每个连接占用一个工作线程，到期后由客户端重连续传
+@app.route('/api/changes/stream', methods=['GET'])
+def change_stream() -> Response:
+    error = _change_log_error()
+    if error is not None:
+        return error
+    try:
+        since = change_feed.parse_since(request.args.get('since') or request.headers.get('Last-Event-ID'))
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+    if since is None:
+        since = db.session.query(func.max(ChangeLog.seq)).scalar() or 0
+    first = change_gap(since)
+    if first is not None:
+        return make_response(jsonify({"error": "since 之后的变更已被清理，请重新加载全部数据", "first_seq": first}), 410)
+    db.session.close()
+    response = Response(stream_with_context(change_feed.stream(
+        _stream_fetch, since, change_notifier,
+        app.config['CHANGE_STREAM_POLL_SECONDS'], app.config['CHANGE_STREAM_MAX_SECONDS'], CHANGE_PAGE_SIZE,
+        lambda obj: json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    )), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 关闭 nginx 的响应缓冲
+    return response
+
 @app.route('/api/date-convert', methods=['GET'])
 def date_convert() -> Response:
     date_str = request.args.get('date')
@@ -360,15 +2148,83 @@ def date_convert() -> Response:
     except ValueError as e:
         return make_response(jsonify({"error": str(e)}), 400)
     
-    lunar_date = get_lunar_date(date_obj)
-    ganzhi_date = get_ganzhi_date(date_obj)
-    return jsonify({
-        'gregorian': date_obj.strftime('%Y-%m-%d'),
-        'lunar': lunar_date,
-        'ganzhi': ganzhi_date
-    })
+    return jsonify(convert_date(date_obj))
+
+@app.route('/api/date-convert/batch', methods=['GET', 'POST'])
+def date_convert_batch() -> Response:
+    # GET ?start=&end= 转换一个日期区间；POST {"dates": [...]} 转换任意日期列表
+    try:
+        if request.method == 'POST':
+            date_strs = (request.get_json(silent=True) or {}).get('dates') or []
+            if not isinstance(date_strs, list):
+                return make_response(jsonify({"error": "dates must be a list"}), 400)
+            if len(date_strs) > DATE_CONVERT_BATCH_LIMIT:
+                return make_response(jsonify({"error": f"最多转换 {DATE_CONVERT_BATCH_LIMIT} 个日期"}), 400)
+            dates = []
+            for i, value in enumerate(date_strs):
+                # 与 /api/dates/normalize 相同：null、数字、空串不能当作「今天」转换
+                if not isinstance(value, str) or not value.strip():
+                    raise ValueError(f"dates[{i}] must be a non-empty string")
+                dates.append(parse_date(value.strip()))
+        else:
+            start = parse_date(request.args.get('start'))
+            end = parse_date(request.args.get('end') or request.args.get('start'))
+            if end < start:
+                return make_response(jsonify({"error": "end must not be earlier than start"}), 400)
+            if (end - start).days >= DATE_CONVERT_BATCH_LIMIT:
+                return make_response(jsonify({"error": f"最多转换 {DATE_CONVERT_BATCH_LIMIT} 个日期"}), 400)
+            dates = [date.fromordinal(o) for o in range(start.toordinal(), end.toordinal() + 1)]
+    except ValueError as e:
+        return make_response(jsonify({"error": str(e)}), 400)
+
+    return jsonify([convert_date(d) for d in dates])
+
+# 批量日期规范化（供导入前预处理）：请求体 {"dates": ["熙宁三年三月初五", "1070-04-23", ...]}，
+# 按原顺序返回 {"input", "date": "YYYY-MM-DD"}，无法解析的条目返回 {"input", "error"}，不影响其他条目；
+# 同一批中重复的写法只解析一次
+@app.route('/api/dates/normalize', methods=['POST'])
+def normalize_dates() -> Response:
+    date_strs = (request.get_json(silent=True) or {}).get('dates')
+    if not isinstance(date_strs, list):
+        return make_response(jsonify({"error": "dates must be a list"}), 400)
+    if len(date_strs) > DATE_CONVERT_BATCH_LIMIT:
+        return make_response(jsonify({"error": f"最多转换 {DATE_CONVERT_BATCH_LIMIT} 个日期"}), 400)
+    resolved: Dict[str, Dict[str, Any]] = {}
+    results = []
+    for value in date_strs:
+        text = value.strip() if isinstance(value, str) else ''
+        entry = resolved.get(text)
+        if entry is None:
+            try:
+                if not text:
+                    raise ValueError("date must be a non-empty string")
+                entry = {'date': parse_date(text).isoformat()}
+            except ValueError as e:
+                entry = {'error': str(e)}
+            resolved[text] = entry
+        results.append({'input': value, **entry})
+    return jsonify(results)
+
+@app.route('/api/import/<kind>', methods=['POST'])
+def bulk_import(kind: str) -> Response:
+    # 请求体为 multipart 的 file 字段或原始 CSV / JSONL；?format= 可覆盖自动判断
+    if kind not in IMPORT_KINDS:
+        return make_response(jsonify({"error": f"kind must be one of {', '.join(sorted(IMPORT_KINDS))}"}), 400)
+    upload = request.files.get('file')
+    if upload is not None:
+        stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, detect_format(None, request.mimetype)
+    fmt = request.args.get('format') or fmt
+    if fmt not in ('csv', 'jsonl'):
+        return make_response(jsonify({"error": "format must be csv or jsonl"}), 400)
+    chunk_size = min(max(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int), 1), 10000)
+
+    report = import_records(kind, stream, fmt, chunk_size)
+    return jsonify(report.to_dict())
 
 if __name__ == '__main__':
+    # 仅用于本地开发（FLASK_DEBUG=1 开启调试模式），生产环境使用 gunicorn -c gunicorn.conf.py app:app
     with app.app_context():
-        db.create_all()
-    app.run(debug=True)
\ No newline at end of file
+        migrate_db()
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1')
\ No newline at end of file
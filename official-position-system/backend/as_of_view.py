@@ -0,0 +1,45 @@
+# backend/as_of_view.py 文件
+# 「某日视图」物化表的区间计算：一个职位的全部职能与任职把时间轴切分为若干区间，
+# 区间内该职位的当前职能与在任任职不变。区间为闭区间 [valid_from, valid_to]，
+# 首个区间从 date.min 开始、最后一个区间到 date.max 结束，覆盖整条时间轴。
+
+from datetime import date, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+# (valid_from, valid_to, function_id, appointment_ids)
+Interval = Tuple[date, date, Optional[int], Tuple[int, ...]]
+
+
+def position_intervals(functions: Sequence[Tuple[int, date]],
+                       appointments: Sequence[Tuple[int, date, Optional[date]]]) -> List[Interval]:
+    """functions 为 (id, date)，appointments 为 (id, start_date, end_date)。
+
+    与 build_snapshot 的规则一致：当前职能取日期不晚于当日的最新一条（同日取 id 最小者），
+    在任任职为 start_date <= 当日 <= end_date（end_date 为空表示未卸任），按 id 排序。
+    相邻且内容相同的区间合并为一个。
+    """
+    points = {date.min}
+    points.update(d for _, d in functions)
+    for _, start, end in appointments:
+        points.add(start)
+        if end is not None and end < date.max:
+            points.add(end + timedelta(days=1))
+    ordered_functions = sorted(functions, key=lambda f: (f[1], -f[0]))
+    ordered_appointments = sorted(appointments)
+
+    result: List[Interval] = []
+    current: Optional[int] = None
+    index = 0
+    starts = sorted(points)
+    for i, point in enumerate(starts):
+        while index < len(ordered_functions) and ordered_functions[index][1] <= point:
+            current = ordered_functions[index][0]
+            index += 1
+        active = tuple(a[0] for a in ordered_appointments
+                       if a[1] <= point and (a[2] is None or a[2] >= point))
+        valid_to = starts[i + 1] - timedelta(days=1) if i + 1 < len(starts) else date.max
+        if result and result[-1][2:] == (current, active):
+            result[-1] = (result[-1][0], valid_to, current, active)
+        else:
+            result.append((point, valid_to, current, active))
+    return result
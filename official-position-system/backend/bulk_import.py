@@ -0,0 +1,113 @@
+# backend/bulk_import.py 文件
+# 批量导入流水线：流式读取 CSV / JSONL，逐行校验转换后按块批量插入（executemany），
+# 每块一个事务；某块插入失败时回滚并逐行重试，定位出错的行，其余行照常导入
+
+import codecs
+import csv
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    """导入结果：处理行数、成功行数以及每行的错误（最多记录 MAX_REPORTED_ERRORS 条）。"""
+
+    def __init__(self) -> None:
+        self.processed = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    name = (filename or '').lower()
+    if name.endswith('.csv') or 'csv' in (content_type or ''):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')) or 'ndjson' in (content_type or '') or 'jsonl' in (content_type or ''):
+        return 'jsonl'
+    return None
+
+
+def read_rows(stream: Any, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """从二进制流中逐行产出 (行号, 数据)；JSONL 中无法解析的行以异常对象代替数据。"""
+    text = codecs.getreader('utf-8-sig')(stream)
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            # 空单元格视为未填写
+            yield reader.line_num, {k: (v if v != '' else None) for k, v in row.items() if k}
+    elif fmt == 'jsonl':
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, ValueError(f'Invalid JSON: {e}')
+    else:
+        raise ValueError('format must be csv or jsonl')
+
+
+def run_import(rows: Iterable[Tuple[int, Any]],
+               prepare: Callable[[Dict[str, Any]], Dict[str, Any]],
+               insert_chunk: Callable[[List[Dict[str, Any]]], None],
+               commit: Callable[[], None],
+               rollback: Callable[[], None],
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> ImportReport:
+    """prepare 把一行转换为插入参数（校验失败抛 ValueError）；insert_chunk 批量插入一块。"""
+    report = ImportReport()
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+
+    def flush() -> None:
+        if not chunk:
+            return
+        try:
+            insert_chunk([params for _, params in chunk])
+            commit()
+            report.inserted += len(chunk)
+        except Exception:
+            rollback()
+            # 逐行重试以找出出错的行
+            for line, params in chunk:
+                try:
+                    insert_chunk([params])
+                    commit()
+                    report.inserted += 1
+                except Exception as e:
+                    rollback()
+                    report.add_error(line, str(getattr(e, 'orig', e)))
+        chunk.clear()
+
+    for line, row in rows:
+        report.processed += 1
+        if isinstance(row, Exception):
+            report.add_error(line, str(row))
+            continue
+        if not isinstance(row, dict):
+            report.add_error(line, 'Row must be an object')
+            continue
+        try:
+            chunk.append((line, prepare(row)))
+        except (ValueError, TypeError, KeyError) as e:
+            report.add_error(line, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    return report
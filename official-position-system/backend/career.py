@@ -0,0 +1,88 @@
+# backend/career.py 文件
+# 官员仕历统计：由一名官员的全部任职区间计算在任时段、空档与兼任，
+# 仕历接口与仕历摘要表（official_career_summary）共用。区间为闭区间，end_date 为空表示未卸任。
+
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# (任职 id, 职位 id, start_date, end_date)
+CareerAppointment = Tuple[int, int, date, Optional[date]]
+# 在任时段：任职区间的并集，相邻（前一段结束次日即开始）的合并为一段；未卸任的时段结束为 None
+Period = Tuple[date, Optional[date]]
+
+
+def merge_periods(appointments: Sequence[CareerAppointment]) -> List[Period]:
+    periods: List[Period] = []
+    for _, _, start, end in sorted(appointments, key=lambda a: (a[2], a[0])):
+        if periods:
+            last_start, last_end = periods[-1]
+            if last_end is None:
+                continue
+            if start <= last_end + timedelta(days=1):
+                periods[-1] = (last_start, None if end is None else max(last_end, end))
+                continue
+        periods.append((start, end))
+    return periods
+
+
+def gaps(periods: Sequence[Period]) -> List[Tuple[date, date, int]]:
+    """相邻时段之间的空档 (首日, 末日, 天数)。"""
+    result = []
+    for (_, end), (start, _) in zip(periods, periods[1:]):
+        first, last = end + timedelta(days=1), start - timedelta(days=1)
+        result.append((first, last, (last - first).days + 1))
+    return result
+
+
+def concurrent_posts(appointments: Sequence[CareerAppointment]) -> Tuple[Dict[int, List[int]], int]:
+    """返回 ({任职 id: 与之时间重叠的其他任职 id}, 同时在任的最大任职数)。"""
+    ordered = sorted(appointments, key=lambda a: (a[2], a[0]))
+    overlaps: Dict[int, List[int]] = {a[0]: [] for a in ordered}
+    for i, (first_id, _, _, first_end) in enumerate(ordered):
+        for second_id, _, second_start, _ in ordered[i + 1:]:
+            if first_end is not None and second_start > first_end:
+                continue
+            overlaps[first_id].append(second_id)
+            overlaps[second_id].append(first_id)
+
+    # 扫描线：同一天开始的计入、结束次日才移出
+    events = []
+    for _, _, start, end in ordered:
+        events.append((start, 1))
+        if end is not None and end < date.max:
+            events.append((end + timedelta(days=1), -1))
+    active = peak = 0
+    for _, delta in sorted(events, key=lambda e: (e[0], e[1])):
+        active += delta
+        peak = max(peak, active)
+    return {k: sorted(v) for k, v in overlaps.items()}, peak
+
+
+def summarize(appointments: Sequence[CareerAppointment]) -> Dict[str, Any]:
+    """与查询日期无关的统计，写入仕历摘要表；任期合计由 tenure_days 在读取时按 as_of 计算。"""
+    periods = merge_periods(appointments)
+    closed = [(start, end) for start, end in periods if end is not None]
+    spans = gaps(periods)
+    overlaps, peak = concurrent_posts(appointments)
+    return {
+        'appointment_count': len(appointments),
+        'position_count': len({a[1] for a in appointments}),
+        'first_start': periods[0][0] if periods else None,
+        'last_end': periods[-1][1] if periods else None,
+        'open_since': periods[-1][0] if periods and periods[-1][1] is None else None,
+        'closed_tenure_days': sum((end - start).days + 1 for start, end in closed),
+        'max_concurrent': peak,
+        'concurrent_appointments': sum(1 for ids in overlaps.values() if ids),
+        'gap_count': len(spans),
+        'longest_gap_days': max((days for _, _, days in spans), default=0),
+        'total_gap_days': sum(days for _, _, days in spans),
+    }
+
+
+def tenure_days(summary: Dict[str, Any], as_of: date) -> int:
+    """在任天数合计：已卸任的时段按实际天数，未卸任的时段计至 as_of（含当日）。"""
+    days = summary['closed_tenure_days']
+    open_since = summary['open_since']
+    if open_since is not None and open_since <= as_of:
+        days += (as_of - open_since).days + 1
+    return days
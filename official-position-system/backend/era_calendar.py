@@ -0,0 +1,191 @@
+# backend/era_calendar.py 文件
+# 年号纪年与农历日期的解析：日期参数除 YYYY-MM-DD 外还可写作「熙宁三年三月初五」「南宋绍兴十一年十二月廿九日」
+# 「熙宁三年闰三月甲子」「农历1070年3月5日」等，统一换算为前推格里历的 date。
+# 年号表在模块加载时建立索引，农历换算查 lunar_table 的月表，每次解析只有字典与数组读取。
+# 年号的第 N 年即该年号元年所在农历年之后第 N - 1 年；年中改元的那一年新旧年号都可使用，不校验改元的月份。
+
+import re
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from lunar_table import GANZHI_CYCLE, ganzhi_day, get_table, solar_from_lunar
+
+
+class Era(NamedTuple):
+    dynasty: str
+    name: str
+    first_year: int  # 元年所在的农历年
+    last_year: int
+
+
+# 年号表：(朝代, 年号, 元年, 末年)；同一朝代内重名的年号另用别名区分（如元代的后至元）
+ERAS = tuple(Era(*row) for row in (
+    ('北宋', '建隆', 960, 963), ('北宋', '乾德', 963, 968), ('北宋', '开宝', 968, 976),
+    ('北宋', '太平兴国', 976, 984), ('北宋', '雍熙', 984, 987), ('北宋', '端拱', 988, 989),
+    ('北宋', '淳化', 990, 994), ('北宋', '至道', 995, 997), ('北宋', '咸平', 998, 1003),
+    ('北宋', '景德', 1004, 1007), ('北宋', '大中祥符', 1008, 1016), ('北宋', '天禧', 1017, 1021),
+    ('北宋', '乾兴', 1022, 1022), ('北宋', '天圣', 1023, 1032), ('北宋', '明道', 1032, 1033),
+    ('北宋', '景祐', 1034, 1038), ('北宋', '宝元', 1038, 1040), ('北宋', '康定', 1040, 1041),
+    ('北宋', '庆历', 1041, 1048), ('北宋', '皇祐', 1049, 1054), ('北宋', '至和', 1054, 1056),
+    ('北宋', '嘉祐', 1056, 1063), ('北宋', '治平', 1064, 1067), ('北宋', '熙宁', 1068, 1077),
+    ('北宋', '元丰', 1078, 1085), ('北宋', '元祐', 1086, 1094), ('北宋', '绍圣', 1094, 1098),
+    ('北宋', '元符', 1098, 1100), ('北宋', '建中靖国', 1101, 1101), ('北宋', '崇宁', 1102, 1106),
+    ('北宋', '大观', 1107, 1110), ('北宋', '政和', 1111, 1118), ('北宋', '重和', 1118, 1119),
+    ('北宋', '宣和', 1119, 1125), ('北宋', '靖康', 1126, 1127),
+    ('南宋', '建炎', 1127, 1130), ('南宋', '绍兴', 1131, 1162), ('南宋', '隆兴', 1163, 1164),
+    ('南宋', '乾道', 1165, 1173), ('南宋', '淳熙', 1174, 1189), ('南宋', '绍熙', 1190, 1194),
+    ('南宋', '庆元', 1195, 1200), ('南宋', '嘉泰', 1201, 1204), ('南宋', '开禧', 1205, 1207),
+    ('南宋', '嘉定', 1208, 1224), ('南宋', '宝庆', 1225, 1227), ('南宋', '绍定', 1228, 1233),
+    ('南宋', '端平', 1234, 1236), ('南宋', '嘉熙', 1237, 1240), ('南宋', '淳祐', 1241, 1252),
+    ('南宋', '宝祐', 1253, 1258), ('南宋', '开庆', 1259, 1259), ('南宋', '景定', 1260, 1264),
+    ('南宋', '咸淳', 1265, 1274), ('南宋', '德祐', 1275, 1276), ('南宋', '景炎', 1276, 1278),
+    ('南宋', '祥兴', 1278, 1279),
+    ('元', '中统', 1260, 1264), ('元', '至元', 1264, 1294), ('元', '元贞', 1295, 1297),
+    ('元', '大德', 1297, 1307), ('元', '至大', 1308, 1311), ('元', '皇庆', 1312, 1313),
+    ('元', '延祐', 1314, 1320), ('元', '至治', 1321, 1323), ('元', '泰定', 1324, 1328),
+    ('元', '致和', 1328, 1328), ('元', '天顺', 1328, 1328), ('元', '天历', 1328, 1330),
+    ('元', '至顺', 1330, 1333), ('元', '元统', 1333, 1335), ('元', '后至元', 1335, 1340),
+    ('元', '至正', 1341, 1368),
+    ('明', '洪武', 1368, 1398), ('明', '建文', 1399, 1402), ('明', '永乐', 1403, 1424),
+    ('明', '洪熙', 1425, 1425), ('明', '宣德', 1426, 1435), ('明', '正统', 1436, 1449),
+    ('明', '景泰', 1450, 1457), ('明', '天顺', 1457, 1464), ('明', '成化', 1465, 1487),
+    ('明', '弘治', 1488, 1505), ('明', '正德', 1506, 1521), ('明', '嘉靖', 1522, 1566),
+    ('明', '隆庆', 1567, 1572), ('明', '万历', 1573, 1620), ('明', '泰昌', 1620, 1620),
+    ('明', '天启', 1621, 1627), ('明', '崇祯', 1628, 1644),
+    ('清', '顺治', 1644, 1661), ('清', '康熙', 1662, 1722), ('清', '雍正', 1723, 1735),
+    ('清', '乾隆', 1736, 1795), ('清', '嘉庆', 1796, 1820), ('清', '道光', 1821, 1850),
+    ('清', '咸丰', 1851, 1861), ('清', '同治', 1862, 1874), ('清', '光绪', 1875, 1908),
+    ('清', '宣统', 1909, 1911),
+))
+# 年号的别名：后至元在史料中多写作至元
+ERA_ALIASES = {'后至元': '至元'}
+# 同一朝代内重名时唯一确定年号的写法：前至元即元世祖的至元
+DISTINCT_NAMES = {'前至元': ('元', '至元')}
+# 朝代前缀：宋 同时匹配北宋与南宋
+DYNASTY_GROUPS = {'北宋': ('北宋',), '南宋': ('南宋',), '宋': ('北宋', '南宋'), '元': ('元',),
+                  '明': ('明',), '清': ('清',)}
+
+_ERAS_BY_NAME: Dict[str, List[Era]] = {}
+for _era in ERAS:
+    _ERAS_BY_NAME.setdefault(_era.name, []).append(_era)
+for _alias, _name in ERA_ALIASES.items():
+    _ERAS_BY_NAME.setdefault(_name, []).extend(e for e in ERAS if e.name == _alias)
+for _name, _target in DISTINCT_NAMES.items():
+    _ERAS_BY_NAME[_name] = [e for e in ERAS if (e.dynasty, e.name) == _target]
+# 农历年 -> 该年可用的 (年号, 第几年)，供公历日期反查年号
+_ERAS_BY_YEAR: Dict[int, List[Tuple[Era, int]]] = {}
+for _era in ERAS:
+    for _year in range(_era.first_year, _era.last_year + 1):
+        _ERAS_BY_YEAR.setdefault(_year, []).append((_era, _year - _era.first_year + 1))
+
+_DIGITS = {'〇': 0, '零': 0, '一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_NUMBER = r'[0-9〇零一二三四五六七八九十廿卅]+'
+_MONTH_DAY = (
+    r'(?:(?P<leap>闰)?(?P<month>正|冬|腊|' + _NUMBER + r')月'
+    r'(?:(?P<day>初[一二三四五六七八九十]|' + _NUMBER + r')日?'
+    r'|(?P<ganzhi>[甲乙丙丁戊己庚辛壬癸][子丑寅卯辰巳午未申酉戌亥])日?)?)?'
+)
+_ERA_PATTERN = re.compile(
+    r'(?P<dynasty>' + '|'.join(sorted(DYNASTY_GROUPS, key=len, reverse=True)) + r')?'
+    r'(?P<era>' + '|'.join(sorted(_ERAS_BY_NAME, key=len, reverse=True)) + r')'
+    r'(?P<year>元|' + _NUMBER + r')年' + _MONTH_DAY
+)
+_LUNAR_PATTERN = re.compile(r'(?:农历|阴历)(?P<year>[0-9]{1,4})年' + _MONTH_DAY)
+
+
+def _number(text: str) -> int:
+    """阿拉伯数字或一百以内的中文数字（十二、二十、廿五、卅）。"""
+    if text.isdigit() and text.isascii():
+        return int(text)
+    text = text.replace('廿', '二十').replace('卅', '三十')
+    if '十' in text:
+        tens, _, ones = text.partition('十')
+        if len(tens) > 1 or len(ones) > 1 or (tens and tens not in _DIGITS) or (ones and ones not in _DIGITS):
+            raise ValueError(f"invalid number {text}")
+        return (_DIGITS[tens] if tens else 1) * 10 + (_DIGITS[ones] if ones else 0)
+    if any(c not in _DIGITS for c in text):
+        raise ValueError(f"invalid number {text}")
+    return int(''.join(str(_DIGITS[c]) for c in text))
+
+
+def _resolve_month_day(year: int, match: 're.Match[str]', table_path: Optional[str]) -> date:
+    month_text = match.group('month')
+    if month_text is None:
+        return solar_from_lunar(year, 1, 1, False, table_path)
+    month = {'正': 1, '冬': 11, '腊': 12}.get(month_text) or _number(month_text)
+    is_leap = match.group('leap') is not None
+    ganzhi = match.group('ganzhi')
+    if ganzhi is not None:
+        if ganzhi not in GANZHI_CYCLE:
+            raise ValueError(f"{ganzhi} is not a sexagenary day")
+        found = get_table(table_path).month(year, month, is_leap)
+        if found is None:
+            solar_from_lunar(year, month, 1, is_leap, table_path)  # 抛出年份或月份越界的错误
+        first, days = found
+        offset = (GANZHI_CYCLE.index(ganzhi) - GANZHI_CYCLE.index(ganzhi_day(first))) % 60
+        if offset >= days:
+            raise ValueError(f"no {ganzhi} day in that month")
+        return date.fromordinal(first.toordinal() + offset)
+    day_text = match.group('day')
+    day = 1 if day_text is None else _number(day_text[1:] if day_text.startswith('初') else day_text)
+    return solar_from_lunar(year, month, day, is_leap, table_path)
+
+
+def _distinct_name(era: Era) -> str:
+    for name, target in DISTINCT_NAMES.items():
+        if target == (era.dynasty, era.name):
+            return name
+    return era.name
+
+
+def parse(text: str, table_path: Optional[str] = None) -> Optional[date]:
+    """解析年号纪年或农历日期；只写到年或月时取该年正月初一或该月初一。
+    不是这两种写法时返回 None，写法正确但日期不存在（年份超出年号、无此闰月等）时抛出 ValueError。"""
+    text = text.strip().replace(' ', '')
+    match = _LUNAR_PATTERN.fullmatch(text)
+    if match:
+        return _resolve_month_day(int(match.group('year')), match, table_path)
+    match = _ERA_PATTERN.fullmatch(text)
+    if not match:
+        return None
+    number = 1 if match.group('year') == '元' else _number(match.group('year'))
+    dynasty = match.group('dynasty')
+    candidates = [era for era in _ERAS_BY_NAME[match.group('era')]
+                  if (dynasty is None or era.dynasty in DYNASTY_GROUPS[dynasty])
+                  and 1 <= number <= era.last_year - era.first_year + 1]
+    if not candidates:
+        eras = '、'.join(f"{e.dynasty}{e.name}（{e.last_year - e.first_year + 1} 年）" for e in _ERAS_BY_NAME[match.group('era')])
+        raise ValueError(f"year {number} is out of range for {eras}")
+    if len(candidates) > 1:
+        # 同一朝代内重名的改写为区分用的年号（前至元、后至元），不同朝代的加朝代前缀
+        labels = [_distinct_name(e) for e in candidates]
+        if len(set(labels)) < len(labels):
+            labels = [e.dynasty + label for e, label in zip(candidates, labels)]
+        eras = ' or '.join(f"{label} ({e.first_year}-{e.last_year})" for e, label in zip(candidates, labels))
+        raise ValueError(f"ambiguous reign name {match.group('era')}, write {eras}")
+    return _resolve_month_day(candidates[0].first_year + number - 1, match, table_path)
+
+
+_CN_DIGITS = '〇一二三四五六七八九'
+
+
+def _cn_number(n: int) -> str:
+    if n < 10:
+        return _CN_DIGITS[n]
+    tens, ones = divmod(n, 10)
+    return ('' if tens == 1 else _CN_DIGITS[tens]) + '十' + (_CN_DIGITS[ones] if ones else '')
+
+
+def _cn_day(day: int) -> str:
+    if day <= 10:
+        return '初' + _cn_number(day)
+    if 20 < day < 30:
+        return '廿' + _CN_DIGITS[day - 20]
+    return _cn_number(day)
+
+
+def era_names(lunar_year: int, month: int, day: int, is_leap: bool) -> List[str]:
+    """农历日期对应的年号纪年写法（如 北宋熙宁三年三月初五）；改元当年与朝代交替时有多个。"""
+    suffix = f"{'闰' if is_leap else ''}{'正' if month == 1 else _cn_number(month)}月{_cn_day(day)}"
+    return [f"{era.dynasty}{era.name}{'元' if number == 1 else _cn_number(number)}年{suffix}"
+            for era, number in _ERAS_BY_YEAR.get(lunar_year, ())]
@@ -0,0 +1,36 @@
+# backend/gunicorn.conf.py 文件
+# 生产环境启动方式（在 backend 目录下）：
+#   gunicorn -c gunicorn.conf.py app:app
+# 进程数 WEB_CONCURRENCY（默认 CPU 核数 + 1）、每进程线程数 WEB_THREADS（默认 4，同时决定连接池大小）、
+# 端口 PORT（默认 5000）均可用环境变量覆盖。数据库迁移在主进程启动时执行一次。
+# 注意：任职区间索引、关系图、响应缓存都是进程内的，每个工作进程各自维护一份；
+# 开启 AS_OF_VIEW 时，某日视图的后台重算线程在每个工作进程中按需启动，共同消费数据库中的待重算登记。
+# 变更推送（/api/changes/stream）的每个连接占用一个线程直到 CHANGE_STREAM_MAX_SECONDS 到期，订阅者较多时相应调大 WEB_THREADS。
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get('WEB_THREADS', '4'))
+worker_class = 'gthread'
+timeout = 60
+keepalive = 5
+# 请求数达到上限后重启工作进程，避免长时间运行的内存增长
+max_requests = 10000
+max_requests_jitter = 1000
+accesslog = '-'
+
+
+def on_starting(server):
+    from app import app, db, migrate_db
+    with app.app_context():
+        migrate_db()
+        # 主进程的连接不能被 fork 出的工作进程共用
+        db.engine.dispose()
+
+
+def post_fork(server, worker):
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
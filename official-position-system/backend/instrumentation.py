@@ -0,0 +1,160 @@
+# backend/instrumentation.py 文件
+# 可选的请求级性能统计：通过 SQLAlchemy 引擎事件统计每个请求的 SQL 语句数与数据库耗时，
+# 通过 JSON provider 统计序列化耗时，在 after_request 中汇总为 Server-Timing 响应头，
+# 并按路由累计到 Prometheus 文本格式的 /metrics 中。语句数超过阈值的请求记一条警告日志。
+# 统计数据保存在进程内，多进程部署时每个工作进程各自独立。
+# 流式响应（?stream=）的查询与序列化发生在 after_request 之后，不计入统计。
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Tuple
+
+from flask import Flask, Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一格是 +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str) -> List[str]:
+        result, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            result.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+        result.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        result.append(f'{name}_count{{{labels}}} {cumulative}')
+        return result
+
+
+class RouteStats:
+    def __init__(self) -> None:
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.response_bytes = 0
+
+
+class Metrics:
+    """按 (路由, 方法, 状态码) 汇总的请求统计。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str, int], RouteStats] = {}
+
+    def record(self, route: str, method: str, status: int, seconds: float, queries: int,
+               db_seconds: float, serialize_seconds: float, size: int) -> None:
+        with self._lock:
+            stats = self._routes.get((route, method, status))
+            if stats is None:
+                stats = self._routes[(route, method, status)] = RouteStats()
+            stats.duration.observe(seconds)
+            stats.queries.observe(queries)
+            stats.db_seconds += db_seconds
+            stats.serialize_seconds += serialize_seconds
+            stats.response_bytes += size
+
+    def render(self) -> str:
+        sections: Dict[str, List[str]] = {
+            'http_request_duration_seconds': ['# TYPE http_request_duration_seconds histogram'],
+            'http_request_db_queries': ['# TYPE http_request_db_queries histogram'],
+            'http_request_db_seconds_total': ['# TYPE http_request_db_seconds_total counter'],
+            'http_request_serialize_seconds_total': ['# TYPE http_request_serialize_seconds_total counter'],
+            'http_response_size_bytes_total': ['# TYPE http_response_size_bytes_total counter'],
+        }
+        with self._lock:
+            for (route, method, status), stats in sorted(self._routes.items()):
+                labels = f'route="{_escape(route)}",method="{method}",status="{status}"'
+                sections['http_request_duration_seconds'] += stats.duration.lines('http_request_duration_seconds', labels)
+                sections['http_request_db_queries'] += stats.queries.lines('http_request_db_queries', labels)
+                sections['http_request_db_seconds_total'].append(
+                    f'http_request_db_seconds_total{{{labels}}} {stats.db_seconds:.6f}')
+                sections['http_request_serialize_seconds_total'].append(
+                    f'http_request_serialize_seconds_total{{{labels}}} {stats.serialize_seconds:.6f}')
+                sections['http_response_size_bytes_total'].append(
+                    f'http_response_size_bytes_total{{{labels}}} {stats.response_bytes}')
+        return '\n'.join(line for lines in sections.values() for line in lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify 的序列化耗时计入当前请求。"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            if has_request_context() and 'instrumentation' in g:
+                g.instrumentation['serialize'] += time.perf_counter() - start
+
+
+def init_instrumentation(app: Flask, engine: Engine, query_threshold: int) -> Metrics:
+    """挂载引擎事件与请求钩子，并注册 /metrics。query_threshold 为 0 时不记录警告。"""
+    metrics = Metrics()
+    provider = TimedJSONProvider(app)
+    for option in ('ensure_ascii', 'sort_keys', 'compact', 'mimetype'):
+        setattr(provider, option, getattr(app.json, option))
+    app.json = provider
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any,
+                               context: Any, executemany: bool) -> None:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any,
+                              context: Any, executemany: bool) -> None:
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        if has_request_context() and 'instrumentation' in g:
+            g.instrumentation['queries'] += 1
+            g.instrumentation['db'] += elapsed
+
+    @app.before_request
+    def _start_request() -> None:
+        g.instrumentation = {'start': time.perf_counter(), 'queries': 0, 'db': 0.0, 'serialize': 0.0}
+
+    @app.after_request
+    def _finish_request(response: Response) -> Response:
+        data = g.pop('instrumentation', None)
+        if data is None:
+            return response
+        total = time.perf_counter() - data['start']
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        size = 0 if response.is_streamed else (response.calculate_content_length() or 0)
+        response.headers.add('Server-Timing', ', '.join((
+            f'db;dur={data["db"] * 1000:.2f};desc="{data["queries"]} queries"',
+            f'serialize;dur={data["serialize"] * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        )))
+        if route != '/metrics':
+            metrics.record(route, request.method, response.status_code, total, data['queries'],
+                           data['db'], data['serialize'], size)
+        if query_threshold and data['queries'] > query_threshold:
+            app.logger.warning('%s %s 执行了 %d 条 SQL（阈值 %d），数据库耗时 %.1f ms',
+                               request.method, request.full_path, data['queries'], query_threshold,
+                               data['db'] * 1000)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def prometheus_metrics() -> Response:
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    return metrics
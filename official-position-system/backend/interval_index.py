@@ -0,0 +1,122 @@
+# backend/interval_index.py 文件
+# 任职区间索引：以开始日期为键的增广树堆（treap），每个节点记录子树中最大的结束日期，
+# 支持期望 O(log n) 的插入/删除，以及只访问相关子树的「某日谁在任」查询（O(k·log n)）
+
+import random
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 未卸任（end_date 为空）的任职视为无限期
+OPEN_END = date.max.toordinal()
+
+
+class _Node:
+    __slots__ = ('key', 'end', 'max_end', 'priority', 'left', 'right', 'value')
+
+    def __init__(self, key: Tuple[int, int], end: int, value: Tuple[int, int]) -> None:
+        self.key = key  # (开始日期序数, 任职 id)
+        self.end = end
+        self.max_end = end
+        self.priority = random.random()
+        self.left: Optional['_Node'] = None
+        self.right: Optional['_Node'] = None
+        self.value = value  # (position_id, official_id)
+
+
+def _update(node: _Node) -> None:
+    node.max_end = node.end
+    if node.left and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _split(node: Optional[_Node], key: Tuple[int, int]) -> Tuple[Optional[_Node], Optional[_Node]]:
+    # 按键拆分为 (< key, >= key) 两棵树
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        _update(node)
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+def _merge(left: Optional[_Node], right: Optional[_Node]) -> Optional[_Node]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+class AppointmentIntervalIndex:
+    """任职记录的内存区间树，按任职 id 增量维护。"""
+
+    def __init__(self) -> None:
+        self._root: Optional[_Node] = None
+        self._keys: Dict[int, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, appointment_id: int) -> bool:
+        return appointment_id in self._keys
+
+    def clear(self) -> None:
+        self._root = None
+        self._keys.clear()
+
+    def upsert(self, appointment_id: int, position_id: int, official_id: int,
+               start_date: date, end_date: Optional[date]) -> None:
+        self.remove(appointment_id)
+        key = (start_date.toordinal(), appointment_id)
+        end = end_date.toordinal() if end_date else OPEN_END
+        node = _Node(key, end, (position_id, official_id))
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, node), right)
+        self._keys[appointment_id] = key
+
+    def remove(self, appointment_id: int) -> None:
+        key = self._keys.pop(appointment_id, None)
+        if key is None:
+            return
+        left, rest = _split(self._root, key)
+        _, right = _split(rest, (key[0], key[1] + 1))
+        self._root = _merge(left, right)
+
+    def load(self, rows: Iterable[Tuple[int, int, int, date, Optional[date]]]) -> None:
+        self.clear()
+        for row in rows:
+            self.upsert(*row)
+
+    def active_on(self, target_date: date) -> List[Tuple[int, int, int]]:
+        """返回在 target_date 在任的 (任职 id, position_id, official_id)，按开始日期排序。"""
+        point = target_date.toordinal()
+        result: List[Tuple[int, int, int]] = []
+        stack: List[_Node] = []
+        node = self._root
+        # 中序遍历；剪掉 max_end < point 的子树和开始日期晚于 point 的右侧
+        while stack or node is not None:
+            while node is not None and node.max_end >= point:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            current = stack.pop()
+            if current.key[0] > point:
+                break
+            if current.end >= point:
+                result.append((current.key[1],) + current.value)
+            node = current.right
+        return result
@@ -0,0 +1,197 @@
+# backend/lunar_history.py 文件
+# 1900 年以前的农历月表：lunardate 只收录 1900-2099 年，更早的月份按古历的规则推算——
+# 定朔（每月初一为真合朔所在日），以冬至所在月为十一月，两个冬至之间有十三个月时以第一个无中气的月为闰月；
+# 清顺治二年（1645，时宪历）以前按平气（太阳平黄经）定中气与冬至，之后按定气。
+# 合朔用 Meeus《天文算法》第 49 章的公式，太阳黄经用第 25 章的低精度公式，ΔT 用 Espenak–Meeus 多项式，
+# 日界取当时京师（1929 年起为东经 120°）的地方平时子夜。古历自身的推步误差无法复现，与史历个别月份的朔日可能相差一日。
+# 只在生成农历查询表时调用一次，结果随 lunar_table 的表文件保存。
+
+import math
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# 推算的起始农历年（宋建隆元年）；此前有平朔、建子等不同历法，不在推算范围内
+FIRST_YEAR = 960
+# 此年（时宪历）起改用定气
+TRUE_TERMS_FROM = 1645
+# 日界所用的经度：(此年以前, 东经度数)
+MERIDIANS = (
+    (1127, 114.35),  # 开封
+    (1281, 120.17),  # 临安
+    (1929, 116.40),  # 北京（元授时历起）
+    (10000, 120.0),  # 标准时
+)
+
+_SYNODIC_MONTH = 29.530588861
+_TROPICAL_YEAR = 365.242189
+_JD_ORDINAL_OFFSET = 1721425  # 儒略日（正午起算）与 date.toordinal() 的差
+
+
+def _poly(x: float, *coefficients: float) -> float:
+    result = 0.0
+    for c in reversed(coefficients):
+        result = result * x + c
+    return result
+
+
+def delta_t(year: float) -> float:
+    """力学时与世界时之差（秒）。"""
+    if year < 500:
+        return _poly(year / 100, 10583.6, -1014.41, 33.78311, -5.952053, -0.1798452, 0.022174192, 0.0090316521)
+    if year < 1600:
+        return _poly((year - 1000) / 100, 1574.2, -556.01, 71.23472, 0.319781, -0.8503463, -0.005050998, 0.0083572073)
+    if year < 1700:
+        return _poly(year - 1600, 120, -0.9808, -0.01532, 1 / 7129)
+    if year < 1800:
+        return _poly(year - 1700, 8.83, 0.1603, -0.0059285, 0.00013336, -1 / 1174000)
+    if year < 1860:
+        return _poly(year - 1800, 13.72, -0.332447, 0.0068612, 0.0041116, -0.00037436, 0.0000121272,
+                     -0.0000001699, 0.000000000875)
+    if year < 1900:
+        return _poly(year - 1860, 7.62, 0.5737, -0.251754, 0.01680668, -0.0004473624, 1 / 233174)
+    if year < 1920:
+        return _poly(year - 1900, -2.79, 1.494119, -0.0598939, 0.0061966, -0.000197)
+    if year < 1941:
+        return _poly(year - 1920, 21.20, 0.84493, -0.076100, 0.0020936)
+    if year < 1961:
+        return _poly(year - 1950, 29.07, 0.407, -1 / 233, 1 / 2547)
+    if year < 1986:
+        return _poly(year - 1975, 45.45, 1.067, -1 / 260, -1 / 718)
+    if year < 2005:
+        return _poly(year - 2000, 63.86, 0.3345, -0.060374, 0.0017275, 0.000651814, 0.00002373599)
+    if year < 2050:
+        return _poly(year - 2000, 62.92, 0.32217, 0.005589)
+    return -20 + 32 * ((year - 1820) / 100) ** 2 - 0.5628 * (2150 - year)
+
+
+# (系数, 乘以 E 的次数, M, M', F, Ω 的倍数)
+_NEW_MOON_TERMS = (
+    (-0.40720, 0, 0, 1, 0, 0), (0.17241, 1, 1, 0, 0, 0), (0.01608, 0, 0, 2, 0, 0), (0.01039, 0, 0, 0, 2, 0),
+    (0.00739, 1, -1, 1, 0, 0), (-0.00514, 1, 1, 1, 0, 0), (0.00208, 2, 2, 0, 0, 0), (-0.00111, 0, 0, 1, -2, 0),
+    (-0.00057, 0, 0, 1, 2, 0), (0.00056, 1, 1, 2, 0, 0), (-0.00042, 0, 0, 3, 0, 0), (0.00042, 1, 1, 0, 2, 0),
+    (0.00038, 1, 1, 0, -2, 0), (-0.00024, 1, -1, 2, 0, 0), (-0.00017, 0, 0, 0, 0, 1), (-0.00007, 0, 2, 1, 0, 0),
+    (0.00004, 0, 0, 2, -2, 0), (0.00004, 0, 3, 0, 0, 0), (0.00003, 0, 1, 1, -2, 0), (0.00003, 0, 0, 2, 2, 0),
+    (-0.00003, 0, 1, 1, 2, 0), (0.00003, 0, -1, 1, 2, 0), (-0.00002, 0, -1, 1, -2, 0), (-0.00002, 0, 1, 3, 0, 0),
+    (0.00002, 0, 0, 4, 0, 0),
+)
+# 行星摄动：(系数, 初相, 每朔望月的增量)
+_PLANETARY_TERMS = (
+    (0.000325, 299.77, 0.107408), (0.000165, 251.88, 0.016321), (0.000164, 251.83, 26.651886),
+    (0.000126, 349.42, 36.412478), (0.000110, 84.66, 18.206239), (0.000062, 141.74, 53.303771),
+    (0.000060, 207.14, 2.453732), (0.000056, 154.84, 7.306860), (0.000047, 34.52, 27.261239),
+    (0.000042, 207.19, 0.121824), (0.000040, 291.34, 1.844379), (0.000037, 161.72, 24.198154),
+    (0.000035, 239.56, 25.513099), (0.000023, 331.55, 3.592518),
+)
+
+
+def new_moon(k: int) -> float:
+    """第 k 次合朔的儒略日（力学时），k = 0 为 2000 年 1 月 6 日。"""
+    t = k / 1236.85
+    jde = 2451550.09766 + _SYNODIC_MONTH * k + _poly(t, 0, 0, 0.00015437, -0.000000150, 0.00000000073)
+    e = 1 - 0.002516 * t - 0.0000074 * t * t
+    m = math.radians(2.5534 + 29.10535670 * k + _poly(t, 0, 0, -0.0000014, -0.00000011))
+    mp = math.radians(201.5643 + 385.81693528 * k + _poly(t, 0, 0, 0.0107582, 0.00001238, -0.000000058))
+    f = math.radians(160.7108 + 390.67050284 * k + _poly(t, 0, 0, -0.0016118, -0.00000227, 0.000000011))
+    omega = math.radians(124.7746 - 1.56375588 * k + _poly(t, 0, 0, 0.0020672, 0.00000215))
+    for coefficient, e_power, cm, cmp, cf, comega in _NEW_MOON_TERMS:
+        jde += coefficient * e ** e_power * math.sin(cm * m + cmp * mp + cf * f + comega * omega)
+    for i, (coefficient, phase, rate) in enumerate(_PLANETARY_TERMS):
+        angle = phase + rate * k - (0.009173 * t * t if i == 0 else 0)
+        jde += coefficient * math.sin(math.radians(angle))
+    return jde
+
+
+def sun_longitude(jde: float) -> float:
+    """太阳视黄经（度）。"""
+    t = (jde - 2451545) / 36525
+    l0 = 280.46646 + 36000.76983 * t + 0.0003032 * t * t
+    m = math.radians(357.52911 + 35999.05029 * t - 0.0001537 * t * t)
+    c = ((1.914602 - 0.004817 * t - 0.000014 * t * t) * math.sin(m)
+         + (0.019993 - 0.000101 * t) * math.sin(2 * m) + 0.000289 * math.sin(3 * m))
+    omega = math.radians(125.04 - 1934.136 * t)
+    return (l0 + c - 0.00569 - 0.00478 * math.sin(omega)) % 360
+
+
+def mean_sun_longitude(jde: float) -> float:
+    """太阳平黄经（度），平气按此等分。"""
+    t = (jde - 2451545) / 36525
+    return (280.46646 + 36000.76983 * t + 0.0003032 * t * t - 0.00569) % 360
+
+
+def _term(longitude: Callable[[float], float], target: float, guess: float) -> float:
+    # 牛顿迭代求太阳黄经到达 target 的时刻
+    jde = guess
+    for _ in range(20):
+        step = ((target - longitude(jde) + 180) % 360 - 180) * _TROPICAL_YEAR / 360
+        jde += step
+        if abs(step) < 1e-6:
+            break
+    return jde
+
+
+def _to_ordinal(jde: float) -> int:
+    year = 2000 + (jde - 2451545) / _TROPICAL_YEAR
+    longitude = next(degrees for before, degrees in MERIDIANS if year < before)
+    local = jde - delta_t(year) / 86400 + longitude / 360
+    return math.floor(local + 0.5) - _JD_ORDINAL_OFFSET
+
+
+def _winter_solstice(year: int, longitude: Callable[[float], float]) -> float:
+    guess = 2451545 + (year - 2000) * _TROPICAL_YEAR + 355
+    return _term(longitude, 270, guess)
+
+
+def _month_k(jde: float) -> int:
+    # 时刻 jde 之前（含）最近一次合朔的序号
+    k = math.floor((jde - 2451550.09766) / _SYNODIC_MONTH) + 1
+    while new_moon(k) > jde:
+        k -= 1
+    return k
+
+
+def months(first_year: int, last_year: int) -> Iterator[Tuple[int, int, bool, int, int]]:
+    """依次给出农历 first_year 正月至 last_year 腊月的 (年, 月, 是否闰月, 初一的日期序数, 天数)。"""
+    new_moon_days: Dict[int, int] = {}
+
+    def first_day(k: int) -> int:
+        if k not in new_moon_days:
+            new_moon_days[k] = _to_ordinal(new_moon(k))
+        return new_moon_days[k]
+
+    # 每个岁（上一年冬至至本年冬至）单独编月：冬至所在月为十一月
+    for year in range(first_year, last_year + 2):
+        longitude = mean_sun_longitude if year < TRUE_TERMS_FROM else sun_longitude
+        start_solstice = _winter_solstice(year - 1, longitude)
+        end_solstice = _winter_solstice(year, longitude)
+        start_day, end_day = _to_ordinal(start_solstice), _to_ordinal(end_solstice)
+        k0 = _month_k(start_solstice + 1)
+        while first_day(k0) > start_day:
+            k0 -= 1
+        while first_day(k0 + 1) <= start_day:
+            k0 += 1
+        k1 = k0 + 12
+        while first_day(k1 + 1) <= end_day:
+            k1 += 1
+        while first_day(k1) > end_day:
+            k1 -= 1
+
+        leap_k = None
+        if k1 - k0 == 13:
+            # 中气：太阳黄经为 30° 的倍数的十二个节气
+            terms: List[int] = [start_day]
+            jde = start_solstice
+            for _ in range(12):
+                jde = _term(longitude, (longitude(jde) + 30 + 0.5) // 30 * 30 % 360, jde + 30.4)
+                terms.append(_to_ordinal(jde))
+            for k in range(k0 + 1, k1):
+                if not any(first_day(k) <= day < first_day(k + 1) for day in terms):
+                    leap_k = k
+                    break
+
+        number = 10
+        for k in range(k0, k1):
+            is_leap = k == leap_k
+            if not is_leap:
+                number = number % 12 + 1
+            label_year = year - 1 if number >= 11 else year
+            if first_year <= label_year <= last_year:
+                yield label_year, number, is_leap, first_day(k), first_day(k + 1) - first_day(k)
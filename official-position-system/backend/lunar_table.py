@@ -0,0 +1,186 @@
+# backend/lunar_table.py 文件
+# 公历转农历查询表：一次性展开宋建隆元年（960）正月初一起的每一天——1900 年以前的月份由 lunar_history 推算，
+# 1900-01-31 起按 lunardate 的年表——每天压缩为一个 32 位整数（年 << 10 | 月 << 6 | 闰月 << 5 | 日），
+# 公历转农历即一次数组下标访问；农历转公历查每月初一的下标（首次使用时逐月跳读一遍建立）。
+# 日期均为前推格里历（proleptic Gregorian，与 datetime.date 一致）。
+# 表可保存为二进制文件并通过 mmap 加载，多个进程共享同一份只读页。
+
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from datetime import date, timedelta
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+import lunardate
+from lunardate import LunarDate
+
+import lunar_history
+
+_MAGIC = 0x4C554E32  # 'LUN2'（加入 1900 年以前的月份），按本机字节序写入，读取不一致时重建
+_HEADER = struct.Struct('=IIII')  # magic, 起始日期序数, 天数, 年表长度
+_START = LunarDate._startDate
+
+GANZHI_STEMS = "甲乙丙丁戊己庚辛壬癸"
+GANZHI_BRANCHES = "子丑寅卯辰巳午未申酉戌亥"
+# 六十甲子，下标为距 1984-02-02（甲子日）的天数对 60 取模
+GANZHI_CYCLE = tuple(GANZHI_STEMS[i % 10] + GANZHI_BRANCHES[i % 12] for i in range(60))
+GANZHI_BASE_ORDINAL = date(1984, 2, 2).toordinal()
+
+
+def _pack(year: int, month: int, day: int, is_leap: bool) -> int:
+    return (year << 10) | (month << 6) | (int(is_leap) << 5) | day
+
+
+def _unpack(value: int) -> Tuple[int, int, int, bool]:
+    return value >> 10, (value >> 6) & 0xF, value & 0x1F, bool(value & 0x20)
+
+
+def build_values() -> array:
+    values = array('I')
+    for year, month, is_leap, _, days in lunar_history.months(lunar_history.FIRST_YEAR, 1899):
+        values.extend(_pack(year, month, day, is_leap) for day in range(1, days + 1))
+    # 与 LunarDate._fromOffset 相同的年、月展开顺序
+    for index, year_info in enumerate(lunardate.yearInfos):
+        for month, days, is_leap in LunarDate._enumMonth(year_info):
+            values.extend(_pack(1900 + index, month, day, is_leap) for day in range(1, days + 1))
+    return values
+
+
+class LunarTable:
+    """按天索引的农历查询表，values 可以是 array 或 mmap 上的 memoryview。"""
+
+    def __init__(self, values: Sequence[int], start_ordinal: Optional[int] = None) -> None:
+        self.values = values
+        self.start_ordinal = start_ordinal if start_ordinal is not None else _START.toordinal() - _history_days(values)
+        self.end_ordinal = self.start_ordinal + len(values)
+        self._months: Optional[Dict[Tuple[int, int, bool], Tuple[int, int]]] = None
+
+    def lookup(self, g_date: date) -> Optional[Tuple[int, int, int, bool]]:
+        offset = g_date.toordinal() - self.start_ordinal
+        if 0 <= offset < len(self.values):
+            return _unpack(self.values[offset])
+        return None
+
+    def month(self, year: int, month: int, is_leap: bool = False) -> Optional[Tuple[date, int]]:
+        """农历某月初一的公历日期与该月天数；不在表中时返回 None。"""
+        if self._months is None:
+            self._months = self._index_months()
+        found = self._months.get((year, month, bool(is_leap)))
+        if found is None:
+            return None
+        return date.fromordinal(self.start_ordinal + found[0]), found[1]
+
+    def _index_months(self) -> Dict[Tuple[int, int, bool], Tuple[int, int]]:
+        # 每月只读初一与第 30 天两个值：第 30 天仍属本月则为大月
+        months = {}
+        offset, count = 0, len(self.values)
+        while offset < count:
+            year, month, _, is_leap = _unpack(self.values[offset])
+            days = 30 if offset + 29 < count and self.values[offset + 29] & 0x1F == 30 else 29
+            months[(year, month, is_leap)] = (offset, min(days, count - offset))
+            offset += days
+        return months
+
+    def iter_range(self, start: date, end: date) -> Iterator[Tuple[date, Optional[Tuple[int, int, int, bool]]]]:
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            offset = ordinal - self.start_ordinal
+            value = self.values[offset] if 0 <= offset < len(self.values) else None
+            yield date.fromordinal(ordinal), (_unpack(value) if value is not None else None)
+
+    def save(self, path: str) -> None:
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.start_ordinal, len(self.values), len(lunardate.yearInfos)))
+            array('I', self.values).tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['LunarTable']:
+        # 表文件与当前 lunardate 年表不一致（或字节序不同）时返回 None
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapped) < _HEADER.size:
+            return None
+        magic, start_ordinal, count, years = _HEADER.unpack_from(mapped)
+        if (magic != _MAGIC or years != len(lunardate.yearInfos)
+                or len(mapped) != _HEADER.size + count * 4):
+            return None
+        return cls(memoryview(mapped)[_HEADER.size:].cast('I'), start_ordinal)
+
+
+_table_lock = threading.Lock()
+_table: Optional[LunarTable] = None
+
+
+def get_table(path: Optional[str] = None) -> LunarTable:
+    """返回进程内共享的查询表：优先 mmap 加载 path，不存在或失效时重新生成并尽量写回。"""
+    global _table
+    if _table is not None:
+        return _table
+    with _table_lock:
+        if _table is None:
+            table = None
+            if path and os.path.exists(path):
+                try:
+                    table = LunarTable.load(path)
+                except (OSError, ValueError):
+                    table = None
+            if table is None:
+                table = LunarTable(build_values())
+                if path:
+                    try:
+                        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                        table.save(path)
+                    except OSError:
+                        pass
+            _table = table
+    return _table
+
+
+def _history_days(values: Sequence[int]) -> int:
+    # 表中 1900-01-31 之前的天数：年份早于 1900 的条目都在表头
+    low, high = 0, len(values)
+    while low < high:
+        middle = (low + high) // 2
+        if values[middle] >> 10 < 1900:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def lunar_from_solar(g_date: date, path: Optional[str] = None) -> LunarDate:
+    table = get_table(path)
+    found = table.lookup(g_date)
+    if found is None:
+        # lunardate 对 1900 年以前的日期不报错而返回错误的结果，超出查询表范围时统一抛出 ValueError
+        raise ValueError(f"date out of range [{date.fromordinal(table.start_ordinal)}, "
+                         f"{date.fromordinal(table.end_ordinal)})")
+    return LunarDate(*found)
+
+
+def solar_from_lunar(year: int, month: int, day: int, is_leap: bool = False, path: Optional[str] = None) -> date:
+    found = get_table(path).month(year, month, is_leap)
+    if found is None:
+        end_year = 1900 + len(lunardate.yearInfos)
+        if not lunar_history.FIRST_YEAR <= year < end_year:
+            raise ValueError(f"year out of range [{lunar_history.FIRST_YEAR}, {end_year})")
+        raise ValueError("month out of range")
+    first, days = found
+    if not 1 <= day <= days:
+        raise ValueError("day out of range")
+    return first + timedelta(days=day - 1)
+
+
+def ganzhi_day(g_date: date) -> str:
+    return GANZHI_CYCLE[(g_date.toordinal() - GANZHI_BASE_ORDINAL) % 60]
+
+
+if __name__ == '__main__':
+    # 预生成表文件：python lunar_table.py <输出路径>
+    target = sys.argv[1] if len(sys.argv) > 1 else 'lunar_table.bin'
+    LunarTable(build_values()).save(target)
+    print(f'已生成 {target}')
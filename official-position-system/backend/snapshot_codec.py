@@ -0,0 +1,146 @@
+# backend/snapshot_codec.py 文件
+# 时间快照的紧凑编码：
+#   字段投影  ?fields=lean 或逗号分隔的字段路径（如 id,name,appointments.official_id），只保留需要的字段
+#   列式布局  ?format=columnar：每个字段一列，嵌套对象/数组拆成带父行号的子表，
+#             所有字符串（名称、日期、出处等）放入共享字符串表，列中只存下标
+#   MessagePack  Accept: application/x-msgpack（需安装 msgpack，否则仍返回 JSON）
+#   压缩      按 Accept-Encoding 选择 br（需安装 brotli）或 gzip
+
+import gzip
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import msgpack  # 可选依赖
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli  # 可选依赖
+except ImportError:
+    brotli = None
+
+LEAN_FIELDS = ('id', 'name', 'parent_id', 'appointments.official_id')
+MSGPACK_MIMETYPES = ('application/x-msgpack', 'application/msgpack')
+COMPRESS_MIN_BYTES = 1024
+
+
+def parse_fields(value: Optional[str]) -> Optional[Tuple[str, ...]]:
+    if not value:
+        return None
+    if value == 'lean':
+        return LEAN_FIELDS
+    return tuple(sorted({field.strip() for field in value.split(',') if field.strip()}))
+
+
+def project(rows: Iterable[Dict[str, Any]], fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """按字段路径裁剪每一行；'function' 保留整个对象，'function.id' 只保留其中的 id。"""
+    tree: Dict[str, Optional[set]] = {}
+    for path in fields:
+        head, _, rest = path.partition('.')
+        if not rest:
+            tree[head] = None
+        elif tree.get(head, set()) is not None:
+            tree.setdefault(head, set()).add(rest)
+
+    def pick(obj: Any, keys: set) -> Any:
+        return {k: obj[k] for k in obj if k in keys} if isinstance(obj, dict) else obj
+
+    result = []
+    for row in rows:
+        item = {}
+        for key, sub in tree.items():
+            if key not in row:
+                continue
+            value = row[key]
+            if sub is None:
+                item[key] = value
+            elif isinstance(value, list):
+                item[key] = [pick(v, sub) for v in value]
+            else:
+                item[key] = pick(value, sub)
+        result.append(item)
+    return result
+
+
+def to_columnar(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        index = string_ids.get(value)
+        if index is None:
+            index = string_ids[value] = len(strings)
+            strings.append(value)
+        return index
+
+    def table(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        columns: Dict[str, List[Any]] = {}
+        string_columns: List[str] = []
+        children: Dict[str, Any] = {}
+        for key in dict.fromkeys(k for record in records for k in record):
+            values = [record.get(key) for record in records]
+            if any(isinstance(v, (dict, list)) for v in values):
+                many = any(isinstance(v, list) for v in values)
+                parents, items = [], []
+                for row, value in enumerate(values):
+                    for item in (value if many else [value]) if value is not None else []:
+                        parents.append(row)
+                        items.append(item)
+                child = table(items)
+                child.update(row=parents, many=many)
+                children[key] = child
+            elif any(isinstance(v, str) for v in values):
+                string_columns.append(key)
+                columns[key] = [intern(v) if v is not None else None for v in values]
+            else:
+                columns[key] = values
+        return {'count': len(records), 'columns': columns, 'string_columns': string_columns,
+                'children': children}
+
+    body = table(rows)
+    return {'format': 'columnar', 'strings': strings, **body}
+
+
+def from_columnar(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """to_columnar 的逆变换（客户端解码方式的参考实现）。"""
+    strings = payload['strings']
+
+    def rows(t: Dict[str, Any]) -> List[Dict[str, Any]]:
+        result: List[Dict[str, Any]] = [{} for _ in range(t['count'])]
+        string_columns = set(t['string_columns'])
+        for key, column in t['columns'].items():
+            for row, value in zip(result, column):
+                row[key] = strings[value] if key in string_columns and value is not None else value
+        for key, child in t['children'].items():
+            for row in result:
+                row[key] = [] if child['many'] else None
+            for parent, item in zip(child['row'], rows(child)):
+                if child['many']:
+                    result[parent][key].append(item)
+                else:
+                    result[parent][key] = item
+        return result
+
+    return rows(payload)
+
+
+def pack(payload: Any) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def preferred_encoding(accept_encodings: Any) -> Optional[str]:
+    """accept_encodings 为 werkzeug 的 request.accept_encodings。"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """返回 (压缩后的内容, 实际使用的编码)；小响应不压缩。"""
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == 'br':
+        return brotli.compress(body, quality=5), 'br'
+    return gzip.compress(body, compresslevel=6), 'gzip'
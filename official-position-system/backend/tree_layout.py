@@ -0,0 +1,121 @@
+# backend/tree_layout.py 文件
+# 组织图的服务端布局：按上级关系把职位排成自上而下的分层树，客户端按视口（bbox）只取可见部分。
+# 布局是整齐树的简化版，O(n)：叶子按深度优先顺序依次占一列，上级位于第一个与最后一个下级的中点，
+# y 由层级深度决定；多个最高一级的职位左右并排。上级不存在或处于环中的职位视为最高一级。
+# 坐标为节点中心（像素），节点大小固定为 NODE_WIDTH × NODE_HEIGHT。
+
+import math
+from bisect import bisect_left, bisect_right
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+NODE_WIDTH = 160
+NODE_HEIGHT = 60
+H_GAP = 20  # 同一层相邻两列的间距
+V_GAP = 80  # 相邻两层的间距
+
+# (x0, y0, x1, y1)
+BBox = Tuple[float, float, float, float]
+
+
+def parse_bbox(value: Optional[str]) -> Optional[BBox]:
+    if not value:
+        return None
+    try:
+        x0, y0, x1, y1 = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("bbox must be x0,y0,x1,y1")
+    if not all(math.isfinite(v) for v in (x0, y0, x1, y1)):
+        raise ValueError("bbox must be x0,y0,x1,y1")
+    return min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)
+
+
+def segment_in_bbox(start: Tuple[float, float], end: Tuple[float, float], bbox: BBox) -> bool:
+    """线段是否经过 bbox（Liang–Barsky 裁剪）；跨越视口但两端都在视口外的关系也会返回。"""
+    x0, y0, x1, y1 = bbox
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    low, high = 0.0, 1.0
+    for p, q in ((-dx, start[0] - x0), (dx, x1 - start[0]), (-dy, start[1] - y0), (dy, y1 - start[1])):
+        if p == 0:
+            if q < 0:
+                return False
+        elif p < 0:
+            low = max(low, q / p)
+        else:
+            high = min(high, q / p)
+        if low > high:
+            return False
+    return True
+
+
+class TreeLayout:
+    """nodes 为 (职位 id, 上级 id)；同一上级的下级按 id 排序。"""
+
+    def __init__(self, nodes: Iterable[Tuple[Hashable, Optional[Hashable]]]) -> None:
+        parents = dict(nodes)
+        children: Dict[Hashable, List[Hashable]] = {}
+        roots = []
+        for key in sorted(parents):
+            parent = parents[key]
+            if parent is None or parent == key or parent not in parents:
+                roots.append(key)
+            else:
+                children.setdefault(parent, []).append(key)
+
+        self._parents: Dict[Hashable, Hashable] = {}
+        columns: Dict[Hashable, Tuple[float, int]] = {}
+        visited = set()
+        next_column = 0
+        # 先排全部最高一级的职位，再把环中剩下的职位逐个当作最高一级
+        for root in roots + sorted(parents):
+            if root in visited:
+                continue
+            visited.add(root)
+            stack: List[Tuple[Hashable, int, Optional[List[Hashable]]]] = [(root, 0, None)]
+            while stack:
+                node, depth, placed = stack.pop()
+                if placed is None:
+                    kids = [child for child in children.get(node, ()) if child not in visited]
+                    visited.update(kids)
+                    for child in kids:
+                        self._parents[child] = node
+                    stack.append((node, depth, kids))
+                    stack.extend((child, depth + 1, None) for child in reversed(kids))
+                elif placed:
+                    columns[node] = ((columns[placed[0]][0] + columns[placed[-1]][0]) / 2, depth)
+                else:
+                    columns[node] = (next_column, depth)
+                    next_column += 1
+
+        # 换算为像素坐标，并按 x 排序供视口查询二分
+        self._points = {key: (column * (NODE_WIDTH + H_GAP), depth * (NODE_HEIGHT + V_GAP), depth)
+                        for key, (column, depth) in columns.items()}
+        self._order = sorted(self._points, key=lambda k: self._points[k][0])
+        self._xs = [self._points[k][0] for k in self._order]
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def point(self, key: Hashable) -> Optional[Tuple[float, float, int]]:
+        """(x, y, 深度)；不在布局中时返回 None。"""
+        return self._points.get(key)
+
+    def parent(self, key: Hashable) -> Optional[Hashable]:
+        """布局中的上级（最高一级的职位为 None）。"""
+        return self._parents.get(key)
+
+    def bounds(self) -> BBox:
+        if not self._points:
+            return 0.0, 0.0, 0.0, 0.0
+        max_y = max(y for _, y, _ in self._points.values())
+        return (self._xs[0] - NODE_WIDTH / 2, -NODE_HEIGHT / 2,
+                self._xs[-1] + NODE_WIDTH / 2, max_y + NODE_HEIGHT / 2)
+
+    def keys(self, bbox: Optional[BBox] = None) -> List[Hashable]:
+        """按 x 排序的职位 id；指定 bbox 时只返回与之相交的节点。"""
+        if bbox is None:
+            return list(self._order)
+        x0, y0, x1, y1 = bbox
+        lo = bisect_left(self._xs, x0 - NODE_WIDTH / 2)
+        hi = bisect_right(self._xs, x1 + NODE_WIDTH / 2)
+        return [key for key in self._order[lo:hi]
+                if y0 - NODE_HEIGHT / 2 <= self._points[key][1] <= y1 + NODE_HEIGHT / 2]
@@ -1,21 +1,61 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, send_file, abort, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text, func, select, insert, delete, literal
+from sqlalchemy.orm import aliased
+import click
+import json
 import os
 import uuid
 import base64
-import lunardate
 import datetime
+from urllib.parse import urlsplit
+from lunar_table import lunar_from_solar
+from blob_store import (HASH_PATTERN, INLINE_MIMETYPES, THUMBNAIL_SIZES, blob_path, decode_base64_image,
+                        save_blob, sniff_mimetype, thumbnail_path)
+from bulk_import import DEFAULT_CHUNK_SIZE, detect_format, read_rows, run_import
+from graph_index import GraphIndex
+import tree_layout
+import change_feed
+import search_index
+from db_config import engine_options, normalize_url, tune_engine
+from instrumentation import init_instrumentation
 
 # 创建 Flask 应用实例
 app = Flask(__name__, static_folder='../frontend')
 
 # 配置数据库连接
 # 优先使用环境变量中的 DATABASE_URL，若未设置则使用 SQLite 数据库
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///official_positions.db')
+app.config['SQLALCHEMY_DATABASE_URI'] = normalize_url(os.environ.get('DATABASE_URL', 'sqlite:///official_positions.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 连接池按每个工作进程的线程数确定大小；PostgreSQL 开启连接预检，见 db_config.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# 可选的请求级性能统计：INSTRUMENTATION=1 时输出 Server-Timing 头并提供 /metrics，
+# 单个请求的 SQL 语句数超过 QUERY_COUNT_THRESHOLD 时记录警告（0 表示不检查）
+app.config['INSTRUMENTATION'] = os.environ.get('INSTRUMENTATION') == '1'
+app.config['QUERY_COUNT_THRESHOLD'] = int(os.environ.get('QUERY_COUNT_THRESHOLD', '50'))
 
 # 初始化 SQLAlchemy 数据库对象
 db = SQLAlchemy(app)
+with app.app_context():
+    tune_engine(db.engine)  # SQLite：WAL 与 pragma
+    if app.config['INSTRUMENTATION']:
+        init_instrumentation(app, db.engine, app.config['QUERY_COUNT_THRESHOLD'])
+
+# 流式导出时每批从数据库读取的行数
+STREAM_BATCH_SIZE = 500
+
+# 图片按内容哈希存放的目录
+app.config['BLOB_DIR'] = os.environ.get('BLOB_DIR', os.path.join(app.instance_path, 'blobs'))
+
+# 农历查询表文件（首次使用时生成，之后 mmap 加载）
+LUNAR_TABLE_PATH = os.path.join(app.instance_path, 'lunar_table.bin')
+# 批量农历转换单次最多的日期数
+LUNAR_BATCH_LIMIT = 100000
+
+# 变更推送（/api/changes/stream）：无本进程提交时检查新变更的间隔，以及单个连接的最长时间（到期后客户端自动续传）
+app.config['CHANGE_STREAM_POLL_SECONDS'] = float(os.environ.get('CHANGE_STREAM_POLL_SECONDS', '1'))
+app.config['CHANGE_STREAM_MAX_SECONDS'] = float(os.environ.get('CHANGE_STREAM_MAX_SECONDS', '120'))
 
 # 官职模型
 class Position(db.Model):
@@ -29,7 +69,17 @@ class Position(db.Model):
     rank = db.Column(db.String(50))
     superior_id = db.Column(db.String(36), db.ForeignKey('position.id'))
     subordinates = db.relationship('Position', backref=db.backref('superior', remote_side=[id]))
-    image = db.Column(db.Text)  # 存储图片的 Base64 编码
+    image = db.Column(db.Text)  # 旧数据：图片的 Base64 编码，迁移后清空
+    image_hash = db.Column(db.String(64))  # 图片在 blob 存储中的 SHA-256
+
+# 层级闭包表：每对 (上级, 下属) 一行，depth 为相隔层数，自身到自身为 0
+class PositionClosure(db.Model):
+    __table_args__ = (
+        db.Index('ix_position_closure_descendant', 'descendant_id', 'depth'),
+    )
+    ancestor_id = db.Column(db.String(36), db.ForeignKey('position.id'), primary_key=True)
+    descendant_id = db.Column(db.String(36), db.ForeignKey('position.id'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
 
 # 关系模型
 class Relationship(db.Model):
@@ -41,13 +91,28 @@ class Relationship(db.Model):
     source = db.relationship('Position', foreign_keys=[source_id])
     target = db.relationship('Position', foreign_keys=[target_id])
 
-# API 路由
+# 变更日志：每次写入的实体一行，seq 单调递增（AUTOINCREMENT，清理旧记录后也不复用）
+class ChangeLog(db.Model):
+    __table_args__ = {'sqlite_autoincrement': True}
+    seq = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.String(36))
+    op = db.Column(db.String(10), nullable=False)  # insert / update / delete / reload
+    data = db.Column(db.Text)  # 变更后的条目（JSON）
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
 
-# 获取所有官职信息
-@app.route('/api/positions', methods=['GET'])
-def get_positions():
-    positions = Position.query.all()
-    return jsonify([{
+def change_to_dict(c):
+    return {
+        'seq': c.seq,
+        'entity': c.entity,
+        'entity_id': c.entity_id,
+        'op': c.op,
+        'data': json.loads(c.data) if c.data else None,
+        'created_at': c.created_at.isoformat()
+    }
+
+def position_to_dict(p):
+    return {
         'id': p.id,
         'name': p.name,
         'dynasty': p.dynasty,
@@ -57,13 +122,336 @@ def get_positions():
         'end_year': p.end_year,
         'rank': p.rank,
         'superior_id': p.superior_id,
-        'image': p.image
-    } for p in positions])
+        # 已迁移的图片只返回地址，未迁移的旧数据仍内联 Base64
+        'image': f'{BLOB_URL_PREFIX}{p.image_hash}' if p.image_hash else p.image
+    }
+
+BLOB_URL_PREFIX = '/api/blobs/'
+
+def blob_digest_from_url(value):
+    """读取接口返回的图片地址（/api/blobs/<哈希>，可带协议和域名）中的哈希；不是图片地址时返回 None。"""
+    if value.startswith(('http://', 'https://')):
+        value = urlsplit(value).path
+    return value[len(BLOB_URL_PREFIX):] if value.startswith(BLOB_URL_PREFIX) else None
+
+# 将请求中的图片写入 blob 存储，返回哈希；空值表示清除图片。
+# 读取后原样提交的图片地址沿用已有的 blob，只有 data: / Base64 内容才解码保存
+def store_image(value):
+    if not value:
+        return None
+    root = app.config['BLOB_DIR']
+    digest = blob_digest_from_url(value)
+    if digest is not None:
+        if not HASH_PATTERN.match(digest) or not os.path.exists(blob_path(root, digest)):
+            raise ValueError('Image not found')
+        return digest
+    return save_blob(root, decode_base64_image(value))
+
+def apply_image(position, data):
+    if 'image' in data:
+        position.image_hash = store_image(data.get('image'))
+        position.image = None
+
+def relationship_to_dict(r):
+    return {
+        'id': r.id,
+        'source_id': r.source_id,
+        'target_id': r.target_id,
+        'relationship_type': r.relationship_type,
+        'description': r.description
+    }
+
+# 闭包表维护：新增、移动、删除职位时在同一事务内更新，整体重建用递归 CTE 一条语句完成
+MAX_HIERARCHY_DEPTH = 1000  # 递归深度上限，防止已有数据中的环导致无限递归
+
+def rebuild_closure():
+    child = aliased(Position)
+    tree = select(
+        Position.id.label('ancestor_id'), Position.id.label('descendant_id'), literal(0).label('depth')
+    ).cte('tree', recursive=True)
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, child.id, tree.c.depth + 1)
+        .select_from(tree)
+        .join(child, child.superior_id == tree.c.descendant_id)
+        .where(tree.c.depth < MAX_HIERARCHY_DEPTH)
+    )
+    db.session.execute(delete(PositionClosure))
+    db.session.execute(insert(PositionClosure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(tree.c.ancestor_id, tree.c.descendant_id, func.min(tree.c.depth))
+        .group_by(tree.c.ancestor_id, tree.c.descendant_id)
+    ))
+
+def closure_add(position_id, superior_id):
+    db.session.execute(insert(PositionClosure).values(
+        ancestor_id=position_id, descendant_id=position_id, depth=0
+    ))
+    if superior_id:
+        db.session.execute(insert(PositionClosure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(PositionClosure.ancestor_id, literal(position_id), PositionClosure.depth + 1)
+            .where(PositionClosure.descendant_id == superior_id)
+        ))
+
+def closure_detach(position_id):
+    # 断开以 position_id 为根的子树与其原上级链的联系
+    subtree = select(PositionClosure.descendant_id).where(PositionClosure.ancestor_id == position_id)
+    db.session.execute(delete(PositionClosure).where(
+        PositionClosure.descendant_id.in_(subtree),
+        PositionClosure.ancestor_id.not_in(subtree)
+    ))
+
+def closure_move(position_id, new_superior_id):
+    closure_detach(position_id)
+    if new_superior_id:
+        ancestors = aliased(PositionClosure)
+        descendants = aliased(PositionClosure)
+        db.session.execute(insert(PositionClosure).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(ancestors.ancestor_id, descendants.descendant_id, ancestors.depth + descendants.depth + 1)
+            .select_from(ancestors)
+            .join(descendants, descendants.ancestor_id == position_id)
+            .where(ancestors.descendant_id == new_superior_id)
+        ))
+
+def closure_add_paths(position_ids):
+    # 为一批职位补建到各级上级的闭包行：沿 superior_id 向上递归，一条 INSERT ... SELECT 完成
+    parent = aliased(Position)
+    up = select(
+        Position.id.label('descendant_id'), Position.id.label('ancestor_id'), literal(0).label('depth')
+    ).where(Position.id.in_(position_ids)).cte('up', recursive=True)
+    up = up.union_all(
+        select(up.c.descendant_id, parent.superior_id, up.c.depth + 1)
+        .join(parent, parent.id == up.c.ancestor_id)
+        .where(parent.superior_id.isnot(None), up.c.depth < MAX_HIERARCHY_DEPTH)
+    )
+    db.session.execute(insert(PositionClosure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(up.c.ancestor_id, up.c.descendant_id, func.min(up.c.depth))
+        .group_by(up.c.ancestor_id, up.c.descendant_id)
+    ))
+
+def closure_lift(position_ids, moves):
+    # 删除互不相属的若干职位并把其直属下级改挂到新上级（moves 为 {新上级: [下级, ...]}）：
+    # 先删去被删职位及其上级链与整棵子树之间的闭包行，再把每个下级子树与新上级的上级链两两相连
+    ancestors = select(PositionClosure.ancestor_id).where(PositionClosure.descendant_id.in_(position_ids))
+    subtree = select(PositionClosure.descendant_id).where(PositionClosure.ancestor_id.in_(position_ids))
+    db.session.execute(delete(PositionClosure).where(
+        PositionClosure.ancestor_id.in_(ancestors),
+        PositionClosure.descendant_id.in_(subtree)
+    ))
+    ancestor_rows = aliased(PositionClosure)
+    descendant_rows = aliased(PositionClosure)
+    for target, children in moves.items():
+        if not target:
+            continue
+        for start in range(0, len(children), 5000):
+            db.session.execute(insert(PositionClosure).from_select(
+                ['ancestor_id', 'descendant_id', 'depth'],
+                select(ancestor_rows.ancestor_id, descendant_rows.descendant_id,
+                       ancestor_rows.depth + descendant_rows.depth + 1)
+                .select_from(ancestor_rows)
+                .join(descendant_rows, descendant_rows.ancestor_id.in_(children[start:start + 5000]))
+                .where(ancestor_rows.descendant_id == target)
+            ))
+
+def creates_cycle(position_id, new_superior_id):
+    if not new_superior_id:
+        return False
+    return new_superior_id == position_id or db.session.query(PositionClosure.query.filter(
+        PositionClosure.ancestor_id == position_id,
+        PositionClosure.descendant_id == new_superior_id
+    ).exists()).scalar()
+
+# 全文检索：官职的名称与描述，起止年份用于按时间过滤；索引在写接口中与数据同一事务更新
+SEARCH_FIELDS = ('name', 'description')
+_search_state = {'enabled': None}
+
+def search_enabled():
+    if _search_state['enabled'] is None:
+        _search_state['enabled'] = inspect(db.engine).has_table(search_index.DOCUMENT_TABLE)
+    return _search_state['enabled']
+
+def position_search_document(get):
+    return ('position', get('id'), {field: get(field) for field in SEARCH_FIELDS},
+            get('start_year'), get('end_year'))
+
+def index_position(position):
+    if search_enabled():
+        _, position_id, fields, start_year, end_year = position_search_document(lambda name: getattr(position, name))
+        search_index.index(db.session.connection(), 'position', position_id, fields, start_year, end_year)
+
+def rebuild_search_index():
+    connection = db.session.connection()
+    search_index.create_tables(connection)
+    search_index.clear(connection)
+    rows = db.session.query(Position.id, Position.name, Position.description,
+                            Position.start_year, Position.end_year).yield_per(STREAM_BATCH_SIZE)
+    search_index.add(connection, (position_search_document(row._mapping.get) for row in rows))
+    _search_state['enabled'] = True
+
+# 关系图索引：首次查询时从 Relationship 加载，之后由增删接口在提交后同步（每个进程各自维护一份）。
+# 其他进程的提交由变更日志的最大 seq 发现：新增的记录不全是本进程提交的（见 change_feed.LocalChanges）时重新加载
+relationship_graph = GraphIndex()
+_relationship_graph_state = {'loaded': False, 'seq': None}
+
+def get_relationship_graph():
+    state = _relationship_graph_state
+    # 先取 seq 再加载，加载期间的提交会在下一次查询时发现
+    seq = latest_change_seq()
+    if state['loaded'] and seq != state['seq'] and not local_changes.only_local(state['seq'], seq):
+        state['loaded'] = False
+    if not state['loaded']:
+        relationship_graph.load(
+            (r.id, r.source_id, r.target_id, None)
+            for r in db.session.query(Relationship.id, Relationship.source_id, Relationship.target_id)
+        )
+        state['loaded'] = True
+    state['seq'] = seq
+    return relationship_graph
+
+def invalidate_relationship_graph():
+    _relationship_graph_state['loaded'] = False
+
+# 变更日志（见 change_feed.py）：各写入接口在提交前调用 record_change，与业务数据同一事务提交，
+# 提交后调用 notify_changes 唤醒本进程的推送连接；批量导入按类型追加一条 reload 记录，客户端收到后重新加载对应列表
+CHANGE_PAGE_SIZE = 500
+CHANGE_MAX_PAGE_SIZE = 5000
+change_notifier = change_feed.ChangeNotifier()
+local_changes = change_feed.LocalChanges()
+_change_log_state = {'available': None}
+
+def change_log_available():
+    if _change_log_state['available'] is None:
+        _change_log_state['available'] = inspect(db.engine).has_table(ChangeLog.__tablename__)
+    return _change_log_state['available']
+
+def record_change(entity, op, entity_id=None, data=None):
+    if change_log_available():
+        change = ChangeLog(entity=entity, op=op, entity_id=entity_id,
+                           data=json.dumps(data, ensure_ascii=False) if data is not None else None)
+        db.session.add(change)
+        db.session.info.setdefault('change_log', []).append(change)
+
+def notify_changes():
+    # 提交后调用：记下本进程提交的 seq（回滚的记录已不是持久对象，跳过）
+    changes = db.session.info.pop('change_log', [])
+    local_changes.add(state.identity[0] for state in map(inspect, changes) if state.persistent)
+    change_notifier.notify()
+
+def latest_change_seq():
+    return db.session.query(func.max(ChangeLog.seq)).scalar() if change_log_available() else None
+
+def fetch_changes(since, limit):
+    return [change_to_dict(c) for c in ChangeLog.query.filter(ChangeLog.seq > since).order_by(ChangeLog.seq).limit(limit)]
+
+def stream_fetch(since, limit):
+    # 每次读取后归还连接并结束读事务，等待期间不占用连接池，下一次读取也能看到新提交的数据
+    try:
+        return fetch_changes(since, limit)
+    finally:
+        db.session.close()
+
+# since 之后的记录已被清理时返回保留的最早 seq，客户端需重新加载全部数据
+def change_gap(since):
+    first = db.session.query(func.min(ChangeLog.seq)).scalar()
+    return first if first is not None and since < first - 1 else None
+
+# 清理 before 之前的变更，始终保留最新一条，客户端据此判断 since 是否仍可续传
+def prune_change_log(before):
+    latest = latest_change_seq()
+    if latest is None:
+        return 0
+    return db.session.execute(delete(ChangeLog).where(
+        ChangeLog.created_at < before, ChangeLog.seq < latest
+    )).rowcount
+
+# 组织图布局（见 tree_layout.py）：坐标由 superior_id 的层级计算，连同全部官职与关系的条目缓存在进程内，
+# 视口查询 ?bbox= 在缓存上按 x 二分截取。本进程的写入直接使缓存失效，其他进程的写入由变更日志的最大 seq 发现
+_chart_state = {'chart': None}
+
+def get_chart():
+    chart = _chart_state['chart']
+    seq = latest_change_seq()
+    if chart is None or chart['seq'] != seq:
+        positions = Position.query.all()
+        layout = tree_layout.TreeLayout((p.id, p.superior_id) for p in positions)
+        nodes = {}
+        for p in positions:
+            x, y, depth = layout.point(p.id)
+            parent = layout.point(layout.parent(p.id)) if layout.parent(p.id) is not None else None
+            # 视口外的上级也能画出连线
+            nodes[p.id] = dict(position_to_dict(p), x=x, y=y, depth=depth,
+                               parent_xy=[parent[0], parent[1]] if parent else None)
+        edges = []
+        for r in Relationship.query.all():
+            source, target = nodes.get(r.source_id), nodes.get(r.target_id)
+            if source and target:
+                edges.append(dict(relationship_to_dict(r), source_xy=[source['x'], source['y']],
+                                  target_xy=[target['x'], target['y']]))
+        chart = _chart_state['chart'] = {'layout': layout, 'nodes': nodes, 'edges': edges, 'seq': seq}
+    return chart
+
+def invalidate_chart():
+    _chart_state['chart'] = None
+
+# 列表接口的导出方式：
+#   ?after=<id>&limit=<n>  按 id 的键集分页，下一页以本页最后一条的 id 作为 after
+#   ?stream=json           分块输出 JSON 数组；?stream=ndjson（或 Accept: application/x-ndjson）逐行输出
+# 流式模式用 yield_per 分批读取并逐行序列化，内存占用与总行数无关
+def export_rows(model, to_dict):
+    after = request.args.get('after')
+    limit = request.args.get('limit', type=int)
+    stream = request.args.get('stream')
+    if stream is None and request.accept_mimetypes.best == 'application/x-ndjson':
+        stream = 'ndjson'
+    if stream not in (None, 'json', 'ndjson'):
+        return jsonify({'error': 'stream must be json or ndjson'}), 400
+
+    query = model.query
+    if after is not None or limit is not None or stream:
+        query = query.order_by(model.id)
+    if after is not None:
+        query = query.filter(model.id > after)
+    if limit is not None:
+        query = query.limit(max(limit, 0))
+
+    if stream is None:
+        return jsonify([to_dict(row) for row in query.all()])
+
+    def dumps(obj):
+        # 与 jsonify 的紧凑输出保持一致
+        return app.json.dumps(obj, separators=(',', ':'))
+    if stream == 'ndjson':
+        def generate():
+            for row in query.yield_per(STREAM_BATCH_SIZE):
+                yield dumps(to_dict(row)) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    def generate():
+        yield '['
+        separator = ''
+        for row in query.yield_per(STREAM_BATCH_SIZE):
+            yield separator + dumps(to_dict(row))
+            separator = ','
+        yield ']\n'
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+# API 路由
+
+# 获取所有官职信息
+@app.route('/api/positions', methods=['GET'])
+def get_positions():
+    return export_rows(Position, position_to_dict)
 
 # 添加新的官职信息
 @app.route('/api/positions', methods=['POST'])
 def add_position():
     data = request.json or {}
+    try:
+        image_hash = store_image(data.get('image'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     position = Position()
     position.id = data.get('id', str(uuid.uuid4()))
     position.name = data.get('name')
@@ -74,9 +462,15 @@ def add_position():
     position.end_year = data.get('end_year')
     position.rank = data.get('rank')
     position.superior_id = data.get('superior_id')
-    position.image = data.get('image')
+    position.image_hash = image_hash
     db.session.add(position)
+    db.session.flush()
+    closure_add(position.id, position.superior_id)
+    index_position(position)
+    record_change('position', 'insert', position.id, position_to_dict(position))
     db.session.commit()
+    notify_changes()
+    invalidate_chart()
     return jsonify({
         'id': position.id,
         'name': position.name
@@ -87,6 +481,13 @@ def add_position():
 def update_position(id):
     position = Position.query.get_or_404(id)
     data = request.json or {}
+    new_superior_id = data.get('superior_id', position.superior_id)
+    if new_superior_id != position.superior_id:
+        if new_superior_id and db.session.get(Position, new_superior_id) is None:
+            return jsonify({'error': 'Superior position not found'}), 400
+        if creates_cycle(id, new_superior_id):
+            return jsonify({'error': 'A position cannot be moved under itself or its subordinates'}), 400
+        closure_move(id, new_superior_id)
     position.name = data.get('name', position.name)
     position.dynasty = data.get('dynasty', position.dynasty)
     position.category = data.get('category', position.category)
@@ -94,33 +495,208 @@ def update_position(id):
     position.start_year = data.get('start_year', position.start_year)
     position.end_year = data.get('end_year', position.end_year)
     position.rank = data.get('rank', position.rank)
-    position.superior_id = data.get('superior_id', position.superior_id)
-    position.image = data.get('image', position.image)
+    position.superior_id = new_superior_id
+    try:
+        apply_image(position, data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    index_position(position)
+    record_change('position', 'update', position.id, position_to_dict(position))
     db.session.commit()
+    notify_changes()
+    invalidate_chart()
     return jsonify({'status': 'success'})
 
-# 删除指定官职信息
+# 删除职位：
+#   cascade=reparent（默认）只删除指定职位，其直属下级改挂到 superior_id，
+#                    未指定时挂到被删职位最近的未被删除的上级（没有则成为最高一级）
+#   cascade=subtree  删除指定职位及其全部下属
+# 受影响的职位由一条沿 superior_id 的递归查询求出，关系、闭包表、检索索引与职位按集合分批删除或更新，
+# 全部在同一事务内提交，整棵子树的删除或重组只需一次请求
+DELETE_MODES = ('reparent', 'subtree')
+IN_CHUNK_SIZE = 5000  # 单条语句 IN 列表的长度上限（SQLite 绑定参数数量有限制）
+BULK_DELETE_LIMIT = 1000
+
+def _chunked(ids):
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        yield ids[start:start + IN_CHUNK_SIZE]
+
+def subtree_links(root_ids):
+    # 返回 {职位 id: (superior_id, 距根的层数)}，包含 root_ids 本身及其全部下属
+    child = aliased(Position)
+    tree = select(
+        Position.id, Position.superior_id, literal(0).label('depth')
+    ).where(Position.id.in_(root_ids)).cte('subtree', recursive=True)
+    tree = tree.union_all(
+        select(child.id, child.superior_id, tree.c.depth + 1)
+        .join(tree, child.superior_id == tree.c.id)
+        .where(tree.c.depth < MAX_HIERARCHY_DEPTH)
+    )
+    links = {}
+    for position_id, superior_id, depth in db.session.execute(select(tree.c.id, tree.c.superior_id, tree.c.depth)):
+        if position_id not in links or depth > links[position_id][1]:
+            links[position_id] = (superior_id, depth)
+    return links
+
+def remove_positions(root_ids, cascade='reparent', superior_id=None):
+    # 参数不合法时抛出 ValueError；返回变更摘要，由调用方提交
+    if cascade not in DELETE_MODES:
+        raise ValueError('cascade must be reparent or subtree')
+    roots = set(root_ids)
+    links = subtree_links(sorted(roots))
+    missing = roots - set(links)
+    if missing:
+        raise ValueError(f'Position not found: {", ".join(sorted(missing))}')
+
+    moves = {}
+    if cascade == 'reparent':
+        if superior_id is not None:
+            if superior_id in links:
+                raise ValueError('Cannot reparent under a deleted position or its subordinates')
+            if db.session.get(Position, superior_id) is None:
+                raise ValueError('Superior position not found')
+        for position_id, (parent, _) in links.items():
+            if position_id in roots or parent not in roots:
+                continue
+            target = superior_id
+            if target is None:
+                target, hops = parent, 0
+                while target in roots and hops <= len(roots):
+                    target, hops = links[target][0], hops + 1
+            moves[position_id] = target
+    # 先删下层再删上层，避免分批删除时违反 superior_id 外键
+    deleted = sorted(links if cascade == 'subtree' else roots, key=lambda i: -links[i][1])
+    by_target = {}
+    for position_id, target in moves.items():
+        by_target.setdefault(target, []).append(position_id)
+    # 被删职位之间没有上下级关系时，各下级子树的内部闭包行不变，只需整体改接（见 closure_lift）；
+    # 否则删除子树内全部闭包行，在更新上级后沿 superior_id 重新补建
+    nested = any(links[root][0] in links for root in roots)
+    if cascade == 'reparent' and not nested:
+        closure_lift(sorted(roots), by_target)
+    else:
+        for chunk in _chunked(list(links)):
+            db.session.execute(delete(PositionClosure).where(PositionClosure.descendant_id.in_(chunk)))
+    deleted_relationships = 0
+    for chunk in _chunked(deleted):
+        deleted_relationships += db.session.execute(delete(Relationship).where(
+            Relationship.source_id.in_(chunk) | Relationship.target_id.in_(chunk)
+        )).rowcount
+    if search_enabled():
+        search_index.remove(db.session.connection(), 'position', deleted)
+    for target, position_ids in by_target.items():
+        for chunk in _chunked(position_ids):
+            db.session.execute(
+                Position.__table__.update().where(Position.id.in_(chunk)).values(superior_id=target)
+            )
+    for chunk in _chunked(deleted):
+        db.session.execute(Position.__table__.delete().where(Position.id.in_(chunk)))
+    if cascade == 'reparent' and nested:
+        for chunk in _chunked([position_id for position_id in links if position_id not in roots]):
+            closure_add_paths(chunk)
+    db.session.expire_all()
+    if len(deleted) <= BULK_DELETE_LIMIT:
+        # 客户端据此删除这些职位及与之相连的关系，并把 reparented 中的下级改挂到新的上级
+        record_change('position', 'delete', None, {'ids': deleted, 'cascade': cascade, 'reparented': moves})
+    else:
+        record_change('position', 'reload')
+
+    return {
+        'status': 'success',
+        'cascade': cascade,
+        'deleted_positions': len(deleted),
+        'deleted_relationships': deleted_relationships,
+        'reparented_positions': len(moves),
+        # 删除的职位过多时不逐个列出
+        'deleted_ids': deleted if len(deleted) <= BULK_DELETE_LIMIT else None,
+    }
+
+def _after_positions_removed(summary):
+    notify_changes()
+    invalidate_chart()
+    if _relationship_graph_state['loaded']:
+        if summary['deleted_ids'] is None:
+            invalidate_relationship_graph()
+        else:
+            for position_id in summary['deleted_ids']:
+                relationship_graph.remove_node(position_id)
+
+# 删除指定官职信息：?cascade=reparent|subtree，?superior_id= 指定下级改挂的职位
 @app.route('/api/positions/<id>', methods=['DELETE'])
 def delete_position(id):
-    position = Position.query.get_or_404(id)
-    # 删除相关关系
-    Relationship.query.filter_by(source_id=id).delete()
-    Relationship.query.filter_by(target_id=id).delete()
-    db.session.delete(position)
+    Position.query.get_or_404(id)
+    try:
+        summary = remove_positions([id], request.args.get('cascade', 'reparent'),
+                                   request.args.get('superior_id') or None)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     db.session.commit()
-    return jsonify({'status': 'success'})
+    _after_positions_removed(summary)
+    return jsonify(summary)
+
+# 批量删除：{"ids": [...], "cascade": "reparent"|"subtree", "superior_id": ...}，全部成功或全部回滚
+@app.route('/api/positions/bulk-delete', methods=['POST'])
+def bulk_delete_positions():
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) for i in ids):
+        return jsonify({'error': 'ids must be a non-empty list of position ids'}), 400
+    if len(ids) > BULK_DELETE_LIMIT:
+        return jsonify({'error': f'Too many ids (max {BULK_DELETE_LIMIT})'}), 400
+    try:
+        summary = remove_positions(ids, data.get('cascade', 'reparent'), data.get('superior_id') or None)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    db.session.commit()
+    _after_positions_removed(summary)
+    return jsonify(summary)
+
+# 获取指定官职的全部下属（含自身），?max_depth= 限制层数
+@app.route('/api/positions/<id>/subtree', methods=['GET'])
+def get_position_subtree(id):
+    Position.query.get_or_404(id)
+    max_depth = request.args.get('max_depth', type=int)
+    query = db.session.query(Position, PositionClosure.depth).join(
+        PositionClosure, PositionClosure.descendant_id == Position.id
+    ).filter(PositionClosure.ancestor_id == id)
+    if max_depth is not None:
+        query = query.filter(PositionClosure.depth <= max_depth)
+    rows = query.order_by(PositionClosure.depth, Position.id).all()
+    return jsonify([dict(position_to_dict(p), depth=depth) for p, depth in rows])
+
+# 获取从最高上级到指定官职的路径
+@app.route('/api/positions/<id>/ancestors', methods=['GET'])
+def get_position_ancestors(id):
+    Position.query.get_or_404(id)
+    rows = db.session.query(Position, PositionClosure.depth).join(
+        PositionClosure, PositionClosure.ancestor_id == Position.id
+    ).filter(PositionClosure.descendant_id == id).order_by(PositionClosure.depth.desc()).all()
+    return jsonify([dict(position_to_dict(p), distance=depth) for p, depth in rows])
+
+# 获取指定官职的层级深度、子树高度与下属数量
+@app.route('/api/positions/<id>/depth', methods=['GET'])
+def get_position_depth(id):
+    Position.query.get_or_404(id)
+    as_descendant = PositionClosure.descendant_id == id
+    as_ancestor = PositionClosure.ancestor_id == id
+    depth, height, descendants = db.session.query(
+        func.max(db.case((as_descendant, PositionClosure.depth))),
+        func.max(db.case((as_ancestor, PositionClosure.depth))),
+        func.sum(db.case((as_ancestor & (PositionClosure.depth > 0), 1), else_=0))
+    ).filter(as_descendant | as_ancestor).one()
+    return jsonify({
+        'id': id,
+        'depth': depth or 0,
+        'subtree_height': height or 0,
+        'descendant_count': descendants or 0
+    })
 
 # 获取所有关系信息
 @app.route('/api/relationships', methods=['GET'])
 def get_relationships():
-    relationships = Relationship.query.all()
-    return jsonify([{
-        'id': r.id,
-        'source_id': r.source_id,
-        'target_id': r.target_id,
-        'relationship_type': r.relationship_type,
-        'description': r.description
-    } for r in relationships])
+    return export_rows(Relationship, relationship_to_dict)
 
 # 添加新的关系信息
 @app.route('/api/relationships', methods=['POST'])
@@ -133,7 +709,12 @@ def add_relationship():
     relationship.relationship_type = data.get('relationship_type', 'superior')
     relationship.description = data.get('description')
     db.session.add(relationship)
+    record_change('relationship', 'insert', relationship.id, relationship_to_dict(relationship))
     db.session.commit()
+    notify_changes()
+    invalidate_chart()
+    if _relationship_graph_state['loaded']:
+        relationship_graph.add_edge(relationship.id, relationship.source_id, relationship.target_id)
     return jsonify({
         'id': relationship.id,
         'source_id': relationship.source_id,
@@ -145,9 +726,183 @@ def add_relationship():
 def delete_relationship(id):
     relationship = Relationship.query.get_or_404(id)
     db.session.delete(relationship)
+    record_change('relationship', 'delete', id, {'id': id})
     db.session.commit()
+    notify_changes()
+    invalidate_chart()
+    relationship_graph.remove_edge(id)
     return jsonify({'status': 'success'})
 
+# 关系图查询：在内存图索引上计算，只返回相关的官职与关系
+def graph_payload(distances, relationship_ids):
+    positions = {p.id: p for p in Position.query.filter(Position.id.in_(list(distances))).all()} if distances else {}
+    relationships = {r.id: r for r in Relationship.query.filter(Relationship.id.in_(relationship_ids)).all()} if relationship_ids else {}
+    nodes = []
+    for position_id, distance in distances.items():
+        node = position_to_dict(positions[position_id]) if position_id in positions else {'id': position_id}
+        if distance is not None:
+            node['distance'] = distance
+        nodes.append(node)
+    return {
+        'nodes': nodes,
+        'edges': [relationship_to_dict(relationships[rid]) for rid in relationship_ids if rid in relationships]
+    }
+
+# 获取指定官职 k 跳以内的关系网络，?k= 默认 1，最大 10
+@app.route('/api/graph/neighborhood', methods=['GET'])
+def get_graph_neighborhood():
+    position_id = request.args.get('position_id')
+    if not position_id:
+        return jsonify({'error': 'position_id is required'}), 400
+    k = min(max(request.args.get('k', 1, type=int), 0), 10)
+    distances, relationship_ids = get_relationship_graph().neighborhood(position_id, k)
+    return jsonify(graph_payload(distances, relationship_ids))
+
+# 获取两个官职之间经过关系最少的路径，?directed=1 只沿 source -> target 方向
+@app.route('/api/graph/path', methods=['GET'])
+def get_graph_path():
+    source = request.args.get('from')
+    target = request.args.get('to')
+    if not source or not target:
+        return jsonify({'error': 'from and to are required'}), 400
+    directed = request.args.get('directed') in ('1', 'true')
+    found = get_relationship_graph().shortest_path(source, target, directed=directed)
+    if found is None:
+        return jsonify({'found': False, 'nodes': [], 'edges': []})
+    path, relationship_ids = found
+    payload = graph_payload({position_id: step for step, position_id in enumerate(path)}, relationship_ids)
+    payload['found'] = True
+    return jsonify(payload)
+
+# 带 ?position_id= 时返回其所在的连通分量，否则返回全部分量（仅含有关系的官职）的成员 id
+@app.route('/api/graph/components', methods=['GET'])
+def get_graph_components():
+    graph = get_relationship_graph()
+    position_id = request.args.get('position_id')
+    if position_id:
+        return jsonify(graph_payload({member: None for member in graph.component(position_id)}, []))
+    return jsonify([{'size': len(members), 'position_ids': members} for members in graph.components()])
+
+# 组织图：?bbox=x0,y0,x1,y1 只返回与视口相交的官职和关系。官职为 GET /api/positions 的条目加上
+# 中心坐标 x/y、层级 depth 与上级坐标 parent_xy，关系为 GET /api/relationships 的条目加上两端坐标；
+# bounds 为整张图的范围
+@app.route('/api/layout', methods=['GET'])
+def get_layout():
+    try:
+        bbox = tree_layout.parse_bbox(request.args.get('bbox'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    chart = get_chart()
+    layout = chart['layout']
+    edges = chart['edges'] if bbox is None else [
+        edge for edge in chart['edges'] if tree_layout.segment_in_bbox(edge['source_xy'], edge['target_xy'], bbox)
+    ]
+    return jsonify({
+        'bounds': list(layout.bounds()),
+        'node_size': {'width': tree_layout.NODE_WIDTH, 'height': tree_layout.NODE_HEIGHT},
+        'bbox': list(bbox) if bbox else None,
+        'nodes': [chart['nodes'][key] for key in layout.keys(bbox)],
+        'edges': edges
+    })
+
+# 变更增量：?since=<seq> 返回其后的变更（按 seq 升序，每页 ?limit= 条），不带 since 时只返回当前的 last_seq。
+# 客户端先取 last_seq 再加载全部列表，之后从该 seq 起拉取增量或订阅 /api/changes/stream；
+# since 之后的记录已被清理时返回 410，需重新加载全部数据
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    if not change_log_available():
+        return jsonify({'error': 'Change log table is missing'}), 503
+    try:
+        since = change_feed.parse_since(request.args.get('since'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    last_seq = latest_change_seq() or 0
+    if since is None:
+        return jsonify({'last_seq': last_seq, 'changes': [], 'has_more': False})
+    first = change_gap(since)
+    if first is not None:
+        return jsonify({'error': 'Changes after since have been pruned, reload all data', 'first_seq': first}), 410
+    limit = min(max(request.args.get('limit', CHANGE_PAGE_SIZE, type=int), 1), CHANGE_MAX_PAGE_SIZE)
+    rows = fetch_changes(since, limit + 1)
+    return jsonify({
+        'last_seq': rows[min(len(rows), limit) - 1]['seq'] if rows else max(since, last_seq),
+        'changes': rows[:limit],
+        'has_more': len(rows) > limit
+    })
+
+# 变更推送（SSE）：?since= 或 Last-Event-ID 指定续传位置，都不带时从当前最新的变更之后开始；
+# 每个事件的 id 为 seq，data 与 /api/changes 中的条目相同。每个连接占用一个工作线程，到期后由客户端重连续传
+@app.route('/api/changes/stream', methods=['GET'])
+def get_change_stream():
+    if not change_log_available():
+        return jsonify({'error': 'Change log table is missing'}), 503
+    try:
+        since = change_feed.parse_since(request.args.get('since') or request.headers.get('Last-Event-ID'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if since is None:
+        since = latest_change_seq() or 0
+    first = change_gap(since)
+    if first is not None:
+        return jsonify({'error': 'Changes after since have been pruned, reload all data', 'first_seq': first}), 410
+    db.session.close()
+    response = Response(stream_with_context(change_feed.stream(
+        stream_fetch, since, change_notifier,
+        app.config['CHANGE_STREAM_POLL_SECONDS'], app.config['CHANGE_STREAM_MAX_SECONDS'], CHANGE_PAGE_SIZE,
+        lambda obj: app.json.dumps(obj, separators=(',', ':'))
+    )), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 关闭 nginx 的响应缓冲
+    return response
+
+# 全文检索官职名称与描述，?q= 检索词（空格分隔为 AND），?start_year=&end_year= 按存续年份过滤，
+# 结果按 bm25 相关度排序并附带高亮片段
+SEARCH_LIMIT_MAX = 100
+
+@app.route('/api/search', methods=['GET'])
+def search_positions():
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    if not search_enabled():
+        return jsonify({'error': 'Full-text search requires SQLite with FTS5'}), 503
+    limit = min(max(request.args.get('limit', 20, type=int), 1), SEARCH_LIMIT_MAX)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    hits = search_index.search(
+        db.session.connection(), query, ['position'],
+        request.args.get('start_year', type=int), request.args.get('end_year', type=int),
+        limit, offset
+    )
+    positions = {p.id: p for p in Position.query.filter(Position.id.in_({hit[1] for hit in hits})).all()} if hits else {}
+    results = []
+    for _, position_id, field, score in hits:
+        position = positions.get(position_id)
+        if position is None:
+            continue
+        results.append({
+            'id': position.id,
+            'field': field,
+            'score': round(-score, 4),
+            'snippet': search_index.highlight(getattr(position, field) or '', query),
+            'position': position_to_dict(position)
+        })
+    return jsonify({'query': query, 'offset': offset, 'limit': limit, 'results': results})
+
+# 农历转换结果（查表，不再逐次调用 lunardate 计算）
+def lunar_payload(solar_date):
+    lunar = lunar_from_solar(solar_date, LUNAR_TABLE_PATH)
+    # 假设 lunardate 库有对应的方法，这里简单返回空字符串
+    ganzhi_year = getattr(lunar, 'ganzhiYear', lambda: "")()
+    ganzhi_month = getattr(lunar, 'ganzhiMonth', lambda: "")()
+    ganzhi_day = getattr(lunar, 'ganzhiDay', lambda: "")()
+    return {
+        'solar': f"{solar_date.year}-{solar_date.month}-{solar_date.day}",
+        'lunar': f"{lunar.year}年{lunar.month}月{lunar.day}日",
+        'ganzhi_year': ganzhi_year,
+        'ganzhi_month': ganzhi_month,
+        'ganzhi_day': ganzhi_day
+    }
+
 # 农历转换 API
 @app.route('/api/lunar', methods=['GET'])
 def get_lunar_date():
@@ -163,21 +918,285 @@ def get_lunar_date():
         if year is None or month is None or day is None:
             raise ValueError("Invalid date parameters")
         solar_date = datetime.date(year, month, day)
-        lunar = lunardate.LunarDate.fromSolarDate(year, month, day)
-        # 假设 lunardate 库有对应的方法，这里简单返回空字符串
-        ganzhi_year = getattr(lunar, 'ganzhiYear', lambda: "")()
-        ganzhi_month = getattr(lunar, 'ganzhiMonth', lambda: "")()
-        ganzhi_day = getattr(lunar, 'ganzhiDay', lambda: "")()
-        return jsonify({
-            'solar': f"{year}-{month}-{day}",
-            'lunar': f"{lunar.year}年{lunar.month}月{lunar.day}日",
-            'ganzhi_year': ganzhi_year,
-            'ganzhi_month': ganzhi_month,
-            'ganzhi_day': ganzhi_day
-        })
+        return jsonify(lunar_payload(solar_date))
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# 批量农历转换 API：GET ?start=YYYY-MM-DD&end=YYYY-MM-DD 转换区间，POST {"dates": ["YYYY-MM-DD", ...]} 转换列表
+@app.route('/api/lunar/batch', methods=['GET', 'POST'])
+def get_lunar_dates():
+    try:
+        if request.method == 'POST':
+            date_strs = (request.get_json(silent=True) or {}).get('dates') or []
+            if not isinstance(date_strs, list):
+                raise ValueError("dates must be a list")
+            if len(date_strs) > LUNAR_BATCH_LIMIT:
+                raise ValueError(f"Too many dates (max {LUNAR_BATCH_LIMIT})")
+            dates = [datetime.date.fromisoformat(s) for s in date_strs]
+        else:
+            start_str = request.args.get('start')
+            if not start_str:
+                return jsonify({'error': 'Missing date parameters'}), 400
+            start = datetime.date.fromisoformat(start_str)
+            end = datetime.date.fromisoformat(request.args.get('end') or start_str)
+            if end < start:
+                raise ValueError("end must not be earlier than start")
+            if (end - start).days >= LUNAR_BATCH_LIMIT:
+                raise ValueError(f"Too many dates (max {LUNAR_BATCH_LIMIT})")
+            dates = [datetime.date.fromordinal(o) for o in range(start.toordinal(), end.toordinal() + 1)]
+        return jsonify([lunar_payload(d) for d in dates])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# 批量导入：在内存中解析上级/关系两端的引用（id 或名称），按块批量插入
+class ImportResolver:
+    def __init__(self):
+        self.ids = set()
+        self.names = {}
+        for position_id, name in db.session.query(Position.id, Position.name):
+            self.register(position_id, name)
+
+    def register(self, position_id, name):
+        self.ids.add(position_id)
+        if name:
+            self.names.setdefault(name, []).append(position_id)
+
+    def resolve(self, row, id_key, name_key, required=True):
+        if row.get(id_key):
+            if row[id_key] not in self.ids:
+                raise ValueError(f"{id_key} {row[id_key]} not found")
+            return row[id_key]
+        name = row.get(name_key)
+        if name:
+            matches = self.names.get(name, [])
+            if not matches:
+                raise ValueError(f"{name_key} '{name}' not found")
+            if len(matches) > 1:
+                raise ValueError(f"{name_key} '{name}' is ambiguous, use {id_key}")
+            return matches[0]
+        if required:
+            raise ValueError(f"{id_key} or {name_key} is required")
+        return None
+
+def _import_int(row, key):
+    value = row.get(key)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be an integer")
+
+def _prepare_position(row, resolver):
+    name = row.get('name')
+    if not name:
+        raise ValueError("name is required")
+    position_id = row.get('id') or str(uuid.uuid4())
+    if position_id in resolver.ids:
+        raise ValueError(f"id {position_id} already exists")
+    params = {
+        'id': position_id,
+        'name': name,
+        'dynasty': row.get('dynasty'),
+        'category': row.get('category'),
+        'description': row.get('description'),
+        'start_year': _import_int(row, 'start_year'),
+        'end_year': _import_int(row, 'end_year'),
+        'rank': row.get('rank'),
+        'superior_id': resolver.resolve(row, 'superior_id', 'superior', required=False),
+        'image': None,
+        'image_hash': store_image(row.get('image'))
+    }
+    resolver.register(position_id, name)
+    return params
+
+def _prepare_relationship(row, resolver):
+    return {
+        'id': row.get('id') or str(uuid.uuid4()),
+        'source_id': resolver.resolve(row, 'source_id', 'source'),
+        'target_id': resolver.resolve(row, 'target_id', 'target'),
+        'relationship_type': row.get('relationship_type') or 'superior',
+        'description': row.get('description')
+    }
+
+IMPORT_KINDS = {
+    'positions': (Position, _prepare_position),
+    'relationships': (Relationship, _prepare_relationship),
+}
+
+def import_records(kind, stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    model, prepare = IMPORT_KINDS[kind]
+    resolver = ImportResolver()
+    index_search = kind == 'positions' and search_enabled()
+
+    def insert_chunk(params):
+        db.session.execute(model.__table__.insert(), params)
+        if index_search:
+            search_index.add(db.session.connection(), (position_search_document(row.get) for row in params))
+
+    report = run_import(
+        read_rows(stream, fmt),
+        lambda row: prepare(row, resolver),
+        insert_chunk,
+        db.session.commit,
+        db.session.rollback,
+        chunk_size
+    )
+    if kind == 'positions':
+        rebuild_closure()
+        db.session.commit()
+    else:
+        invalidate_relationship_graph()
+    record_change(model.__tablename__, 'reload')
+    db.session.commit()
+    notify_changes()
+    invalidate_chart()
+    return report
+
+# 批量导入 API：请求体为 multipart 的 file 字段或原始 CSV / JSONL，?format= 可覆盖自动判断
+@app.route('/api/import/<kind>', methods=['POST'])
+def bulk_import(kind):
+    if kind not in IMPORT_KINDS:
+        return jsonify({'error': f"kind must be one of {', '.join(sorted(IMPORT_KINDS))}"}), 400
+    upload = request.files.get('file')
+    if upload is not None:
+        stream, fmt = upload.stream, detect_format(upload.filename, upload.mimetype)
+    else:
+        stream, fmt = request.stream, detect_format(None, request.mimetype)
+    fmt = request.args.get('format') or fmt
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'error': 'format must be csv or jsonl'}), 400
+    chunk_size = min(max(request.args.get('chunk_size', DEFAULT_CHUNK_SIZE, type=int), 1), 10000)
+    return jsonify(import_records(kind, stream, fmt, chunk_size).to_dict())
+
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(IMPORT_KINDS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='默认按扩展名判断')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True)
+def import_data_command(kind, path, fmt, chunk_size):
+    fmt = fmt or detect_format(path, None)
+    if fmt is None:
+        raise click.UsageError('无法从扩展名判断格式，请指定 --format')
+    with open(path, 'rb') as f:
+        report = import_records(kind, f, fmt, chunk_size)
+    print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+
+# 图片 API：内容不可变，长期缓存；send_file 支持 Range 与 If-None-Match，并可由服务器零拷贝发送。
+# 上传内容不可信，且与接口同源：禁止浏览器猜测类型，直接打开时放入沙箱（不执行脚本），
+# SVG 等非位图类型只作为附件下载；<img> 引用不受这些响应头影响
+def send_blob(path, digest, mimetype):
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=digest, max_age=31536000,
+                         as_attachment=mimetype not in INLINE_MIMETYPES)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['Content-Security-Policy'] = 'sandbox'
+    return response
+
+@app.route('/api/blobs/<digest>', methods=['GET'])
+def get_blob(digest):
+    if not HASH_PATTERN.match(digest):
+        abort(404)
+    path = blob_path(app.config['BLOB_DIR'], digest)
+    if not os.path.exists(path):
+        abort(404)
+    with open(path, 'rb') as f:
+        mimetype = sniff_mimetype(f.read(16))
+    return send_blob(path, digest, mimetype)
+
+# 缩略图 API：?size=64/128/256，首次访问时生成并缓存；无法生成时返回原图
+@app.route('/api/blobs/<digest>/thumb', methods=['GET'])
+def get_blob_thumbnail(digest):
+    size = request.args.get('size', 128, type=int)
+    if not HASH_PATTERN.match(digest) or size not in THUMBNAIL_SIZES:
+        abort(404)
+    root = app.config['BLOB_DIR']
+    if not os.path.exists(blob_path(root, digest)):
+        abort(404)
+    path = thumbnail_path(root, digest, size)
+    if path is None:
+        return get_blob(digest)
+    return send_blob(path, f'{digest}-{size}', 'image/png')
+
+# 数据迁移：补建 image_hash 列，并把旧的 Base64 图片逐批移入 blob 存储
+def ensure_image_hash_column():
+    inspector = inspect(db.engine)
+    if not inspector.has_table('position'):
+        db.create_all()
+        return
+    columns = {c['name'] for c in inspector.get_columns('position')}
+    if 'image_hash' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE position ADD COLUMN image_hash VARCHAR(64)'))
+
+def migrate_images(batch_size=100):
+    ensure_image_hash_column()
+    migrated, failed = 0, []
+    while True:
+        query = Position.query.filter(Position.image.isnot(None), Position.image_hash.is_(None))
+        if failed:
+            query = query.filter(Position.id.notin_(failed))
+        positions = query.limit(batch_size).all()
+        if not positions:
+            break
+        for position in positions:
+            try:
+                apply_image(position, {'image': position.image})
+                record_change('position', 'update', position.id, position_to_dict(position))
+                migrated += 1
+            except ValueError:
+                failed.append(position.id)
+        db.session.commit()
+        notify_changes()
+        invalidate_chart()
+    return migrated, failed
+
+# 启动时补齐表结构：image_hash 列与闭包表（新建闭包表时从 superior_id 重建）
+def ensure_schema():
+    ensure_image_hash_column()
+    if not inspect(db.engine).has_table('position_closure'):
+        PositionClosure.__table__.create(db.engine)
+        rebuild_closure()
+        db.session.commit()
+    if not search_enabled() and search_index.fts5_available(db.session.connection()):
+        rebuild_search_index()
+        db.session.commit()
+    if not change_log_available():
+        ChangeLog.__table__.create(db.engine)
+        _change_log_state['available'] = True
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    ensure_schema()
+    if not search_index.fts5_available(db.session.connection()):
+        raise click.ClickException('当前数据库不支持 SQLite FTS5')
+    rebuild_search_index()
+    db.session.commit()
+    print('已重建全文检索索引')
+
+@app.cli.command('rebuild-closure')
+def rebuild_closure_command():
+    ensure_schema()
+    rebuild_closure()
+    db.session.commit()
+    print('已重建层级闭包表')
+
+@app.cli.command('prune-change-log')
+@click.option('--days', default=30, show_default=True, help='保留最近多少天的变更')
+def prune_change_log_command(days):
+    ensure_schema()
+    deleted = prune_change_log(datetime.datetime.utcnow() - datetime.timedelta(days=days))
+    db.session.commit()
+    print(f'已清理 {deleted} 条变更记录')
+
+@app.cli.command('migrate-images')
+def migrate_images_command():
+    migrated, failed = migrate_images()
+    print(f'已迁移 {migrated} 张图片')
+    if failed:
+        print(f'无法解码的图片（保留原值）: {", ".join(failed)}')
+
 # 前端路由
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -192,5 +1211,8 @@ def serve_frontend(path):
 if __name__ == '__main__':
     # 在 Render 上运行时，使用环境变量指定的端口
     port = int(os.environ.get('PORT', 5000))
+    with app.app_context():
+        ensure_schema()
     # 确保使用 0.0.0.0 作为主机地址，以便 Render 可以访问应用
+    # 这里是开发服务器；生产环境使用 gunicorn -c gunicorn.conf.py app:app
     app.run(host='0.0.0.0', port=port)
\ No newline at end of file
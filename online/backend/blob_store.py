@@ -0,0 +1,82 @@
+# 内容寻址的图片存储：按原始字节的 SHA-256 存放在 <root>/<前两位>/<哈希>，相同图片只保存一份
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+
+try:
+    from PIL import Image  # 可选依赖，仅用于生成缩略图
+except ImportError:
+    Image = None
+
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+THUMBNAIL_SIZES = (64, 128, 256)
+
+_MAGIC_MIMETYPES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'<svg', 'image/svg+xml'),
+)
+# 可以直接在浏览器中打开的类型；SVG 可内嵌脚本，与无法识别的内容一样只作为附件下载
+INLINE_MIMETYPES = frozenset({'image/png', 'image/jpeg', 'image/gif', 'image/webp'})
+
+
+def decode_base64_image(value):
+    """解码 Base64 图片，兼容 data:image/png;base64,... 形式，失败时抛出 ValueError。"""
+    if value.startswith('data:'):
+        value = value.split(',', 1)[1] if ',' in value else ''
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid Base64 image data')
+
+
+def sniff_mimetype(head):
+    for magic, mimetype in _MAGIC_MIMETYPES:
+        if head.startswith(magic):
+            return mimetype
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def blob_path(root, digest):
+    return os.path.join(root, digest[:2], digest)
+
+
+def save_blob(root, data):
+    """保存字节并返回其哈希；已存在时直接复用。"""
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(root, digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，避免并发写入产生半截文件
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return digest
+
+
+def thumbnail_path(root, digest, size):
+    """返回缩略图路径，不存在时生成并缓存；未安装 Pillow 或无法解码时返回 None。"""
+    path = os.path.join(root, 'thumbs', str(size), f'{digest}.png')
+    if os.path.exists(path):
+        return path
+    if Image is None:
+        return None
+    try:
+        with Image.open(blob_path(root, digest)) as image:
+            image.thumbnail((size, size))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, format='PNG')
+            os.replace(tmp_path, path)
+    except (OSError, ValueError):
+        return None
+    return path
@@ -0,0 +1,103 @@
+# backend/change_feed.py 文件
+# 变更日志的推送：写入接口在同一事务内向 change_log 表追加记录（seq 单调递增），
+# 客户端用 ?since=<seq> 拉取增量，或订阅 SSE 流（断线后 EventSource 以 Last-Event-ID 自动续传）。
+# 本进程提交后立即唤醒等待中的流；其他进程的提交由定时轮询发现。两个后端共用同一份实现。
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+HEARTBEAT_SECONDS = 15  # 空闲时发送注释行，防止代理断开空闲连接
+RETRY_MILLISECONDS = 2000  # 建议客户端断线后的重连间隔
+
+# fetch(since, limit) -> 按 seq 升序的变更记录（含 seq 字段的 dict）
+Fetch = Callable[[int, int], List[Dict[str, Any]]]
+
+
+def parse_since(value: Optional[str]) -> Optional[int]:
+    if value is None or value == '':
+        return None
+    try:
+        since = int(value)
+    except ValueError:
+        raise ValueError("since must be a change sequence number")
+    if since < 0:
+        raise ValueError("since must be a change sequence number")
+    return since
+
+
+class ChangeNotifier:
+    """进程内的提交通知：每次提交递增计数并唤醒全部等待者。"""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    def notify(self) -> None:
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def generation(self) -> int:
+        with self._condition:
+            return self._generation
+
+    def wait(self, generation: int, timeout: float) -> None:
+        """等到计数超过 generation 或超时。"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._generation != generation, timeout)
+
+
+class LocalChanges:
+    """本进程提交的变更 seq。进程内的索引随本进程的提交增量更新，日志新增的记录全部来自本进程时无需重新加载。"""
+
+    MAX_SEQS = 100000  # 长时间没有读取时只保留较新的一半，丢弃的 seq 只会让下一次读取多重新加载一次
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._seqs: Set[int] = set()
+
+    def add(self, seqs: Iterable[int]) -> None:
+        with self._lock:
+            self._seqs.update(seqs)
+            if len(self._seqs) > self.MAX_SEQS:
+                self._seqs = set(sorted(self._seqs)[-self.MAX_SEQS // 2:])
+
+    def only_local(self, since: Optional[int], until: Optional[int]) -> bool:
+        """(since, until] 内的记录是否都由本进程提交；同时丢弃 until 及之前的 seq。"""
+        with self._lock:
+            local = (since is not None and until is not None and since <= until
+                     and all(seq in self._seqs for seq in range(since + 1, until + 1)))
+            if until is not None:
+                self._seqs = {seq for seq in self._seqs if seq > until}
+        return local
+
+
+def format_event(change: Dict[str, Any], dumps: Callable[[Any], str] = json.dumps) -> str:
+    return f"id: {change['seq']}\nevent: change\ndata: {dumps(change)}\n\n"
+
+
+def stream(fetch: Fetch, since: int, notifier: ChangeNotifier, poll_seconds: float, max_seconds: float,
+           batch_size: int, dumps: Callable[[Any], str] = json.dumps) -> Iterator[str]:
+    """SSE 事件流：先补发 since 之后的全部变更，再等待新变更；max_seconds 后结束，由客户端续传。"""
+    yield f"retry: {RETRY_MILLISECONDS}\n\n"
+    deadline = time.monotonic() + max_seconds
+    last_sent = time.monotonic()
+    while True:
+        generation = notifier.generation()
+        changes = fetch(since, batch_size)
+        for change in changes:
+            yield format_event(change, dumps)
+            since = change['seq']
+        now = time.monotonic()
+        if changes:
+            last_sent = now
+            if len(changes) == batch_size:
+                continue  # 积压的变更连续发送
+        elif now - last_sent >= HEARTBEAT_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = now
+        if now >= deadline:
+            return
+        notifier.wait(generation, min(poll_seconds, deadline - now))
@@ -0,0 +1,184 @@
+# backend/graph_index.py 文件
+# 内存图索引：职位为节点（映射为连续整数），关系为边，边的两端、生效日期存放在紧凑的 array 中，
+# 每个节点的邻接表是边槽位的 array。写入时增量追加/标记删除，查询时按日期过滤可见边。
+
+from array import array
+from collections import deque
+from datetime import date
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+_ALWAYS = 0  # 无日期的边始终可见
+_COMPACT_MIN_DEAD = 1024
+
+
+class GraphIndex:
+    """无权图索引，支持 k 跳邻域、最短路径和连通分量查询。"""
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self._node_ids: Dict[Hashable, int] = {}
+        self._node_keys: List[Hashable] = []
+        self._adjacency: List[array] = []
+        self._src = array('l')
+        self._dst = array('l')
+        self._since = array('l')
+        self._alive = bytearray()
+        self._edge_keys: List[Hashable] = []
+        self._edge_slots: Dict[Hashable, int] = {}
+        self._dead = 0
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edge_slots)
+
+    def _node(self, key: Hashable) -> int:
+        index = self._node_ids.get(key)
+        if index is None:
+            index = len(self._node_keys)
+            self._node_ids[key] = index
+            self._node_keys.append(key)
+            self._adjacency.append(array('l'))
+        return index
+
+    def add_edge(self, edge_key: Hashable, source: Hashable, target: Hashable,
+                 since: Optional[date] = None) -> None:
+        self.remove_edge(edge_key)
+        slot = len(self._edge_keys)
+        u, v = self._node(source), self._node(target)
+        self._src.append(u)
+        self._dst.append(v)
+        self._since.append(since.toordinal() if since else _ALWAYS)
+        self._alive.append(1)
+        self._edge_keys.append(edge_key)
+        self._edge_slots[edge_key] = slot
+        self._adjacency[u].append(slot)
+        if v != u:
+            self._adjacency[v].append(slot)
+
+    def remove_edge(self, edge_key: Hashable) -> None:
+        slot = self._edge_slots.pop(edge_key, None)
+        if slot is None:
+            return
+        self._alive[slot] = 0
+        self._dead += 1
+        if self._dead >= _COMPACT_MIN_DEAD and self._dead * 2 > len(self._edge_keys):
+            self._compact()
+
+    def remove_node(self, key: Hashable) -> None:
+        index = self._node_ids.get(key)
+        if index is None:
+            return
+        # 先取出边 id：删除过程中可能触发压缩，槽位会重新编号
+        edge_keys = [self._edge_keys[slot] for slot in self._adjacency[index] if self._alive[slot]]
+        for edge_key in edge_keys:
+            self.remove_edge(edge_key)
+
+    def _compact(self) -> None:
+        # 去掉已删除的边槽位，节点编号保持不变
+        live = [(self._edge_keys[slot], self._node_keys[self._src[slot]], self._node_keys[self._dst[slot]],
+                 self._since[slot]) for slot in range(len(self._edge_keys)) if self._alive[slot]]
+        node_keys = self._node_keys
+        self.clear()
+        for key in node_keys:
+            self._node(key)
+        for edge_key, source, target, since in live:
+            self.add_edge(edge_key, source, target, date.fromordinal(since) if since != _ALWAYS else None)
+
+    def _edges_of(self, node: int, point: int, directed: bool) -> Iterator[Tuple[int, int]]:
+        # 产出 (相邻节点, 边槽位)
+        src, dst, since, alive = self._src, self._dst, self._since, self._alive
+        for slot in self._adjacency[node]:
+            if not alive[slot] or since[slot] > point:
+                continue
+            if src[slot] == node:
+                yield dst[slot], slot
+            elif not directed:
+                yield src[slot], slot
+
+    @staticmethod
+    def _point(as_of: Optional[date]) -> int:
+        return as_of.toordinal() if as_of else date.max.toordinal()
+
+    def neighborhood(self, key: Hashable, k: int, as_of: Optional[date] = None
+                     ) -> Tuple[Dict[Hashable, int], List[Hashable]]:
+        """返回 k 跳以内的节点及其距离，以及这些节点之间的可见边。"""
+        start = self._node_ids.get(key)
+        if start is None:
+            return {key: 0}, []
+        point = self._point(as_of)
+        distance = {start: 0}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if distance[node] >= k:
+                continue
+            for neighbor, _ in self._edges_of(node, point, False):
+                if neighbor not in distance:
+                    distance[neighbor] = distance[node] + 1
+                    queue.append(neighbor)
+        edges = {slot for node in distance for neighbor, slot in self._edges_of(node, point, False)
+                 if neighbor in distance}
+        return ({self._node_keys[n]: d for n, d in distance.items()},
+                [self._edge_keys[slot] for slot in sorted(edges)])
+
+    def shortest_path(self, source: Hashable, target: Hashable, as_of: Optional[date] = None,
+                      directed: bool = False) -> Optional[Tuple[List[Hashable], List[Hashable]]]:
+        """广度优先搜索最短路径，返回 (节点序列, 边序列)，不连通时返回 None。"""
+        start, goal = self._node_ids.get(source), self._node_ids.get(target)
+        if source == target:
+            return [source], []
+        if start is None or goal is None:
+            return None
+        point = self._point(as_of)
+        previous: Dict[int, Tuple[int, int]] = {start: (-1, -1)}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            for neighbor, slot in self._edges_of(node, point, directed):
+                if neighbor in previous:
+                    continue
+                previous[neighbor] = (node, slot)
+                if neighbor == goal:
+                    nodes, edges = [goal], []
+                    while nodes[-1] != start:
+                        parent, via = previous[nodes[-1]]
+                        edges.append(via)
+                        nodes.append(parent)
+                    return ([self._node_keys[n] for n in reversed(nodes)],
+                            [self._edge_keys[s] for s in reversed(edges)])
+                queue.append(neighbor)
+        return None
+
+    def component(self, key: Hashable, as_of: Optional[date] = None) -> List[Hashable]:
+        nodes, _ = self.neighborhood(key, len(self._node_keys) + 1, as_of)
+        return list(nodes)
+
+    def components(self, as_of: Optional[date] = None) -> List[List[Hashable]]:
+        """全部连通分量（只含有可见边的节点），按大小降序。"""
+        point = self._point(as_of)
+        seen = bytearray(len(self._node_keys))
+        result: List[List[Hashable]] = []
+        for start in range(len(self._node_keys)):
+            if seen[start]:
+                continue
+            seen[start] = 1
+            members = [start]
+            queue = deque([start])
+            while queue:
+                for neighbor, _ in self._edges_of(queue.popleft(), point, False):
+                    if not seen[neighbor]:
+                        seen[neighbor] = 1
+                        members.append(neighbor)
+                        queue.append(neighbor)
+            if len(members) > 1:
+                result.append([self._node_keys[n] for n in members])
+        result.sort(key=len, reverse=True)
+        return result
+
+    def load(self, edges: Any) -> None:
+        """edges 为 (边 id, 起点, 终点, 生效日期或 None) 的可迭代对象。"""
+        self.clear()
+        for edge_key, source, target, since in edges:
+            self.add_edge(edge_key, source, target, since)
@@ -0,0 +1,201 @@
+# backend/search_index.py 文件
+# 全文检索：SQLite FTS5 虚表 + 文档映射表。
+# 中文没有空格分词，写入前把连续的汉字切成重叠的二元组（末字另记一个单字），
+# 查询时把词组转成二元组短语，效果等同于子串匹配，但走倒排索引而不是全表 LIKE 扫描。
+# search_document 记录每个文档（实体类型, 实体 id, 字段）对应的 rowid 以及用于过滤的起止时间。
+
+import html
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+SEARCH_TABLE = 'search_index'
+DOCUMENT_TABLE = 'search_document'
+_REMOVE_CHUNK = 500  # 低于 SQLite 默认的绑定参数上限
+
+_CJK = '々〇㐀-䶿一-鿿豈-﫿\U00020000-\U0003134f'
+_RUN = re.compile(f'[{_CJK}]+|[^\\s{_CJK}\\W]+', re.UNICODE)
+_CJK_RUN = re.compile(f'[{_CJK}]+')
+
+
+def _runs(value: str) -> List[str]:
+    return _RUN.findall(value or '')
+
+
+def tokenize(value: Optional[str]) -> str:
+    """把文本转成以空格分隔的词元：汉字二元组（每段末字单独一个），其他文字按词保留。"""
+    tokens: List[str] = []
+    for run in _runs(value or ''):
+        if _CJK_RUN.fullmatch(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run.lower())
+    return ' '.join(tokens)
+
+
+def _quote(token: str) -> str:
+    return '"' + token.replace('"', '""') + '"'
+
+
+def match_expression(query: str) -> Optional[str]:
+    """把用户输入转成 FTS5 MATCH 表达式，各段之间为 AND；没有可检索内容时返回 None。"""
+    parts = []
+    for run in _runs(query):
+        if _CJK_RUN.fullmatch(run) and len(run) > 1:
+            parts.append(_quote(' '.join(run[i:i + 2] for i in range(len(run) - 1))))
+        elif _CJK_RUN.fullmatch(run):
+            # 单字：任一以该字开头的二元组，或段末单字
+            parts.append(_quote(run) + '*')
+        else:
+            parts.append(_quote(run.lower()))
+    return ' AND '.join(parts) if parts else None
+
+
+def highlight(value: str, query: str, width: int = 40, tag: str = 'mark') -> str:
+    """在原文中标出命中的片段，截取第一个命中附近约 width 个字符，结果已做 HTML 转义。"""
+    terms = sorted({run for run in _runs(query)}, key=len, reverse=True)
+    if not value or not terms:
+        return html.escape(value or '')
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    first = pattern.search(value)
+    start = max(0, first.start() - width // 2) if first else 0
+    end = min(len(value), start + width + (first.end() - first.start() if first else 0))
+    window = value[start:end]
+    pieces, last = [], 0
+    for found in pattern.finditer(window):
+        pieces.append(html.escape(window[last:found.start()]))
+        pieces.append(f'<{tag}>{html.escape(found.group())}</{tag}>')
+        last = found.end()
+    pieces.append(html.escape(window[last:]))
+    return ('…' if start > 0 else '') + ''.join(pieces) + ('…' if end < len(value) else '')
+
+
+def fts5_available(connection: Any) -> bool:
+    if connection.dialect.name != 'sqlite':
+        return False
+    try:
+        connection.execute(text('CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)'))
+        connection.execute(text('DROP TABLE temp.fts5_probe'))
+        return True
+    except Exception:
+        return False
+
+
+def create_tables(connection: Any) -> None:
+    connection.execute(text(
+        f'CREATE TABLE IF NOT EXISTS {DOCUMENT_TABLE} ('
+        'id INTEGER PRIMARY KEY, entity_type VARCHAR(20) NOT NULL, entity_id VARCHAR(36) NOT NULL, '
+        'field VARCHAR(20) NOT NULL, start_value INTEGER, end_value INTEGER, '
+        'UNIQUE (entity_type, entity_id, field))'
+    ))
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(tokens, tokenize='unicode61')"
+    ))
+
+
+def clear(connection: Any, entity_type: Optional[str] = None) -> None:
+    if entity_type is None:
+        connection.execute(text(f'DELETE FROM {SEARCH_TABLE}'))
+        connection.execute(text(f'DELETE FROM {DOCUMENT_TABLE}'))
+        return
+    params = {'entity_type': entity_type}
+    connection.execute(text(
+        f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN '
+        f'(SELECT id FROM {DOCUMENT_TABLE} WHERE entity_type = :entity_type)'
+    ), params)
+    connection.execute(text(f'DELETE FROM {DOCUMENT_TABLE} WHERE entity_type = :entity_type'), params)
+
+
+def remove(connection: Any, entity_type: str, entity_ids: Any) -> None:
+    """删除实体的全部文档，entity_ids 可以是单个 id 或 id 列表。"""
+    if isinstance(entity_ids, (str, int)):
+        entity_ids = [entity_ids]
+    entity_ids = [str(entity_id) for entity_id in entity_ids]
+    for start in range(0, len(entity_ids), _REMOVE_CHUNK):
+        chunk = entity_ids[start:start + _REMOVE_CHUNK]
+        params: Dict[str, Any] = {'entity_type': entity_type}
+        params.update((f'id_{i}', entity_id) for i, entity_id in enumerate(chunk))
+        match = f"entity_type = :entity_type AND entity_id IN ({', '.join(f':id_{i}' for i in range(len(chunk)))})"
+        connection.execute(text(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT id FROM {DOCUMENT_TABLE} WHERE {match})'
+        ), params)
+        connection.execute(text(f'DELETE FROM {DOCUMENT_TABLE} WHERE {match}'), params)
+
+
+Document = Tuple[str, Any, Dict[str, Optional[str]], Optional[int], Optional[int]]
+
+
+def add(connection: Any, documents: Iterable[Document]) -> None:
+    """批量写入新实体的文档：(实体类型, 实体 id, {字段: 文本}, 起, 止)，空字段不建文档。
+
+    调用方保证这些实体尚未建过索引（例如刚导入的行）；已存在的实体用 index() 替换。
+    """
+    next_id = (connection.execute(text(f'SELECT MAX(id) FROM {DOCUMENT_TABLE}')).scalar() or 0) + 1
+    document_rows, token_rows = [], []
+    for entity_type, entity_id, fields, start_value, end_value in documents:
+        for field, value in fields.items():
+            tokens = tokenize(value)
+            if not tokens:
+                continue
+            document_rows.append({'id': next_id, 'entity_type': entity_type, 'entity_id': str(entity_id),
+                                  'field': field, 'start_value': start_value, 'end_value': end_value})
+            token_rows.append({'rowid': next_id, 'tokens': tokens})
+            next_id += 1
+    if not document_rows:
+        return
+    connection.execute(text(
+        f'INSERT INTO {DOCUMENT_TABLE} (id, entity_type, entity_id, field, start_value, end_value) '
+        'VALUES (:id, :entity_type, :entity_id, :field, :start_value, :end_value)'
+    ), document_rows)
+    connection.execute(text(f'INSERT INTO {SEARCH_TABLE} (rowid, tokens) VALUES (:rowid, :tokens)'),
+                       token_rows)
+
+
+def index(connection: Any, entity_type: str, entity_id: Any, fields: Dict[str, Optional[str]],
+          start_value: Optional[int] = None, end_value: Optional[int] = None) -> None:
+    """写入（或替换）一个实体的全部可检索字段。"""
+    replace(connection, [(entity_type, entity_id, fields, start_value, end_value)])
+
+
+def replace(connection: Any, documents: Sequence[Document]) -> None:
+    """批量写入或替换多个实体的文档：按类型一次删除旧文档，再一次写入。"""
+    by_type: Dict[str, List[Any]] = {}
+    for document in documents:
+        by_type.setdefault(document[0], []).append(document[1])
+    for entity_type, entity_ids in by_type.items():
+        remove(connection, entity_type, entity_ids)
+    add(connection, documents)
+
+
+def search(connection: Any, query: str, entity_types: Optional[Sequence[str]] = None,
+           start_value: Optional[int] = None, end_value: Optional[int] = None,
+           limit: int = 20, offset: int = 0) -> List[Tuple[str, str, str, float]]:
+    """按 bm25 排序返回 (实体类型, 实体 id, 字段, 得分)，得分越小越相关。
+
+    指定起止范围时只返回时间区间与之重叠的文档（end_value 为空表示至今），无时间的文档被排除。
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    conditions = [f'{SEARCH_TABLE} MATCH :expression']
+    params: Dict[str, Any] = {'expression': expression, 'limit': limit, 'offset': offset}
+    if entity_types:
+        names = []
+        for i, entity_type in enumerate(entity_types):
+            params[f'type_{i}'] = entity_type
+            names.append(f':type_{i}')
+        conditions.append(f"d.entity_type IN ({', '.join(names)})")
+    if start_value is not None:
+        conditions.append('d.start_value IS NOT NULL AND (d.end_value IS NULL OR d.end_value >= :start_value)')
+        params['start_value'] = start_value
+    if end_value is not None:
+        conditions.append('d.start_value <= :end_value')
+        params['end_value'] = end_value
+    rows = connection.execute(text(
+        f'SELECT d.entity_type, d.entity_id, d.field, bm25({SEARCH_TABLE}) AS score '
+        f'FROM {SEARCH_TABLE} JOIN {DOCUMENT_TABLE} d ON d.id = {SEARCH_TABLE}.rowid '
+        f"WHERE {' AND '.join(conditions)} ORDER BY score, d.id LIMIT :limit OFFSET :offset"
+    ), params)
+    return [(row[0], row[1], row[2], row[3]) for row in rows]
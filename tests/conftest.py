@@ -0,0 +1,30 @@
+# tests/conftest.py 文件
+# 测试公共设置：两个后端都在各自的 backend 目录下运行，辅助模块按模块名直接导入。
+# 这里把两个 backend 目录都加入 sys.path（两边共有的模块逐字节相同，见 test_shared_modules.py），
+# app 模块通过 benchmarks/_common.load_app 以 official_app / online_app 的名字加载，每个测试一个临时数据库。
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKENDS = {
+    'official': os.path.join(REPO_ROOT, 'official-position-system', 'backend'),
+    'online': os.path.join(REPO_ROOT, 'online', 'backend'),
+}
+for _path in (os.path.join(REPO_ROOT, 'benchmarks'), BACKENDS['online'], BACKENDS['official']):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from _common import load_app  # noqa: E402
+
+
+@pytest.fixture
+def official(tmp_path):
+    return load_app('official', str(tmp_path / 'official.db'))
+
+
+@pytest.fixture
+def online(tmp_path):
+    return load_app('online', str(tmp_path / 'online.db'))
@@ -0,0 +1,31 @@
+# tests/test_date_convert.py 文件
+# official 后端的批量日期转换：POST {"dates": [...]} 中的每一项都必须是非空字符串，
+# 不合法的条目返回 400，不会被当作今天转换，也不会导致 500。
+
+import pytest
+
+
+@pytest.fixture
+def client(official):
+    return official.app.test_client()
+
+
+def test_batch_converts_each_date_in_order(client):
+    response = client.post('/api/date-convert/batch', json={'dates': ['1070-04-23', ' 熙宁三年三月初五 ']})
+    assert response.status_code == 200
+    first, second = response.get_json()
+    assert first['gregorian'] == '1070-04-23'
+    assert first == second
+
+
+@pytest.mark.parametrize('value', [1, None, '', '  ', ['1070-04-23'], {'date': '1070-04-23'}])
+def test_batch_rejects_items_that_are_not_non_empty_strings(client, value):
+    response = client.post('/api/date-convert/batch', json={'dates': ['1070-04-23', value]})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'dates[1] must be a non-empty string'}
+
+
+def test_batch_rejects_unparseable_dates_and_bad_bodies(client):
+    assert client.post('/api/date-convert/batch', json={'dates': ['不是日期']}).status_code == 400
+    assert client.post('/api/date-convert/batch', json={'dates': '1070-04-23'}).status_code == 400
+    assert client.post('/api/date-convert/batch', json={'dates': []}).get_json() == []
@@ -0,0 +1,46 @@
+# tests/test_era_calendar.py 文件
+
+from datetime import date
+
+import pytest
+
+import era_calendar
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('熙宁三年三月初五', date(1070, 4, 23)),
+    ('崇祯十七年三月十九', date(1644, 4, 25)),
+    ('宣统三年十二月廿五', date(1912, 2, 12)),
+])
+def test_parse_reign_dates(text, expected):
+    assert era_calendar.parse(text) == expected
+
+
+@pytest.mark.parametrize('text', ['至元三年', '元至元三年'])
+def test_zhiyuan_within_yuan_names_distinct_era(text):
+    with pytest.raises(ValueError) as excinfo:
+        era_calendar.parse(text)
+    message = str(excinfo.value)
+    assert '前至元 (1264-1294)' in message
+    assert '后至元 (1335-1340)' in message
+    assert 'dynasty' not in message
+
+
+def test_distinct_zhiyuan_names_resolve():
+    assert era_calendar.parse('前至元三年') == era_calendar.parse('元前至元三年')
+    assert era_calendar.parse('前至元三年').year == 1266
+    assert era_calendar.parse('后至元三年').year == 1337
+    assert era_calendar.parse('元后至元三年') == era_calendar.parse('后至元三年')
+    # 二十年只落在世祖至元之内
+    assert era_calendar.parse('元至元二十年').year == 1283
+
+
+def test_same_name_across_dynasties_asks_for_dynasty():
+    with pytest.raises(ValueError, match='元天顺 .* or 明天顺 '):
+        era_calendar.parse('天顺元年')
+    assert era_calendar.parse('明天顺元年').year == 1457
+
+
+def test_era_names_keep_canonical_names():
+    assert any('至元三年' in name and '后' not in name for name in era_calendar.era_names(1266, 1, 1, False))
+    assert any('后至元三年' in name for name in era_calendar.era_names(1337, 1, 1, False))
@@ -0,0 +1,216 @@
+# tests/test_interval_index.py 文件
+# 任职区间索引（interval_index）与「某日视图」区间计算（as_of_view）：随机操作后与逐条过滤的结果比较；
+# 以及 app 中的 after_flush / after_commit / after_rollback 钩子在回滚后保持索引与物化表和数据库一致。
+# 「某日视图」的待重算登记表每个职位最多一行，未开启 AS_OF_VIEW、无人消费时也不会无限增长。
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from as_of_view import position_intervals
+from interval_index import AppointmentIntervalIndex
+
+BASE = date(1000, 1, 1)
+
+
+def _random_period(rng):
+    start = BASE + timedelta(days=rng.randrange(400))
+    end = None if rng.random() < 0.2 else start + timedelta(days=rng.randrange(120))
+    return start, end
+
+
+def _brute_active(rows, day):
+    return sorted(
+        ((appointment_id, position_id, official_id, start)
+         for appointment_id, (position_id, official_id, start, end) in rows.items()
+         if start <= day and (end is None or end >= day)),
+        key=lambda row: (row[3], row[0])
+    )
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_active_on_matches_brute_force_after_random_updates(seed):
+    rng = random.Random(seed)
+    index = AppointmentIntervalIndex()
+    rows = {}
+    for step in range(1500):
+        appointment_id = rng.randrange(1, 300)
+        if rng.random() < 0.3:
+            index.remove(appointment_id)
+            rows.pop(appointment_id, None)
+        else:
+            start, end = _random_period(rng)
+            position_id, official_id = rng.randrange(1, 20), rng.randrange(1, 50)
+            index.upsert(appointment_id, position_id, official_id, start, end)
+            rows[appointment_id] = (position_id, official_id, start, end)
+        if step % 100 == 0:
+            assert len(index) == len(rows)
+            for _ in range(20):
+                day = BASE + timedelta(days=rng.randrange(-10, 560))
+                expected = [row[:3] for row in _brute_active(rows, day)]
+                assert index.active_on(day) == expected
+
+
+def test_remove_missing_and_reload():
+    index = AppointmentIntervalIndex()
+    index.remove(1)
+    index.load([(1, 1, 1, BASE, None), (2, 1, 2, BASE, BASE)])
+    index.load([(3, 2, 3, BASE + timedelta(days=1), None)])
+    assert 1 not in index and 3 in index
+    assert index.active_on(BASE) == []
+    assert index.active_on(date.max) == [(3, 2, 3)]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_position_intervals_match_per_day_rules(seed):
+    rng = random.Random(seed)
+    functions = [(i, BASE + timedelta(days=rng.randrange(200))) for i in rng.sample(range(1, 100), 6)]
+    appointments = []
+    for i in rng.sample(range(1, 100), 8):
+        start, end = _random_period(rng)
+        appointments.append((i, start - timedelta(days=200), end and end - timedelta(days=200)))
+    intervals = position_intervals(functions, appointments)
+
+    assert intervals[0][0] == date.min and intervals[-1][1] == date.max
+    for previous, current in zip(intervals, intervals[1:]):
+        assert previous[1] + timedelta(days=1) == current[0]
+        assert previous[2:] != current[2:]
+    for offset in range(-5, 260):
+        day = BASE + timedelta(days=offset)
+        # build_snapshot 的规则：不晚于当日的最新职能（同日取 id 最小者），在任任职按 id 排序
+        dated = [f for f in functions if f[1] <= day]
+        function_id = min(dated, key=lambda f: (-f[1].toordinal(), f[0]))[0] if dated else None
+        active = tuple(sorted(a[0] for a in appointments if a[1] <= day and (a[2] is None or a[2] >= day)))
+        covering = [i for i in intervals if i[0] <= day <= i[1]]
+        assert len(covering) == 1
+        assert covering[0][2:] == (function_id, active)
+
+
+def _seed(m):
+    db = m.db
+    positions = [m.Position(name=f'职位{i}') for i in range(3)]
+    officials = [m.Official(name=f'官员{i}') for i in range(3)]
+    db.session.add_all(positions + officials)
+    db.session.flush()
+    db.session.add_all([
+        m.PositionFunction(position_id=positions[0].id, date=BASE, description='初置'),
+        m.Appointment(position_id=positions[0].id, official_id=officials[0].id, start_date=BASE,
+                      end_date=BASE + timedelta(days=30)),
+        m.Appointment(position_id=positions[1].id, official_id=officials[1].id, start_date=BASE + timedelta(days=10)),
+    ])
+    db.session.commit()
+    return [p.id for p in positions], [o.id for o in officials]
+
+
+def _active_from_database(m, day):
+    return [tuple(row) for row in m.db.session.query(
+        m.Appointment.id, m.Appointment.position_id, m.Appointment.official_id
+    ).filter(
+        m.Appointment.start_date <= day,
+        (m.Appointment.end_date.is_(None) | (m.Appointment.end_date >= day))
+    ).order_by(m.Appointment.start_date, m.Appointment.id)]
+
+
+def _days():
+    return [BASE + timedelta(days=offset) for offset in (-1, 0, 5, 15, 31, 45, 400)]
+
+
+def test_hooks_keep_index_in_sync_across_rollback(official):
+    m = official
+    with m.app.app_context():
+        position_ids, official_ids = _seed(m)
+        index = m.get_appointment_index()
+        first = m.Appointment.query.order_by(m.Appointment.id).first()
+
+        # 已 flush 但回滚的新增、修改、删除都不应进入索引
+        m.db.session.add(m.Appointment(position_id=position_ids[2], official_id=official_ids[2], start_date=BASE))
+        first.end_date = BASE + timedelta(days=300)
+        m.db.session.flush()
+        m.db.session.rollback()
+        m.db.session.delete(m.Appointment.query.order_by(m.Appointment.id.desc()).first())
+        m.db.session.flush()
+        m.db.session.rollback()
+        # 回滚后的下一次提交（与任职无关）不应带上已回滚的变更
+        m.db.session.get(m.Official, official_ids[0]).bio = '无关的修改'
+        m.db.session.commit()
+        for day in _days():
+            assert index.active_on(day) == _active_from_database(m, day)
+
+        # 回滚之后的提交照常生效
+        first = m.Appointment.query.order_by(m.Appointment.id).first()
+        first.end_date = BASE + timedelta(days=40)
+        m.db.session.add(m.Appointment(position_id=position_ids[2], official_id=official_ids[2],
+                                       start_date=BASE + timedelta(days=3)))
+        m.db.session.commit()
+        m.db.session.delete(m.Appointment.query.filter_by(position_id=position_ids[1]).one())
+        m.db.session.commit()
+        assert len(index) == m.Appointment.query.count()
+        for day in _days():
+            assert index.active_on(day) == _active_from_database(m, day)
+
+
+def test_hooks_keep_as_of_view_in_sync_across_rollback(official):
+    m = official
+    with m.app.app_context():
+        position_ids, official_ids = _seed(m)
+        m.rebuild_as_of_view()
+        m.db.session.commit()
+
+        m.db.session.add(m.PositionFunction(position_id=position_ids[1], date=BASE, description='回滚'))
+        m.db.session.flush()
+        m.db.session.rollback()
+        assert m.db.session.query(m.PositionIntervalPending).count() == 0
+
+        m.db.session.add(m.Appointment(position_id=position_ids[1], official_id=official_ids[2],
+                                       start_date=BASE + timedelta(days=20), end_date=BASE + timedelta(days=25)))
+        m.Appointment.query.filter_by(position_id=position_ids[0]).one().position_id = position_ids[2]
+        m.db.session.commit()
+        while m.refresh_as_of_view():
+            pass
+        assert m.check_as_of_view() == {'missing': [], 'extra': [], 'mismatched': [], 'pending': []}
+        for day in _days():
+            assert m.as_of_snapshot(day) == m.build_snapshot(day)
+
+
+def test_pending_registrations_stay_bounded_without_as_of_view(official):
+    m = official
+    assert not m.app.config['AS_OF_VIEW']
+    with m.app.app_context():
+        position_ids, _ = _seed(m)
+        m.rebuild_as_of_view()
+        m.db.session.commit()
+    client = m.app.test_client()
+    for i in range(6):
+        response = client.put(f'/api/positions/{position_ids[0]}', json={'name': f'改名{i}', 'date': '1000-01-01'})
+        assert response.status_code == 200
+    with m.app.app_context():
+        # 关闭 AS_OF_VIEW 时没有后台线程消费，同一职位仍只登记一次
+        assert [row.position_id for row in m.PositionIntervalPending.query] == [position_ids[0]]
+        m.db.session.get(m.Position, position_ids[1]).name = '改名'
+        m.db.session.get(m.Position, position_ids[0]).name = '再改名'
+        m.db.session.commit()
+        assert sorted(row.position_id for row in m.PositionIntervalPending.query) == sorted(position_ids[:2])
+
+        while m.refresh_as_of_view():
+            pass
+        assert m.PositionIntervalPending.query.count() == 0
+        assert m.check_as_of_view() == {'missing': [], 'extra': [], 'mismatched': [], 'pending': []}
+
+
+def test_pending_unique_migration_removes_duplicates(official):
+    m = official
+    table = m.PositionIntervalPending.__table__
+    with m.app.app_context():
+        connection = m.db.session.connection()
+        # 旧版本的登记表：position_id 上是普通索引，同一职位有多条登记
+        for index in table.indexes:
+            index.drop(connection)
+        connection.execute(table.insert(), [{'position_id': position_id} for position_id in (3, 1, 3, 2, 3, 1)])
+        m._migration_as_of_pending_unique()
+        m.db.session.commit()
+        assert [(row.id, row.position_id) for row in m.PositionIntervalPending.query.order_by('id')] == [
+            (1, 3), (2, 1), (4, 2)]
+        m.mark_as_of_pending(m.db.session.connection(), [1, 5])
+        m.db.session.commit()
+        assert sorted(row.position_id for row in m.PositionIntervalPending.query) == [1, 2, 3, 5]
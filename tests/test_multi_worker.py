@@ -0,0 +1,141 @@
+# tests/test_multi_worker.py 文件
+# gunicorn 以多个工作进程运行：这里在同一个 SQLite 文件上加载两份 app 模块，模拟两个进程。
+# 一个进程提交后，另一个进程的内存索引（关系图、任职区间）由变更日志的最大 seq 发现并重新加载；
+# 本进程自己的提交已增量更新索引，不需要重新加载。
+
+from datetime import date
+
+import pytest
+
+from _common import load_app
+
+
+@pytest.fixture
+def official_pair(tmp_path):
+    path = str(tmp_path / 'official.db')
+    return load_app('official', path), load_app('official', path)
+
+
+@pytest.fixture
+def online_pair(tmp_path):
+    path = str(tmp_path / 'online.db')
+    first = load_app('online', path)
+    with first.app.app_context():
+        first.ensure_schema()
+    return first, load_app('online', path)
+
+
+def _count_loads(monkeypatch, graph):
+    loads = []
+    original = graph.load
+    monkeypatch.setattr(graph, 'load', lambda rows: loads.append(1) or original(rows))
+    return loads
+
+
+def _official_path_found(m, source, target):
+    response = m.app.test_client().get(f'/api/graph/path?from={source}&to={target}')
+    assert response.status_code == 200
+    return response.get_json()['found']
+
+
+def test_official_graph_sees_other_worker_commits(official_pair, monkeypatch):
+    a, b = official_pair
+    with a.app.app_context():
+        positions = [a.Position(name=f'职位{i}') for i in range(3)]
+        a.db.session.add_all(positions)
+        a.db.session.commit()
+        p1, p2, p3 = (p.id for p in positions)
+    assert not _official_path_found(b, p1, p2)
+    loads = _count_loads(monkeypatch, b.connection_graph)
+
+    response = a.app.test_client().post('/api/connections', json={
+        'from_position_id': p1, 'to_position_id': p2, 'date': '1000-01-01'})
+    assert response.status_code == 200
+    assert _official_path_found(b, p1, p2)
+    assert len(loads) == 1
+
+    with a.app.app_context():
+        a.db.session.delete(a.db.session.get(a.Connection, response.get_json()['id']))
+        a.db.session.commit()
+    assert not _official_path_found(b, p1, p2)
+    assert len(loads) == 2
+
+    # 本进程的提交由钩子增量更新，不重新加载
+    assert b.app.test_client().post('/api/connections', json={
+        'from_position_id': p2, 'to_position_id': p3, 'date': '1000-01-01'}).status_code == 200
+    assert _official_path_found(b, p2, p3)
+    assert len(loads) == 2
+    assert _official_path_found(a, p2, p3)
+
+
+def _online_path_found(m, source, target):
+    response = m.app.test_client().get(f'/api/graph/path?from={source}&to={target}')
+    assert response.status_code == 200
+    return response.get_json()['found']
+
+
+def test_online_graph_sees_other_worker_commits(online_pair, monkeypatch):
+    a, b = online_pair
+    client_a, client_b = a.app.test_client(), b.app.test_client()
+    for key in ('P1', 'P2', 'P3'):
+        assert client_a.post('/api/positions', json={'id': key, 'name': key}).status_code == 200
+    assert not _online_path_found(b, 'P1', 'P2')
+    loads = _count_loads(monkeypatch, b.relationship_graph)
+
+    assert client_a.post('/api/relationships', json={'id': 'r1', 'source_id': 'P1', 'target_id': 'P2'}
+                         ).status_code == 200
+    assert _online_path_found(b, 'P1', 'P2')
+    assert len(loads) == 1
+
+    assert client_a.delete('/api/relationships/r1').status_code == 200
+    assert not _online_path_found(b, 'P1', 'P2')
+    assert len(loads) == 2
+
+    assert client_b.post('/api/relationships', json={'id': 'r2', 'source_id': 'P2', 'target_id': 'P3'}
+                         ).status_code == 200
+    assert _online_path_found(b, 'P2', 'P3')
+    assert client_b.delete('/api/positions/P3').status_code == 200
+    assert not _online_path_found(b, 'P2', 'P3')
+    assert len(loads) == 2
+    assert not _online_path_found(a, 'P2', 'P3')
+
+
+def _active(m, day):
+    response = m.app.test_client().get(f'/api/appointments/active?date={day}')
+    assert response.status_code == 200
+    return [row['official_id'] for row in response.get_json()]
+
+
+def test_appointment_index_sees_other_worker_commits(official_pair, monkeypatch):
+    a, b = official_pair
+    for m in (a, b):
+        m.app.config['APPOINTMENT_INTERVAL_INDEX'] = True
+    with a.app.app_context():
+        position, official = a.Position(name='知府'), a.Official(name='官员')
+        a.db.session.add_all([position, official])
+        a.db.session.commit()
+        position_id, official_id = position.id, official.id
+    assert _active(b, '1000-06-01') == []
+    loads = _count_loads(monkeypatch, b.appointment_index)
+
+    with a.app.app_context():
+        a.db.session.add(a.Appointment(position_id=position_id, official_id=official_id,
+                                       start_date=date(1000, 1, 1), end_date=date(1000, 12, 31)))
+        a.db.session.commit()
+    assert _active(b, '1000-06-01') == [official_id]
+    assert len(loads) == 1
+
+    with a.app.app_context():
+        a.Appointment.query.one().end_date = date(1000, 3, 1)
+        a.db.session.commit()
+    assert _active(b, '1000-06-01') == []
+    assert len(loads) == 2
+
+    # 本进程的提交由钩子增量更新，不重新加载
+    with b.app.app_context():
+        b.db.session.add(b.Appointment(position_id=position_id, official_id=official_id,
+                                       start_date=date(1000, 5, 1)))
+        b.db.session.commit()
+    assert _active(b, '1000-06-01') == [official_id]
+    assert len(loads) == 2
+    assert _active(a, '1000-06-01') == [official_id]
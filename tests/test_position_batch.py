@@ -0,0 +1,54 @@
+# tests/test_position_batch.py 文件
+# official 后端的批量编辑 POST /api/positions/batch：全部校验通过才提交；
+# 请求体中的非字符串日期（如 20240101）返回 400 并整体回滚，而不是 500。
+
+import pytest
+
+
+@pytest.fixture
+def client(official):
+    client = official.app.test_client()
+    response = client.post('/api/positions/batch', json={'date': '1070-04-23', 'positions': [
+        {'name': '中书门下'}, {'name': '枢密院'}]})
+    assert response.status_code == 200
+    client.m, client.ids = official, response.get_json()['ids']
+    return client
+
+
+def _names(client):
+    with client.m.app.app_context():
+        return {p.id: p.name for p in client.m.Position.query}
+
+
+@pytest.mark.parametrize('body', [
+    {'date': 20240101, 'positions': [{'name': '三司'}]},
+    {'positions': [{'name': '三司'}, {'id': 1, 'name': '改名', 'date': 20240101}]},
+    {'positions': [{'name': '三司', 'date': ['1070-04-23']}]},
+])
+def test_non_string_date_is_rejected_without_saving(client, body):
+    before = _names(client)
+    response = client.post('/api/positions/batch', json=body)
+    assert response.status_code == 400
+    assert 'date must be a string' in response.get_json()['error']
+    assert _names(client) == before
+
+
+def test_item_date_error_names_the_item(client):
+    response = client.post('/api/positions/batch', json={'positions': [
+        {'id': client.ids[0], 'name': '改名'}, {'id': client.ids[1], 'date': 20240101}]})
+    assert response.get_json()['error'].startswith('positions[1]: ')
+
+
+def test_batch_saves_all_items_with_their_dates(client):
+    response = client.post('/api/positions/batch', json={'date': '1080-01-01', 'positions': [
+        {'id': client.ids[0], 'name': '中书省', 'function': {'description': '元丰改制'}},
+        {'name': '尚书省', 'parent_id': client.ids[0], 'date': '熙宁三年三月初五', 'function': {'description': '新设'}},
+    ]})
+    assert response.status_code == 200
+    new_id = response.get_json()['ids'][1]
+    with client.m.app.app_context():
+        m = client.m
+        assert {f.position_id: f.date.isoformat() for f in m.PositionFunction.query} == {
+            client.ids[0]: '1080-01-01', new_id: '1070-04-23'}
+        assert m.db.session.get(m.Position, new_id).parent_id == client.ids[0]
+    assert client.put(f'/api/positions/{new_id}', json={'name': '改名', 'date': 1}).status_code == 400
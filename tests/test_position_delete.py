@@ -0,0 +1,139 @@
+# tests/test_position_delete.py 文件
+# online 后端删除职位（remove_positions）：级联与改挂两种方式、删除最高一级职位，
+# 以及删除后闭包表、全文检索索引和内存关系图与数据库保持一致。
+
+import pytest
+
+import search_index
+
+# 职位 -> 上级：A、R 为最高一级
+TREE = {'A': None, 'B': 'A', 'C': 'A', 'D': 'B', 'E': 'B', 'F': 'C', 'G': 'D', 'R': None, 'H': 'R'}
+NAMES = {'A': '中书省', 'B': '枢密院', 'C': '三司', 'D': '枢密副使', 'E': '签书枢密院事',
+         'F': '盐铁司', 'G': '都承旨', 'R': '翰林院', 'H': '翰林学士'}
+RELATIONSHIPS = {'r1': ('B', 'C'), 'r2': ('D', 'F'), 'r3': ('E', 'H'), 'r4': ('A', 'H')}
+
+
+@pytest.fixture
+def client(online):
+    m = online
+    with m.app.app_context():
+        m.ensure_schema()
+    client = m.app.test_client()
+    # 按层级顺序新增，上级总在下级之前
+    for key in sorted(TREE, key=_depth):
+        response = client.post('/api/positions', json={'id': key, 'name': NAMES[key], 'superior_id': TREE[key]})
+        assert response.status_code == 200
+    for key, (source, target) in RELATIONSHIPS.items():
+        assert client.post('/api/relationships', json={'id': key, 'source_id': source, 'target_id': target}
+                           ).status_code == 200
+    with m.app.app_context():
+        m.get_relationship_graph()  # 加载后由删除接口增量维护
+    client.m = m
+    return client
+
+
+def _depth(key):
+    depth = 0
+    while TREE[key] is not None:
+        key, depth = TREE[key], depth + 1
+    return depth
+
+
+def _state(m):
+    positions = {p.id: p.superior_id for p in m.Position.query}
+    closure = {(c.ancestor_id, c.descendant_id, c.depth) for c in m.PositionClosure.query}
+    relationships = {r.id: (r.source_id, r.target_id) for r in m.Relationship.query}
+    return positions, closure, relationships
+
+
+def _expected_closure(positions):
+    rows = set()
+    for key in positions:
+        node, depth = key, 0
+        while node is not None:
+            rows.add((node, key, depth))
+            node, depth = positions[node], depth + 1
+    return rows
+
+
+def _check_consistent(client, deleted):
+    m = client.m
+    with m.app.app_context():
+        positions, closure, relationships = _state(m)
+        assert closure == _expected_closure(positions)
+        assert not deleted & set(positions)
+        assert all(source in positions and target in positions for source, target in relationships.values())
+
+        documents = {row[0] for row in m.db.session.execute(
+            m.db.text(f'SELECT entity_id FROM {search_index.DOCUMENT_TABLE}'))}
+        assert documents == set(positions)
+
+        graph = m.relationship_graph
+        assert graph.edge_count == len(relationships)
+        for key in deleted:
+            assert graph.neighborhood(key, 1) == ({key: 0}, [])
+        for key, (source, _) in relationships.items():
+            assert key in graph.neighborhood(source, 1)[1]
+    for key in deleted:
+        hits = client.get('/api/search', query_string={'q': NAMES[key]}).get_json()['results']
+        assert key not in {hit['id'] for hit in hits}
+    return positions, relationships
+
+
+def test_reparent_moves_children_to_nearest_superior(client):
+    summary = client.delete('/api/positions/B').get_json()
+    assert (summary['deleted_positions'], summary['reparented_positions'], summary['deleted_relationships']) == (1, 2, 1)
+    positions, relationships = _check_consistent(client, {'B'})
+    assert positions['D'] == positions['E'] == 'A'
+    assert positions['G'] == 'D'
+    assert set(relationships) == {'r2', 'r3', 'r4'}
+
+
+def test_subtree_deletes_all_subordinates(client):
+    summary = client.delete('/api/positions/B?cascade=subtree').get_json()
+    assert sorted(summary['deleted_ids']) == ['B', 'D', 'E', 'G']
+    positions, relationships = _check_consistent(client, {'B', 'D', 'E', 'G'})
+    assert set(positions) == {'A', 'C', 'F', 'R', 'H'}
+    assert set(relationships) == {'r4'}
+
+
+def test_reparent_root_makes_children_top_level(client):
+    client.delete('/api/positions/A')
+    positions, relationships = _check_consistent(client, {'A'})
+    assert positions['B'] is None and positions['C'] is None
+    assert positions['D'] == 'B'
+    assert set(relationships) == {'r1', 'r2', 'r3'}
+
+
+def test_subtree_delete_of_root(client):
+    client.delete('/api/positions/R?cascade=subtree')
+    positions, relationships = _check_consistent(client, {'R', 'H'})
+    assert set(relationships) == {'r1', 'r2'}
+
+
+def test_reparent_under_explicit_superior(client):
+    client.delete('/api/positions/B?superior_id=R')
+    positions, _ = _check_consistent(client, {'B'})
+    assert positions['D'] == positions['E'] == 'R'
+    with client.m.app.app_context():
+        closure = _state(client.m)[1]
+    assert {('R', 'G', 2), ('R', 'D', 1)} <= closure
+
+
+def test_nested_bulk_delete_skips_deleted_superiors(client):
+    response = client.post('/api/positions/bulk-delete', json={'ids': ['B', 'D'], 'cascade': 'reparent'})
+    assert response.status_code == 200
+    positions, relationships = _check_consistent(client, {'B', 'D'})
+    assert positions['G'] == positions['E'] == 'A'
+    assert set(relationships) == {'r3', 'r4'}
+
+
+def test_invalid_reparent_target_changes_nothing(client):
+    with client.m.app.app_context():
+        before = _state(client.m)
+    assert client.delete('/api/positions/B?superior_id=D').status_code == 400
+    assert client.delete('/api/positions/B?superior_id=missing').status_code == 400
+    assert client.post('/api/positions/bulk-delete', json={'ids': ['B', 'missing']}).status_code == 400
+    with client.m.app.app_context():
+        assert _state(client.m) == before
+    _check_consistent(client, set())
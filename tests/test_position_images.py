@@ -0,0 +1,69 @@
+# tests/test_position_images.py 文件
+# online 后端的职位图片：Base64 / data: 内容存入 blob 存储，读取接口返回 /api/blobs/<哈希>；
+# 读取后原样提交（read-modify-write）时沿用已有的图片。
+
+import base64
+
+import pytest
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+@pytest.fixture
+def client(online, tmp_path):
+    m = online
+    m.app.config['BLOB_DIR'] = str(tmp_path / 'blobs')
+    with m.app.app_context():
+        m.ensure_schema()
+    client = m.app.test_client()
+    image = 'data:image/png;base64,' + base64.b64encode(PNG).decode()
+    assert client.post('/api/positions', json={'id': 'P1', 'name': '中书令', 'image': image}).status_code == 200
+    client.m = m
+    return client
+
+
+def _position(client, position_id='P1'):
+    return next(p for p in client.get('/api/positions').get_json() if p['id'] == position_id)
+
+
+def test_put_with_unchanged_blob_url_keeps_image(client):
+    position = _position(client)
+    assert position['image'].startswith('/api/blobs/')
+    position['name'] = '尚书令'
+    response = client.put('/api/positions/P1', json=position)
+    assert response.status_code == 200, response.get_json()
+    updated = _position(client)
+    assert updated['name'] == '尚书令' and updated['image'] == position['image']
+    assert client.get(updated['image']).data == PNG
+
+    # 带域名的地址、其他职位已有的图片同样可以直接引用
+    assert client.post('/api/positions', json={
+        'id': 'P2', 'name': '侍中', 'image': 'http://localhost' + position['image']}).status_code == 200
+    assert _position(client, 'P2')['image'] == position['image']
+
+
+def test_put_with_unknown_blob_url_or_bad_base64_fails(client):
+    original = _position(client)['image']
+    for image in ('/api/blobs/' + '0' * 64, '/api/blobs/not-a-hash', 'not base64!'):
+        response = client.put('/api/positions/P1', json={'image': image})
+        assert response.status_code == 400
+    assert _position(client)['image'] == original
+    assert client.put('/api/positions/P1', json={'image': None}).status_code == 200
+    assert _position(client)['image'] is None
+
+
+def test_blobs_are_served_with_untrusted_content_headers(client):
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+    assert client.put('/api/positions/P1', json={'image': base64.b64encode(svg).decode()}).status_code == 200
+    response = client.get(_position(client)['image'])
+    assert response.data == svg
+    assert response.mimetype == 'image/svg+xml'
+    assert response.headers['Content-Disposition'].startswith('attachment')
+    assert response.headers['Content-Security-Policy'] == 'sandbox'
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+
+    assert client.put('/api/positions/P1', json={'image': base64.b64encode(PNG).decode()}).status_code == 200
+    response = client.get(_position(client)['image'])
+    assert response.mimetype == 'image/png'
+    assert response.headers['Content-Disposition'].startswith('inline')
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
@@ -0,0 +1,100 @@
+# tests/test_response_cache.py 文件
+# official 后端的按日期响应缓存（cached_date_response）：写入提交后缓存的 GET 返回新数据、
+# 旧 ETag 不再得到 304；回滚的写入不使缓存失效；其他进程的提交经变更日志发现。
+
+import pytest
+
+from _common import load_app
+
+
+@pytest.fixture
+def client(official):
+    client = official.app.test_client()
+    for name, date in (('中书门下', '1000-01-01'), ('枢密院', '1050-01-01')):
+        response = client.post('/api/positions', json={'name': name, 'function': {'date': date, 'description': name}})
+        assert response.status_code == 200
+    client.m = official
+    return client
+
+
+def _get(client, url, etag=None):
+    response = client.get(url, headers={'If-None-Match': etag} if etag else {})
+    assert response.status_code in (200, 304)
+    return response
+
+
+def _names(response):
+    return sorted(entry['name'] for entry in response.get_json())
+
+
+def test_etag_revalidates_until_a_write_commits(client):
+    first = _get(client, '/api/positions?date=1060-01-01')
+    etag = first.headers['ETag']
+    assert _get(client, '/api/positions?date=1060-01-01', etag).status_code == 304
+
+    position_id = first.get_json()[0]['id']
+    assert client.put(f'/api/positions/{position_id}', json={'name': '中书省'}).status_code == 200
+    second = _get(client, '/api/positions?date=1060-01-01', etag)
+    assert second.status_code == 200
+    assert second.headers['ETag'] != etag
+    assert '中书省' in _names(second)
+    assert _get(client, '/api/positions?date=1060-01-01', second.headers['ETag']).status_code == 304
+
+
+def test_dates_share_a_payload_until_a_change_point_separates_them(client):
+    early, late = _get(client, '/api/positions?date=1060-01-01'), _get(client, '/api/positions?date=1070-01-01')
+    assert early.headers['ETag'] == late.headers['ETag']
+
+    position_id = early.get_json()[0]['id']
+    assert client.put(f'/api/positions/{position_id}', json={
+        'date': '1065-01-01', 'function': {'description': '改制'}}).status_code == 200
+    early, late = _get(client, '/api/positions?date=1060-01-01'), _get(client, '/api/positions?date=1070-01-01')
+    assert early.headers['ETag'] != late.headers['ETag']
+    functions = {entry['id']: entry['function']['description'] for entry in late.get_json() if entry['function']}
+    assert functions[position_id] == '改制'
+
+
+def test_batch_and_connection_writes_invalidate_cached_lists(client):
+    positions = _get(client, '/api/positions?date=1060-01-01')
+    connections = _get(client, '/api/connections?date=1060-01-01')
+    assert connections.get_json() == []
+    ids = [entry['id'] for entry in positions.get_json()]
+
+    response = client.post('/api/positions/batch', json={'date': '1055-01-01', 'positions': [
+        {'id': ids[0], 'name': '中书省'}, {'name': '三司', 'parent_id': ids[1]}]})
+    assert response.status_code == 200
+    updated = _get(client, '/api/positions?date=1060-01-01', positions.headers['ETag'])
+    assert updated.status_code == 200
+    assert _names(updated) == ['三司', '中书省', '枢密院']
+
+    assert client.post('/api/connections', json={
+        'from_position_id': ids[0], 'to_position_id': ids[1], 'date': '1058-01-01'}).status_code == 200
+    updated = _get(client, '/api/connections?date=1060-01-01', connections.headers['ETag'])
+    assert updated.status_code == 200
+    assert [(c['from_position_id'], c['to_position_id']) for c in updated.get_json()] == [(ids[0], ids[1])]
+    # 生效日期之前的日期不受影响
+    assert _get(client, '/api/connections?date=1057-01-01').get_json() == []
+
+
+def test_rejected_write_keeps_cache(client):
+    first = _get(client, '/api/positions?date=1060-01-01')
+    version = client.m._cache_state['version']
+    response = client.post('/api/positions/batch', json={'positions': [{'name': '三司'}, {'name': ''}]})
+    assert response.status_code == 400
+    assert client.m._cache_state['version'] == version
+    assert _get(client, '/api/positions?date=1060-01-01', first.headers['ETag']).status_code == 304
+
+
+def test_other_worker_commit_invalidates_cache(client, tmp_path):
+    # 另一个进程（同一数据库文件上的第二份 app）的提交只写入变更日志，本进程读取前比较最大 seq 发现
+    other = load_app('official', str(tmp_path / 'official.db')).app.test_client()
+    first = _get(client, '/api/positions?date=1060-01-01')
+    position_id = first.get_json()[0]['id']
+    assert other.put(f'/api/positions/{position_id}', json={'name': '中书省'}).status_code == 200
+
+    second = _get(client, '/api/positions?date=1060-01-01', first.headers['ETag'])
+    assert second.status_code == 200
+    assert '中书省' in _names(second)
+    changes = client.get('/api/changes?since=0').get_json()['changes']
+    assert changes[-1]['entity'] == 'position' and changes[-1]['op'] == 'update'
+    assert changes[-1]['data']['name'] == '中书省'
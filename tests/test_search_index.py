@@ -0,0 +1,65 @@
+# tests/test_search_index.py 文件
+
+import pytest
+from sqlalchemy import create_engine
+
+import search_index
+
+
+def test_tokenize_cjk_bigrams_with_trailing_char():
+    assert search_index.tokenize('枢密院') == '枢密 密院 院'
+    assert search_index.tokenize('院') == '院'
+    assert search_index.tokenize(None) == ''
+
+
+def test_tokenize_mixed_cjk_and_latin():
+    assert search_index.tokenize('王安石 Wang Anshi，熙宁2年') == '王安 安石 石 wang anshi 熙宁 宁 2 年'
+
+
+def test_match_expression_single_cjk_char_is_prefix():
+    assert search_index.match_expression('院') == '"院"*'
+
+
+def test_match_expression_cjk_phrase_and_latin():
+    assert search_index.match_expression('枢密院 Song') == '"枢密 密院" AND "song"'
+    assert search_index.match_expression('  ，。 ') is None
+
+
+@pytest.fixture
+def connection():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        if not search_index.fts5_available(conn):
+            pytest.skip('SQLite 未编译 FTS5')
+        search_index.create_tables(conn)
+        search_index.add(conn, [
+            ('position', 1, {'name': '枢密院 Privy Council'}, 1000, 1100),
+            ('position', 2, {'name': '枢密使'}, 1200, None),
+            ('position', 3, {'name': '翰林院'}, None, None),
+            ('official', 4, {'name': '院'}, 1050, 1060),
+        ])
+        yield conn
+
+
+def _ids(rows):
+    return sorted(int(row[1]) for row in rows)
+
+
+def test_search_single_char_matches_bigram_start_and_trailing_char(connection):
+    assert _ids(search_index.search(connection, '院')) == [1, 3, 4]
+    assert _ids(search_index.search(connection, '密')) == [1, 2]
+
+
+def test_search_mixed_query_requires_all_parts(connection):
+    assert _ids(search_index.search(connection, '枢密 privy')) == [1]
+    assert _ids(search_index.search(connection, '枢密 song')) == []
+
+
+def test_search_date_overlap_filter(connection):
+    assert _ids(search_index.search(connection, '枢密', start_value=1150, end_value=1250)) == [2]
+    assert _ids(search_index.search(connection, '枢密', start_value=1050)) == [1, 2]
+    assert _ids(search_index.search(connection, '枢密', end_value=1050)) == [1]
+    # 没有时间的文档（翰林院）在指定范围时被排除
+    assert _ids(search_index.search(connection, '院', start_value=1101)) == []
+    assert _ids(search_index.search(connection, '院', start_value=1055, end_value=1055)) == [1, 4]
+    assert _ids(search_index.search(connection, '院', entity_types=['official'])) == [4]
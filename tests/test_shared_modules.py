@@ -0,0 +1,26 @@
+# tests/test_shared_modules.py 文件
+# 两个后端共有的辅助模块（search_index、lunar_table、graph_index 等）各保存一份，修改时需同步复制到另一个后端；
+# 这里检查同名模块逐字节相同，漏改一边时测试失败。两边各自的 app.py 与 gunicorn.conf.py 除外。
+
+import os
+
+from conftest import BACKENDS
+
+APP_SPECIFIC = {'app.py', 'gunicorn.conf.py'}
+
+
+def _modules(backend):
+    return {name for name in os.listdir(backend) if name.endswith('.py')} - APP_SPECIFIC
+
+
+def test_shared_modules_are_identical():
+    shared = _modules(BACKENDS['official']) & _modules(BACKENDS['online'])
+    assert {'search_index.py', 'lunar_table.py', 'lunar_history.py', 'graph_index.py', 'tree_layout.py',
+            'change_feed.py', 'bulk_import.py', 'instrumentation.py', 'db_config.py'} <= shared
+    differing = []
+    for name in sorted(shared):
+        with open(os.path.join(BACKENDS['official'], name), 'rb') as a, \
+                open(os.path.join(BACKENDS['online'], name), 'rb') as b:
+            if a.read() != b.read():
+                differing.append(name)
+    assert not differing, f"official-position-system/backend 与 online/backend 中的副本不一致: {differing}"